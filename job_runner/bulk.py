@@ -0,0 +1,119 @@
+"""Buffered bulk inserts and updates for jobs that write many rows"""
+
+import time
+from typing import Any, Callable, List, Optional, Sequence, Type
+
+from django.db import models
+
+from structlog import get_logger
+
+from job_runner.environment import RunInterrupted
+
+logger = get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class BulkWriter:
+    """Collects objects to create or update and writes them in batches.
+
+    Pending writes are flushed when a batch fills, when the writer is
+    closed, and before a RunInterrupted is allowed to propagate. Pending
+    writes are discarded if any other exception escapes the writer"""
+
+    def __init__(
+        self,
+        model: Type[models.Model],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        using: Optional[str] = None,
+        on_flush: Optional[Callable[[int, float], None]] = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        self.model = model
+        self.fields = list(fields or [])
+        self.batch_size = batch_size
+        self.using = using
+        self._on_flush = on_flush
+
+        self._creates: List[models.Model] = []
+        self._updates: List[models.Model] = []
+
+        self.rows_written = 0
+        self.flush_time = 0.0
+
+    def create(self, obj: models.Model):
+        self._creates.append(obj)
+        if len(self._creates) >= self.batch_size:
+            self._flush_creates()
+
+    def update(self, obj: models.Model):
+        if not self.fields:
+            raise ValueError("Fields must be given to the bulk writer to update")
+
+        self._updates.append(obj)
+        if len(self._updates) >= self.batch_size:
+            self._flush_updates()
+
+    def flush(self):
+        self._flush_creates()
+        self._flush_updates()
+
+    def _manager(self):
+        manager = self.model._default_manager
+        if self.using:
+            return manager.using(self.using)
+
+        return manager
+
+    def _flush_creates(self):
+        if not self._creates:
+            return
+
+        batch, self._creates = self._creates, []
+        self._timed(lambda: self._manager().bulk_create(batch), len(batch))
+
+    def _flush_updates(self):
+        if not self._updates:
+            return
+
+        batch, self._updates = self._updates, []
+        self._timed(lambda: self._manager().bulk_update(batch, self.fields), len(batch))
+
+    def _timed(self, write: Callable[[], Any], rows: int):
+        started_at = time.monotonic()
+        write()
+        elapsed = time.monotonic() - started_at
+
+        self.rows_written += rows
+        self.flush_time += elapsed
+        if self._on_flush:
+            self._on_flush(rows, elapsed)
+
+        logger.debug(
+            "Bulk writes flushed",
+            model=self.model._meta.label,
+            rows=rows,
+            flush_time=elapsed,
+        )
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None or issubclass(exc_type, RunInterrupted):
+            self.flush()
+            return
+
+        discarded = len(self._creates) + len(self._updates)
+        self._creates = []
+        self._updates = []
+
+        if discarded:
+            logger.warning(
+                "Discarded bulk writes after an error",
+                model=self.model._meta.label,
+                rows=discarded,
+            )
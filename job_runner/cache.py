@@ -0,0 +1,165 @@
+"""A cache shared by all jobs in a job runner, for setup that is expensive to repeat"""
+
+from collections import OrderedDict
+from threading import Event, Lock
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+
+from job_runner.time import AutoTime, auto_time
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_TTL = 300.0
+
+# How often a caller waiting on another caller's factory checks for a stop
+_POLL_INTERVAL = 0.1
+
+_MISSING: Any = object()
+
+
+class RunnerCache:
+    """A thread safe cache with a time to live and least recently used eviction.
+
+    Only one caller computes a missing value with get_or_set, while
+    any others asking for the same key wait for its result, until
+    the stop event is set"""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: Optional[AutoTime] = DEFAULT_TTL,
+        stop: Optional[Event] = None,
+    ):
+        self.max_size = max_size
+        self._stop_evt = stop
+        self.ttl = auto_time(ttl).total_seconds() if ttl is not None else None
+
+        self._lock = Lock()
+        # Values are kept as (expires_at, value), oldest use first
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = (
+            OrderedDict()
+        )
+        self._loading: Dict[Hashable, Event] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expires_at(self, ttl: Optional[AutoTime]) -> Optional[float]:
+        seconds = auto_time(ttl).total_seconds() if ttl is not None else self.ttl
+        if seconds is None:
+            return None
+
+        return time.monotonic() + seconds
+
+    def _lookup(self, key: Hashable) -> Any:
+        """Must be called with the lock held"""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[AutoTime]):
+        """Must be called with the lock held"""
+
+        self._entries[key] = (self._expires_at(ttl), value)
+        self._entries.move_to_end(key)
+
+        while self.max_size and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[AutoTime] = None):
+        """Cache a value. Without a ttl the cache's default is used"""
+
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_set(
+        self, key: Hashable, factory: Callable[[], Any], ttl: Optional[AutoTime] = None
+    ) -> Any:
+        """Get a cached value, calling factory to compute it if it is missing"""
+
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+
+                if value is not _MISSING:
+                    self.hits += 1
+                    return value
+
+                loading = self._loading.get(key)
+                if loading is None:
+                    self.misses += 1
+                    loading = self._loading[key] = Event()
+                    break
+
+            # Someone else is computing the value. If they fail, try again ourselves
+            while not loading.wait(_POLL_INTERVAL):
+                if self._stop_evt and self._stop_evt.is_set():
+                    # Imported here, since the environment depends on the cache
+                    from job_runner.environment import RunInterrupted
+
+                    raise RunInterrupted()
+
+        try:
+            value = factory()
+
+            with self._lock:
+                self._store(key, value, ttl)
+
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def build_runner_cache(stop: Optional[Event] = None) -> RunnerCache:
+    """Build the runner's cache from the Django settings"""
+
+    return RunnerCache(
+        max_size=getattr(settings, "JOB_RUNNER_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE),
+        ttl=getattr(settings, "JOB_RUNNER_CACHE_TTL", DEFAULT_TTL),
+        stop=stop,
+    )
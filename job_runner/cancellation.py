@@ -0,0 +1,23 @@
+"""Forced cancellation of job threads that don't check for stop requests"""
+
+import ctypes
+from typing import Type
+
+
+def inject_exception(thread_id: int, exc_type: Type[BaseException]) -> bool:
+    """Raise exc_type asynchronously inside the thread with the given ident.
+
+    The exception is delivered the next time the thread executes Python
+    bytecode, so a thread blocked inside a C call (time.sleep, a socket read)
+    will only see it once that call returns. Returns whether a thread was found"""
+
+    modified = ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), ctypes.py_object(exc_type)
+    )
+
+    if modified > 1:
+        # This should never happen, but if it does the call must be undone
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), None)
+        raise SystemError("Exception was injected into more than one thread")
+
+    return modified == 1
@@ -0,0 +1,116 @@
+"""Stop-aware iteration over large querysets, one bounded chunk at a time"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+
+class _Keyset:
+    """The position of a walk over a queryset with keyset pagination on order_by,
+    which must be a unique field, rather than with OFFSET. When a resume key is
+    given, the position after each fully processed chunk is saved in cursors so
+    a later walk continues from there. The position is forgotten once every chunk
+    has been processed"""
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        size: int,
+        order_by: str,
+        cursors: Optional[Dict[str, Any]],
+        resume_key: Optional[str],
+    ):
+        if size < 1:
+            raise ValueError("Chunk size must be at least 1")
+
+        self.size = size
+        self.ordered = queryset.order_by(order_by)
+        self._field = order_by.lstrip("-")
+        self._lookup = (
+            f"{self._field}__lt" if order_by.startswith("-") else f"{self._field}__gt"
+        )
+        self._cursors: Optional[Dict[str, Any]] = None
+        self._resume_key = ""
+        self._last = None
+        if cursors is not None and resume_key is not None:
+            self._cursors, self._resume_key = cursors, resume_key
+            self._last = cursors.get(resume_key)
+
+    def fetch(self) -> List[Any]:
+        page = self.ordered
+        if self._last is not None:
+            page = page.filter(**{self._lookup: self._last})
+        return list(page[: self.size])
+
+    def advance(self, chunk: List[Any]) -> bool:
+        """Move past a processed chunk. False once there is nothing left"""
+
+        if chunk:
+            self._last = getattr(chunk[-1], self._field)
+            if self._cursors is not None:
+                self._cursors[self._resume_key] = self._last
+
+        if len(chunk) < self.size:
+            if self._cursors is not None:
+                self._cursors.pop(self._resume_key, None)
+            return False
+
+        return True
+
+
+def iter_chunks(
+    queryset: QuerySet,
+    size: int,
+    raise_if_stopping: Callable[[], None],
+    order_by: str = "pk",
+    cursors: Optional[Dict[str, Any]] = None,
+    resume_key: Optional[str] = None,
+) -> Iterator[List[Any]]:
+    """Yield lists of at most size objects from the queryset"""
+
+    keyset = _Keyset(queryset, size, order_by, cursors, resume_key)
+
+    while True:
+        raise_if_stopping()
+
+        chunk = keyset.fetch()
+        if chunk:
+            yield chunk
+
+        if not keyset.advance(chunk):
+            break
+
+
+def process_chunks(
+    queryset: QuerySet,
+    size: int,
+    process: Callable[[List[Any]], None],
+    raise_if_stopping: Callable[[], None],
+    order_by: str = "pk",
+    atomic: bool = False,
+    cursors: Optional[Dict[str, Any]] = None,
+    resume_key: Optional[str] = None,
+) -> None:
+    """Call process with lists of at most size objects from the queryset.
+
+    With atomic, each chunk is fetched and processed in its own transaction,
+    which is committed before the next chunk is fetched"""
+
+    keyset = _Keyset(queryset, size, order_by, cursors, resume_key)
+
+    while True:
+        raise_if_stopping()
+
+        if atomic:
+            with transaction.atomic(using=keyset.ordered.db):
+                chunk = keyset.fetch()
+                if chunk:
+                    process(chunk)
+        else:
+            chunk = keyset.fetch()
+            if chunk:
+                process(chunk)
+
+        if not keyset.advance(chunk):
+            break
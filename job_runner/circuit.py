@@ -0,0 +1,70 @@
+"""Backs off jobs that keep failing, and stops running them for a while past a threshold"""
+
+from random import random
+from typing import Optional
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a single job.
+
+    Each failure delays the next run by an exponentially growing backoff with
+    jitter. After enough consecutive failures the circuit opens, and the job
+    is not run again until the reset timeout has passed. The first run after
+    that is a probe: success closes the circuit, and failure opens it again"""
+
+    def __init__(
+        self,
+        backoff: float = 0.0,
+        max_backoff: float = 3600.0,
+        threshold: Optional[int] = None,
+        reset_timeout: float = 60.0,
+    ):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+
+    def start_run(self) -> bool:
+        """Called as a run starts. Returns True if the run is a half open probe"""
+
+        if self.state == CIRCUIT_OPEN:
+            self.state = CIRCUIT_HALF_OPEN
+            return True
+
+        return False
+
+    def record_success(self) -> bool:
+        """Returns True if this closed the circuit"""
+
+        was_closed = self.state == CIRCUIT_CLOSED
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        return not was_closed
+
+    def record_failure(self) -> float:
+        """Returns how long to wait before the next run"""
+
+        self.failures += 1
+
+        if self.state == CIRCUIT_HALF_OPEN or (
+            self.threshold is not None and self.failures >= self.threshold
+        ):
+            self.state = CIRCUIT_OPEN
+            return self.reset_timeout
+
+        if not self.backoff:
+            return 0.0
+
+        delay = min(self.backoff * 2 ** (self.failures - 1), self.max_backoff)
+        # Keep half the delay and randomize the rest, so failing replicas spread out
+        return delay / 2 + delay / 2 * random()
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
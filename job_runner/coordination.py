@@ -0,0 +1,180 @@
+"""Coordinates planned restarts between job runner replicas through the database"""
+
+from datetime import timedelta
+import os
+import socket
+from threading import Event, Thread
+from typing import Optional
+import uuid
+
+import django.db
+from django.conf import settings
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from structlog import get_logger
+
+from job_runner.models import RunnerHeartbeat
+
+logger = get_logger(__name__)
+
+DEFAULT_HEARTBEAT_INTERVAL = 10.0
+DEFAULT_STALE_AFTER = 30.0
+
+
+def default_runner_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class RestartCoordinator(Thread):
+    """Keeps this runner's heartbeat up to date, and turns planned stops into
+    a real stop only once enough peers are alive and none of them are stopping.
+
+    After announcing its stop, a runner backs off if another runner announced
+    first, ordered by announcement time and then runner id, so of two runners
+    that start stopping at the same moment only one goes ahead. Announcements
+    are stamped by the database's clock, so skewed runner clocks can't
+    reorder them"""
+
+    def __init__(
+        self,
+        stop: Event,
+        min_peers: int = 1,
+        runner_id: Optional[str] = None,
+        interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        stale_after: float = DEFAULT_STALE_AFTER,
+    ):
+        self._stop_evt = stop
+        self._restart_requested = Event()
+        self._wake = Event()
+        self.min_peers = min_peers
+        self.runner_id = runner_id or default_runner_id()
+        self.interval = interval
+        self.stale_after = stale_after
+        self.log = logger.bind(process="restart coordinator", runner_id=self.runner_id)
+
+        # Read by the status endpoint without any locking
+        self.peers_alive = 0
+
+        super().__init__(name="Restart coordinator")
+
+    def request_restart(self):
+        """Ask for a stop, once it is safe for the other replicas"""
+
+        self.log.info("Planned stop requested, waiting for peers")
+        self._restart_requested.set()
+        self._wake.set()
+
+    @property
+    def restart_pending(self) -> bool:
+        return self._restart_requested.is_set() and not self._stop_evt.is_set()
+
+    def _peers(self):
+        alive_since = timezone.now() - timedelta(seconds=self.stale_after)
+
+        return RunnerHeartbeat.objects.filter(last_seen_at__gte=alive_since).exclude(
+            runner_id=self.runner_id
+        )
+
+    def beat(self):
+        """Record a heartbeat, and stop if a planned stop is now allowed"""
+
+        django.db.close_old_connections()
+        now = timezone.now()
+
+        RunnerHeartbeat.objects.update_or_create(
+            runner_id=self.runner_id, defaults={"last_seen_at": now}
+        )
+
+        peers = list(self._peers().values_list("runner_id", "stopping_since"))
+        self.peers_alive = sum(1 for _, stopping_since in peers if not stopping_since)
+
+        if not self._restart_requested.is_set() or self._stop_evt.is_set():
+            return
+
+        if any(stopping_since for _, stopping_since in peers):
+            self.log.debug("Another runner is stopping, waiting")
+            return
+
+        if self.peers_alive < self.min_peers:
+            self.log.debug(
+                "Not enough peers to stop",
+                peers=self.peers_alive,
+                needed=self.min_peers,
+            )
+            return
+
+        # Announce the stop, then make sure nobody announced at the same time
+        ours_row = RunnerHeartbeat.objects.filter(runner_id=self.runner_id)
+        ours_row.update(stopping_since=Now())
+        ours = (ours_row.values_list("stopping_since", flat=True).get(), self.runner_id)
+        rivals = self._peers().filter(stopping_since__isnull=False)
+        if any(
+            (stopping_since, runner_id) < ours
+            for runner_id, stopping_since in rivals.values_list(
+                "runner_id", "stopping_since"
+            )
+        ):
+            ours_row.update(stopping_since=None)
+            self.log.debug("Another runner started stopping at the same time, waiting")
+            return
+
+        self.log.info("Peers are available, stopping", peers=self.peers_alive)
+        self._stop_evt.set()
+
+    def run(self):
+        try:
+            while not self._stop_evt.is_set():
+                try:
+                    self.beat()
+                except Exception as exc:
+                    self.log.warning("Could not record heartbeat", error=str(exc))
+
+                self._wake.wait(self.interval)
+                self._wake.clear()
+        finally:
+            django.db.connections.close_all()
+
+        self.log.info("Restart coordinator exiting")
+
+    def leave(self):
+        """Mark this runner as stopping while its jobs finish, for any reason.
+
+        Called from the main thread when shutdown begins"""
+
+        self._wake.set()
+
+        try:
+            RunnerHeartbeat.objects.filter(runner_id=self.runner_id).update(
+                stopping_since=Now(), last_seen_at=timezone.now()
+            )
+        except Exception as exc:
+            self.log.warning("Could not mark runner as stopping", error=str(exc))
+
+    def unregister(self):
+        """Remove this runner's heartbeat, once every job has stopped"""
+
+        try:
+            RunnerHeartbeat.objects.filter(runner_id=self.runner_id).delete()
+        except Exception as exc:
+            self.log.warning("Could not remove heartbeat", error=str(exc))
+
+    def stats(self) -> dict:
+        return {
+            "runner_id": self.runner_id,
+            "peers_alive": self.peers_alive,
+            "restart_pending": self.restart_pending,
+        }
+
+
+def build_restart_coordinator(stop: Event, min_peers: int) -> RestartCoordinator:
+    return RestartCoordinator(
+        stop,
+        min_peers=min_peers,
+        interval=getattr(
+            settings, "JOB_RUNNER_HEARTBEAT_INTERVAL", DEFAULT_HEARTBEAT_INTERVAL
+        ),
+        stale_after=getattr(
+            settings, "JOB_RUNNER_HEARTBEAT_STALE_AFTER", DEFAULT_STALE_AFTER
+        ),
+    )
@@ -0,0 +1,255 @@
+"""One-off calls to functions at a given time, stored in the database"""
+
+from datetime import datetime, timedelta
+import heapq
+import json
+import time
+import traceback
+from threading import Event, Thread
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import django.db
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from structlog import get_logger
+
+from job_runner.models import DelayedTask
+from job_runner.time import auto_time
+
+logger = get_logger(__name__)
+
+DEFAULT_WINDOW = 60.0
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_LEASE = 600.0
+
+When = Union[datetime, timedelta, int, float]
+
+
+def _due_at(when: When) -> datetime:
+    """An exact time is used as is, and anything else is a delay from now"""
+
+    if isinstance(when, datetime):
+        return when
+
+    return timezone.now() + auto_time(when)
+
+
+def _build(
+    func_path: str, when: When, args: Sequence, kwargs: Optional[dict]
+) -> DelayedTask:
+    # Fail at enqueue time, rather than when the task comes due
+    import_string(func_path)
+
+    return DelayedTask(
+        func_path=func_path,
+        due_at=_due_at(when),
+        args=json.dumps(list(args)),
+        kwargs=json.dumps(kwargs or {}),
+    )
+
+
+def enqueue_at(
+    func_path: str, when: When, args: Sequence = (), kwargs: Optional[dict] = None
+) -> DelayedTask:
+    """Call the function at func_path with args and kwargs when it comes due"""
+
+    task = _build(func_path, when, args, kwargs)
+    task.save()
+    return task
+
+
+def enqueue_many(
+    tasks: Iterable[Tuple[str, When, Sequence]], batch_size: Optional[int] = None
+) -> List[DelayedTask]:
+    """Enqueue many (func_path, when, args) calls with bulk inserts"""
+
+    return DelayedTask.objects.bulk_create(
+        [_build(func_path, when, args, None) for func_path, when, args in tasks],
+        batch_size=batch_size,
+    )
+
+
+class DelayedTaskRunner(Thread):
+    """Runs delayed tasks as they come due.
+
+    Tasks due within the window are loaded into an in-memory heap with
+    batched range queries on the due time, so each one starts right at its
+    due time rather than at the next poll. Only tasks added less than a poll
+    interval before they are due can start late. A task is claimed with a
+    conditional update before it is run, so each task only runs once across
+    multiple job runners. A claim older than the lease is taken to belong to
+    a runner that died, and the task can be claimed again. Tasks run one at
+    a time on this thread"""
+
+    def __init__(
+        self,
+        stop: Event,
+        window: float = DEFAULT_WINDOW,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        lease: float = DEFAULT_LEASE,
+    ):
+        self._stop_evt = stop
+        self.window = window
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self.log = logger.bind(process="delayed tasks")
+
+        self._heap: List[Tuple[float, int]] = []
+        self._queued: Set[int] = set()
+        self._next_load = 0.0
+        # The last (due_at, pk) loaded, while the window needs more than one batch
+        self._load_after: Optional[Tuple[datetime, int]] = None
+
+        # Read by the status endpoint without any locking
+        self.finished = 0
+        self.failed = 0
+        self.claimed_elsewhere = 0
+
+        super().__init__(name="Delayed tasks")
+
+    def run(self):
+        try:
+            while not self._stop_evt.is_set():
+                try:
+                    self._step()
+                except Exception as exc:
+                    # Most likely the database went away. Try again later
+                    self.log.exception("Delayed task runner failed", error=str(exc))
+                    self._next_load = time.monotonic() + self.poll_interval
+                    self._stop_evt.wait(self.poll_interval)
+        finally:
+            django.db.connections.close_all()
+
+        self.log.info("Delayed task runner exiting", **self.stats())
+
+    def _step(self):
+        now = time.monotonic()
+
+        if now >= self._next_load:
+            self._load()
+
+        if self._heap and self._heap[0][0] <= now:
+            due_at, pk = heapq.heappop(self._heap)
+            self._queued.discard(pk)
+            self._run_task(pk, now - due_at)
+            return
+
+        wake_at = self._next_load
+        if self._heap:
+            wake_at = min(wake_at, self._heap[0][0])
+
+        self._stop_evt.wait(max(wake_at - now, 0))
+
+    def _unclaimed(self) -> Q:
+        expired = timezone.now() - timedelta(seconds=self.lease)
+        return Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired)
+
+    def _load(self):
+        """Queue up every unclaimed task that comes due within the window"""
+
+        django.db.close_old_connections()
+
+        now = time.monotonic()
+        wall_now = timezone.now()
+        tasks = DelayedTask.objects.filter(
+            self._unclaimed(),
+            failed_at__isnull=True,
+            due_at__lt=wall_now + timedelta(seconds=self.window),
+        )
+        if self._load_after:
+            # Carry on from the end of the last batch rather than loading it again
+            last_due_at, last_pk = self._load_after
+            tasks = tasks.filter(
+                Q(due_at__gt=last_due_at) | Q(due_at=last_due_at, pk__gt=last_pk)
+            )
+
+        rows = list(
+            tasks.order_by("due_at", "pk").values_list("pk", "due_at")[
+                : self.batch_size
+            ]
+        )
+
+        self._next_load = now + self.poll_interval
+        self._load_after = None
+
+        for pk, due_at in rows:
+            if pk in self._queued:
+                continue
+
+            self._queued.add(pk)
+            heapq.heappush(self._heap, (now + (due_at - wall_now).total_seconds(), pk))
+
+        if len(rows) == self.batch_size:
+            # The window didn't fit in one batch. Load more as soon as we reach the end
+            last_pk, last_due_at = rows[-1]
+            self._load_after = (last_due_at, last_pk)
+            self._next_load = min(
+                self._next_load, now + (last_due_at - wall_now).total_seconds()
+            )
+
+        self.log.debug("Delayed tasks loaded", loaded=len(rows), queued=len(self._heap))
+
+    def _run_task(self, pk: int, lag: float):
+        if self._stop_evt.is_set():
+            # Left unclaimed for the next job runner
+            return
+
+        claimed = DelayedTask.objects.filter(self._unclaimed(), pk=pk).update(
+            claimed_at=timezone.now()
+        )
+
+        if not claimed:
+            self.claimed_elsewhere += 1
+            self.log.debug("Delayed task was claimed by another runner", task_id=pk)
+            return
+
+        task = DelayedTask.objects.get(pk=pk)
+        log = self.log.bind(task_id=pk, func_path=task.func_path)
+        started_at = time.monotonic()
+
+        try:
+            func = import_string(task.func_path)
+            func(*json.loads(task.args), **json.loads(task.kwargs))
+        except Exception as exc:
+            self.failed += 1
+            log.exception("Delayed task failed", error=str(exc))
+            DelayedTask.objects.filter(pk=pk).update(
+                failed_at=timezone.now(), error=traceback.format_exc()
+            )
+            return
+
+        self.finished += 1
+        task.delete()
+        log.info(
+            "Delayed task finished",
+            lag=lag,
+            execution_time=time.monotonic() - started_at,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._heap),
+            "finished": self.finished,
+            "failed": self.failed,
+            "claimed_elsewhere": self.claimed_elsewhere,
+        }
+
+
+def build_delayed_task_runner(stop: Event) -> DelayedTaskRunner:
+    return DelayedTaskRunner(
+        stop,
+        window=getattr(settings, "JOB_RUNNER_DELAYED_WINDOW", DEFAULT_WINDOW),
+        batch_size=getattr(
+            settings, "JOB_RUNNER_DELAYED_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        ),
+        poll_interval=getattr(
+            settings, "JOB_RUNNER_DELAYED_POLL_INTERVAL", DEFAULT_POLL_INTERVAL
+        ),
+        lease=getattr(settings, "JOB_RUNNER_DELAYED_LEASE", DEFAULT_LEASE),
+    )
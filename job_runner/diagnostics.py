@@ -0,0 +1,103 @@
+"""Diagnostic dumps of a running job runner, for finding where it is stuck"""
+
+from datetime import datetime
+import sys
+import threading
+import traceback
+from typing import Iterable, List, Optional
+
+from job_runner.runner import JobThread
+from job_runner.timeouts import TimeoutTracker
+
+
+def _format_stack(frame) -> List[str]:
+    if frame is None:
+        return []
+
+    return [line.rstrip("\n") for line in traceback.format_stack(frame)]
+
+
+def collect_diagnostics(
+    threads: Iterable[JobThread], timeout_tracker: TimeoutTracker
+) -> dict:
+    """The stack of every thread, grouped by job, with each job's schedule"""
+
+    frames = sys._current_frames()
+    jobs = []
+
+    for thread in sorted(threads, key=lambda thread: thread.job.name):
+        if thread.ident is None:
+            # Not started yet, so it has no stack to show
+            continue
+
+        snapshot = thread.snapshot()
+        jobs.append(
+            {
+                "job_name": snapshot["job_name"],
+                "state": snapshot["state"],
+                "next_run_in": snapshot["next_run_in"],
+                "current_run_age": snapshot["current_run_age"],
+                "stack": _format_stack(frames.pop(thread.ident, None)),
+            }
+        )
+
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    others = [
+        {"thread_name": names.get(ident, str(ident)), "stack": _format_stack(frame)}
+        for ident, frame in frames.items()
+    ]
+
+    return {
+        "jobs": jobs,
+        "threads": sorted(others, key=lambda other: other["thread_name"]),
+        "timeouts": timeout_tracker.snapshot(),
+    }
+
+
+def format_diagnostics(diagnostics: dict) -> str:
+    lines = [f"Job runner diagnostics at {datetime.now().isoformat()}", ""]
+
+    for job in diagnostics["jobs"]:
+        run_age = job["current_run_age"]
+        lines.append(
+            f"Job {job['job_name']}: {job['state']}, "
+            f"next run in {job['next_run_in']:.3f}s, "
+            + (f"running for {run_age:.3f}s" if run_age is not None else "not running")
+        )
+        lines.extend(job["stack"])
+        lines.append("")
+
+    for other in diagnostics["threads"]:
+        lines.append(f"Thread {other['thread_name']}")
+        lines.extend(other["stack"])
+        lines.append("")
+
+    lines.append("Pending timeouts")
+    for timeout in diagnostics["timeouts"]:
+        lines.append(f"\t{timeout['name']}: {timeout['remaining']:.3f}s left")
+
+    return "\n".join(lines) + "\n"
+
+
+def dump_diagnostics(
+    log,
+    threads: Iterable[JobThread],
+    timeout_tracker: TimeoutTracker,
+    path: Optional[str] = None,
+):
+    """Log the diagnostics, or append them to a file"""
+
+    diagnostics = collect_diagnostics(threads, timeout_tracker)
+
+    if not path:
+        log.warning("Diagnostic dump", **diagnostics)
+        return
+
+    try:
+        with open(path, "a") as dump_file:
+            dump_file.write(format_diagnostics(diagnostics))
+    except OSError as exc:
+        log.error("Could not write diagnostic dump", path=path, error=str(exc))
+        return
+
+    log.info("Diagnostic dump written", path=path)
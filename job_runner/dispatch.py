@@ -0,0 +1,291 @@
+"""Hands out limited run slots to competing jobs by priority and deadline"""
+
+from collections import defaultdict
+import itertools
+import time
+from threading import Condition, Event, Thread
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from structlog import get_logger
+
+from job_runner.fairshare import DEFAULT_USAGE_HALF_LIFE, UsageTracker
+from job_runner.registration import RegisteredJob
+
+logger = get_logger(__name__)
+
+# How many seconds of waiting are worth one level of priority
+DEFAULT_AGING = 60.0
+
+
+class Slot:
+    """A request for, and then the grant of, a single run slot"""
+
+    __slots__ = (
+        "job_name",
+        "priority",
+        "group",
+        "due_at",
+        "deadline_at",
+        "queued_at",
+        "sequence",
+        "rerun",
+        "share",
+        "granted",
+        "granted_at",
+    )
+
+    def __init__(
+        self,
+        job_name: str,
+        priority: int,
+        group: Optional[str],
+        due_at: float,
+        deadline_at: Optional[float],
+        sequence: int,
+        rerun: bool = False,
+        share: float = 1.0,
+    ):
+        self.job_name = job_name
+        self.priority = priority
+        self.group = group
+        self.due_at = due_at
+        self.deadline_at = deadline_at
+        self.queued_at = time.monotonic()
+        self.sequence = sequence
+        self.rerun = rerun
+        self.share = share
+        self.granted = False
+        self.granted_at = 0.0
+
+
+class PriorityLag:
+    """How long runs of a single priority waited past their due time for a slot"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.missed_deadlines = 0
+
+    def record(self, lag: float, missed_deadline: bool):
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        if missed_deadline:
+            self.missed_deadlines += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "missed_deadlines": self.missed_deadlines,
+        }
+
+
+class Dispatcher:
+    """Limits how many jobs run at once, overall and per concurrency group.
+
+    Waiting runs are granted slots by priority and then by earliest deadline.
+    A waiting run gains one level of priority for every aging period it has
+    waited, so low priority jobs are not starved. Immediate reruns yield to
+    other runs of the same priority, and compete with each other by
+    recent run time divided by the job's share"""
+
+    def __init__(
+        self,
+        stop: Event,
+        max_concurrent: int = 0,
+        group_limits: Optional[Dict[str, int]] = None,
+        aging: float = DEFAULT_AGING,
+        usage_half_life: float = DEFAULT_USAGE_HALF_LIFE,
+    ):
+        if aging < 0:
+            raise ValueError("Priority aging can't be negative")
+
+        self._stop_evt = stop
+        self.max_concurrent = max_concurrent
+        self.group_limits: Dict[str, int] = dict(group_limits or {})
+        self._aging = aging
+
+        self._cond = Condition()
+        self._waiting: List[Slot] = []
+        self._running = 0
+        self._group_running: Dict[str, int] = defaultdict(int)
+        self._sequence = itertools.count()
+        self._lag: Dict[int, PriorityLag] = defaultdict(PriorityLag)
+        self._usage = UsageTracker(usage_half_life)
+        self._log = logger.bind(process="dispatcher")
+
+    def start(self):
+        """Start watching for a stop, so that waiting runs give up"""
+
+        watcher = Thread(target=self._watch_for_stop, name="Dispatcher stop watcher")
+        watcher.daemon = True
+        watcher.start()
+
+    def _watch_for_stop(self):
+        self._stop_evt.wait()
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(
+        self, job: RegisteredJob, due_at: float, rerun: bool = False
+    ) -> Optional[Slot]:
+        """Wait for a run slot. Returns None if the runner is stopping"""
+
+        deadline_at: Optional[float] = None
+        if job.deadline is not None:
+            deadline_at = due_at + job.deadline.total_seconds()
+
+        with self._cond:
+            slot = Slot(
+                job.name,
+                job.priority,
+                job.concurrency_group,
+                due_at,
+                deadline_at,
+                next(self._sequence),
+                rerun=rerun,
+                share=job.share,
+            )
+            self._waiting.append(slot)
+            self._grant()
+
+            while not slot.granted:
+                if self._stop_evt.is_set():
+                    self._waiting.remove(slot)
+                    return None
+
+                self._cond.wait()
+
+        return slot
+
+    def try_acquire(self, job: RegisteredJob) -> Optional[Slot]:
+        """Take a slot for extra work from a running job, without waiting.
+
+        Returns None if there is no free slot, or if runs are waiting for one"""
+
+        with self._cond:
+            if self._waiting or not self._has_capacity(job.concurrency_group):
+                return None
+
+            now = time.monotonic()
+            slot = Slot(
+                job.name,
+                job.priority,
+                job.concurrency_group,
+                now,
+                None,
+                next(self._sequence),
+                share=job.share,
+            )
+
+            self._running += 1
+            if slot.group:
+                self._group_running[slot.group] += 1
+
+            slot.granted = True
+            slot.granted_at = now
+            return slot
+
+    def release(self, slot: Slot):
+        with self._cond:
+            now = time.monotonic()
+            self._usage.add(slot.job_name, now - slot.granted_at, now)
+
+            self._running -= 1
+            if slot.group:
+                self._group_running[slot.group] -= 1
+
+            self._grant()
+
+    def _has_capacity(self, group: Optional[str]) -> bool:
+        if self.max_concurrent and self._running >= self.max_concurrent:
+            return False
+
+        if group in self.group_limits:
+            return self._group_running[group] < self.group_limits[group]
+
+        return True
+
+    def _order(self, slot: Slot, now: float):
+        effective_priority: float = slot.priority
+        if self._aging:
+            effective_priority += (now - slot.queued_at) // self._aging
+        deadline_at = slot.deadline_at if slot.deadline_at is not None else float("inf")
+
+        fair_share = 0.0
+        if slot.rerun:
+            fair_share = self._usage.weighted(slot.job_name, slot.share, now)
+
+        return (
+            -effective_priority,
+            slot.rerun,
+            fair_share,
+            deadline_at,
+            slot.sequence,
+        )
+
+    def _grant(self):
+        """Grant slots to as many waiting runs as there is room for, best first.
+
+        Must be called with the condition held"""
+
+        now = time.monotonic()
+        granted = False
+
+        for slot in sorted(self._waiting, key=lambda slot: self._order(slot, now)):
+            if not self._has_capacity(slot.group):
+                continue
+
+            self._waiting.remove(slot)
+            self._running += 1
+            if slot.group:
+                self._group_running[slot.group] += 1
+
+            slot.granted = True
+            slot.granted_at = now
+            granted = True
+            self._record_lag(slot, now)
+
+        if granted:
+            self._cond.notify_all()
+
+    def _record_lag(self, slot: Slot, now: float):
+        lag = max(now - slot.due_at, 0)
+        missed_deadline = slot.deadline_at is not None and now > slot.deadline_at
+        self._lag[slot.priority].record(lag, missed_deadline)
+
+        if missed_deadline:
+            self._log.warning(
+                "Job missed its start deadline",
+                job_name=slot.job_name,
+                priority=slot.priority,
+                lag=lag,
+            )
+
+    def lag_stats(self) -> Dict[int, dict]:
+        with self._cond:
+            return {
+                priority: lag.as_dict() for priority, lag in sorted(self._lag.items())
+            }
+
+
+def build_dispatcher(stop: Event, max_concurrent: int) -> Optional[Dispatcher]:
+    """Build the dispatcher, if there are any limits on concurrency"""
+
+    group_limits = getattr(settings, "JOB_RUNNER_CONCURRENCY_GROUPS", {})
+
+    if not max_concurrent and not group_limits:
+        return None
+
+    return Dispatcher(
+        stop,
+        max_concurrent=max_concurrent,
+        group_limits=group_limits,
+        aging=getattr(settings, "JOB_RUNNER_PRIORITY_AGING", DEFAULT_AGING),
+    )
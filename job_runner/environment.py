@@ -1,21 +1,67 @@
 """Environments for the job runner"""
 
+from concurrent.futures import Future
 from threading import Event
-from typing import Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
+from django.db.models import Model, QuerySet
+
+from job_runner.cache import RunnerCache
+from job_runner.chunks import iter_chunks, process_chunks
+from job_runner.ratelimit import RateLimiter
 from job_runner.time import AutoTime, auto_time
 
+if TYPE_CHECKING:
+    from job_runner.bulk import BulkWriter
+    from job_runner.pool import JobPool
+
 
 class RunInterrupted(Exception):
     """An exception indicating that a job execution was interrupted"""
 
 
 class _Env:
-    def __init__(self, stop_event: Event):
+    def __init__(
+        self,
+        stop_event: Event,
+        state: Dict[str, Any],
+        cache: RunnerCache,
+        pool: Optional["JobPool"],
+        rate_limits: Dict[str, RateLimiter],
+        database_alias: Optional[str] = None,
+        read_alias: Optional[str] = None,
+        cursors: Optional[Dict[str, Any]] = None,
+    ):
         self.stop_event = stop_event
+        self.state = state
+        # Chunk positions, saved with the job's schedule rather than in its state
+        self.cursors = cursors if cursors is not None else {}
+        self.cache = cache
+        self.pool = pool
+        self.rate_limits = rate_limits
+        self.database_alias = database_alias
+        self.read_alias = read_alias
         self.request_immediate_rerun = False
         self.requested_stop = False
         self.requested_fatal_errors = False
+        self.rows_written = 0
+        self.flush_time = 0.0
+
+    def record_flush(self, rows: int, elapsed: float):
+        self.rows_written += rows
+        self.flush_time += elapsed
 
 
 class TrackerEnv:
@@ -36,6 +82,14 @@ class TrackerEnv:
     def requested_fatal_errors(self):
         return self._env.requested_fatal_errors
 
+    @property
+    def rows_written(self) -> int:
+        return self._env.rows_written
+
+    @property
+    def flush_time(self) -> float:
+        return self._env.flush_time
+
 
 class RunEnv:
     """The run environment is passed into all jobs when they"
@@ -71,7 +125,163 @@ class RunEnv:
         if self.is_stopping:
             raise RunInterrupted()
 
+    def rate_limit(self, name: str, tokens: float = 1):
+        """Wait until the named rate limiter allows the call.
+
+        Raises RunInterrupted if we are asked to stop while waiting"""
+
+        try:
+            limiter = self._env.rate_limits[name]
+        except KeyError:
+            raise ValueError(f"Unknown rate limit: {name}") from None
+
+        if tokens > limiter.burst:
+            raise ValueError(f"Rate limit {name} can never allow {tokens} tokens")
+
+        while True:
+            wait_time = limiter.try_acquire(tokens)
+            if not wait_time:
+                return
+
+            if self._env.stop_event.wait(wait_time):
+                raise RunInterrupted()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """A dictionary belonging to this job that persists across runs"""
+        return self._env.state
+
+    @property
+    def cache(self) -> RunnerCache:
+        """A cache shared by every job in the job runner"""
+        return self._env.cache
+
+    @property
+    def database_alias(self) -> Optional[str]:
+        """The database this instance of a per database job owns"""
+        return self._env.database_alias
+
+    @property
+    def read_using(self) -> Optional[str]:
+        """The replica this run's reads go to, or None when they go to the primary"""
+        return self._env.read_alias
+
+    def iter_chunks(
+        self,
+        queryset: QuerySet,
+        size: int = 1000,
+        order_by: str = "pk",
+        resume_key: Optional[str] = None,
+    ) -> Iterator[List[Any]]:
+        """Iterate over a queryset in chunks, stopping between chunks if asked to.
+
+        With a resume key, a run that is interrupted continues from the last
+        fully processed chunk on the job's next run"""
+
+        return iter_chunks(
+            queryset,
+            size,
+            self.raise_if_stopping,
+            order_by=order_by,
+            cursors=self._env.cursors,
+            resume_key=resume_key,
+        )
+
+    def process_chunks(
+        self,
+        queryset: QuerySet,
+        process: Callable[[List[Any]], None],
+        size: int = 1000,
+        order_by: str = "pk",
+        atomic: bool = False,
+        resume_key: Optional[str] = None,
+    ):
+        """Like iter_chunks, but calls process with each chunk,
+        in a transaction of its own with atomic"""
+
+        process_chunks(
+            queryset,
+            size,
+            process,
+            self.raise_if_stopping,
+            order_by=order_by,
+            atomic=atomic,
+            cursors=self._env.cursors,
+            resume_key=resume_key,
+        )
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Call func on the runner's worker pool.
+
+        Without a pool, func is called straight away in the job's thread"""
+
+        if self._env.pool:
+            return self._env.pool.submit(func, *args, **kwargs)
+
+        self.raise_if_stopping()
+        future: Future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+
+        return future
+
+    def map(
+        self, func: Callable, items: Iterable, max_workers: Optional[int] = None
+    ) -> List[Any]:
+        """Call func on every item using the runner's worker pool,
+        returning the results in order"""
+
+        if self._env.pool:
+            return self._env.pool.map(func, items, max_workers)
+
+        results = []
+        for item in items:
+            self.raise_if_stopping()
+            results.append(func(item))
+
+        return results
+
+    def bulk_writer(
+        self,
+        model: Type[Model],
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 500,
+        using: Optional[str] = None,
+    ) -> "BulkWriter":
+        """A context manager that writes created and updated objects in batches"""
+
+        # The bulk module needs RunInterrupted from this one
+        from job_runner.bulk import BulkWriter
+
+        return BulkWriter(
+            model,
+            fields=fields,
+            batch_size=batch_size,
+            using=using,
+            on_flush=self._env.record_flush,
+        )
+
 
-def get_environments(stop_event: Event) -> Tuple[RunEnv, TrackerEnv]:
-    env = _Env(stop_event)
+def get_environments(
+    stop_event: Event,
+    state: Optional[Dict[str, Any]] = None,
+    cache: Optional[RunnerCache] = None,
+    pool: Optional["JobPool"] = None,
+    rate_limits: Optional[Dict[str, RateLimiter]] = None,
+    database_alias: Optional[str] = None,
+    read_alias: Optional[str] = None,
+    cursors: Optional[Dict[str, Any]] = None,
+) -> Tuple[RunEnv, TrackerEnv]:
+    env = _Env(
+        stop_event,
+        state if state is not None else {},
+        cache if cache is not None else RunnerCache(),
+        pool,
+        rate_limits if rate_limits is not None else {},
+        database_alias,
+        read_alias,
+        cursors,
+    )
     return RunEnv(env), TrackerEnv(env)
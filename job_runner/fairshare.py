@@ -0,0 +1,62 @@
+"""Keeps jobs that keep requesting reruns from monopolizing the runner"""
+
+from collections import deque
+import math
+from typing import Deque, Dict, Tuple
+
+# Usage older than this many seconds counts for half as much
+DEFAULT_USAGE_HALF_LIFE = 60.0
+
+
+class RerunBudget:
+    """Allows at most budget immediate reruns within any window of seconds"""
+
+    def __init__(self, budget: int, window: float):
+        self.budget = budget
+        self.window = window
+        self._reruns: Deque[float] = deque()
+
+    def _expire(self, now: float):
+        while self._reruns and self._reruns[0] <= now - self.window:
+            self._reruns.popleft()
+
+    def allow(self, now: float) -> bool:
+        """Use up one rerun, if there are any left in the current window"""
+
+        self._expire(now)
+
+        if len(self._reruns) >= self.budget:
+            return False
+
+        self._reruns.append(now)
+        return True
+
+    def next_allowed(self, now: float) -> float:
+        """When the next rerun will be allowed"""
+
+        self._expire(now)
+
+        if len(self._reruns) < self.budget:
+            return now
+
+        return self._reruns[0] + self.window
+
+
+class UsageTracker:
+    """Tracks exponentially decaying run time per job, for weighted fair share"""
+
+    def __init__(self, half_life: float = DEFAULT_USAGE_HALF_LIFE):
+        self._decay = math.log(2) / half_life
+        self._usage: Dict[str, Tuple[float, float]] = {}
+
+    def _decayed(self, job_name: str, now: float) -> float:
+        usage, updated_at = self._usage.get(job_name, (0.0, now))
+        return usage * math.exp(-self._decay * (now - updated_at))
+
+    def add(self, job_name: str, duration: float, now: float):
+        self._usage[job_name] = (self._decayed(job_name, now) + duration, now)
+
+    def weighted(self, job_name: str, share: float, now: float) -> float:
+        """Recent usage divided by the job's share. Lower goes first"""
+
+        return self._decayed(job_name, now) / share
@@ -0,0 +1,130 @@
+"""Fixed-size, in-memory history of the most recent runs of each job"""
+
+from array import array
+from threading import Lock
+from typing import Dict, List
+
+from job_runner.outcomes import (
+    OUTCOME_CRASHED,
+    OUTCOME_ERROR,
+    OUTCOME_INTERRUPTED,
+    OUTCOME_SKIPPED,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+)
+
+# Outcomes are stored as single bytes
+_OUTCOMES = (
+    OUTCOME_SUCCESS,
+    OUTCOME_INTERRUPTED,
+    OUTCOME_ERROR,
+    OUTCOME_TIMEOUT,
+    OUTCOME_CRASHED,
+    OUTCOME_SKIPPED,
+)
+_OUTCOME_CODES: Dict[str, int] = {outcome: i for i, outcome in enumerate(_OUTCOMES)}
+
+DEFAULT_SIZE = 100
+
+
+class RunRecord:
+    """A single run, as read back out of a history"""
+
+    __slots__ = ("started_at", "duration", "outcome", "cpu_time", "query_count")
+
+    def __init__(
+        self,
+        started_at: float,
+        duration: float,
+        outcome: str,
+        cpu_time: float,
+        query_count: int,
+    ):
+        self.started_at = started_at
+        self.duration = duration
+        self.outcome = outcome
+        self.cpu_time = cpu_time
+        self.query_count = query_count
+
+
+class RunHistory:
+    """A ring buffer of the last size runs, stored in flat arrays
+    so memory use is fixed no matter how often the job runs"""
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        self.size = size
+        self._started_at = array("d", bytes(8 * size))
+        self._duration = array("d", bytes(8 * size))
+        self._cpu_time = array("d", bytes(8 * size))
+        self._query_count = array("L", [0]) * size
+        self._outcome = array("B", bytes(size))
+        self._next = 0
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(
+        self,
+        started_at: float,
+        duration: float,
+        outcome: str,
+        cpu_time: float = 0.0,
+        query_count: int = 0,
+    ):
+        if not self.size:
+            return
+
+        with self._lock:
+            i = self._next
+            self._started_at[i] = started_at
+            self._duration[i] = duration
+            self._cpu_time[i] = cpu_time
+            self._query_count[i] = query_count
+            self._outcome[i] = _OUTCOME_CODES[outcome]
+
+            self._next = (i + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def records(self) -> List[RunRecord]:
+        """All the stored runs, oldest first"""
+
+        with self._lock:
+            start = (self._next - self._count) % self.size if self.size else 0
+            indexes = [(start + offset) % self.size for offset in range(self._count)]
+
+            return [
+                RunRecord(
+                    self._started_at[i],
+                    self._duration[i],
+                    _OUTCOMES[self._outcome[i]],
+                    self._cpu_time[i],
+                    self._query_count[i],
+                )
+                for i in indexes
+            ]
+
+    def stats(self) -> dict:
+        """Summary statistics over the stored runs"""
+
+        records = self.records()
+        if not records:
+            return {"runs": 0}
+
+        durations = [record.duration for record in records]
+        outcomes: Dict[str, int] = {}
+        for record in records:
+            outcomes[record.outcome] = outcomes.get(record.outcome, 0) + 1
+
+        return {
+            "runs": len(records),
+            "outcomes": outcomes,
+            "last_started_at": records[-1].started_at,
+            "mean_duration": sum(durations) / len(records),
+            "min_duration": min(durations),
+            "max_duration": max(durations),
+            "mean_cpu_time": sum(record.cpu_time for record in records) / len(records),
+            "mean_query_count": sum(record.query_count for record in records)
+            / len(records),
+        }
@@ -0,0 +1,259 @@
+"""Run a single job execution in an isolated child process"""
+
+import multiprocessing
+from multiprocessing.connection import wait
+import time
+import traceback
+from threading import Event
+from typing import Dict, Optional
+
+import django.db
+
+from structlog import get_logger
+
+from job_runner.environment import RunInterrupted, get_environments
+from job_runner.outcomes import (
+    OUTCOME_CRASHED,
+    OUTCOME_ERROR,
+    OUTCOME_INTERRUPTED,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+)
+from job_runner.queries import QueryCounter
+from job_runner.ratelimit import FileRateLimiter, RateLimiter, UnsharedRateLimiter
+from job_runner.routing import reading_from
+
+logger = get_logger(__name__)
+
+ISOLATION_THREAD = "thread"
+ISOLATION_SUBPROCESS = "subprocess"
+ISOLATION_MODES = (ISOLATION_THREAD, ISOLATION_SUBPROCESS)
+
+# How often the parent checks for a stop request while the child is running
+_POLL_INTERVAL = 0.1
+
+# Tags for the messages the child sends to the parent
+_MESSAGE_CURSOR = "cursor"
+_MESSAGE_RESULT = "result"
+
+
+def subprocess_isolation_available() -> bool:
+    """Subprocess isolation relies on fork so the child inherits the Django setup"""
+
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+class IsolatedJobError(Exception):
+    """An isolated job raised an exception and requested fatal errors"""
+
+
+class IsolatedResult:
+    """The result of an isolated run, shaped like a TrackerEnv"""
+
+    def __init__(
+        self,
+        outcome: str,
+        requested_rerun: bool = False,
+        requested_stop: bool = False,
+        requested_fatal_errors: bool = False,
+        error: Optional[str] = None,
+        cpu_time: float = 0.0,
+        query_count: int = 0,
+        query_time: float = 0.0,
+        rows_written: int = 0,
+        flush_time: float = 0.0,
+    ):
+        self.outcome = outcome
+        self.requested_rerun = requested_rerun
+        self.requested_stop = requested_stop
+        self.requested_fatal_errors = requested_fatal_errors
+        self.error = error
+        self.cpu_time = cpu_time
+        self.query_count = query_count
+        self.query_time = query_time
+        self.rows_written = rows_written
+        self.flush_time = flush_time
+
+
+class _PipedCursors(dict):
+    """Chunk positions that are sent to the parent as soon as they move,
+    so they survive the child being killed"""
+
+    def __init__(self, cursors: dict, sender):
+        super().__init__(cursors)
+        self._sender = sender
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._sender.send((_MESSAGE_CURSOR, key, value, True))
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._sender.send((_MESSAGE_CURSOR, key, None, False))
+        return value
+
+
+def _child_main(job, stop_event, sender, state, rate_limits, read_alias, cursors):
+    """Entry point for the forked child process"""
+
+    log = logger.bind(job_name=job.name, isolation=ISOLATION_SUBPROCESS)
+    # The runner's cache isn't shared, since its lock may have been held during the fork
+    run_env, tracker_env = get_environments(
+        stop_event,
+        state,
+        rate_limits=rate_limits,
+        database_alias=job.database_alias,
+        read_alias=read_alias,
+        cursors=_PipedCursors(cursors, sender),
+    )
+    outcome = OUTCOME_SUCCESS
+    error: Optional[str] = None
+    queries = QueryCounter()
+    cpu_started_at = time.process_time()
+
+    try:
+        django.db.reset_queries()
+        with queries.installed(), reading_from(read_alias):
+            job(run_env)
+    except RunInterrupted:
+        outcome = OUTCOME_INTERRUPTED
+    except Exception as exc:
+        log.exception("Isolated job raised an exception", error=str(exc))
+        outcome = OUTCOME_ERROR
+        error = traceback.format_exc()
+    finally:
+        django.db.connections.close_all()
+
+    sender.send(
+        (
+            _MESSAGE_RESULT,
+            outcome,
+            tracker_env.requested_rerun,
+            tracker_env.requested_stop,
+            tracker_env.requested_fatal_errors,
+            error,
+            time.process_time() - cpu_started_at,
+            queries.count,
+            queries.time,
+            tracker_env.rows_written,
+            tracker_env.flush_time,
+        )
+    )
+    sender.close()
+
+
+def _shareable(rate_limits: Dict[str, RateLimiter]) -> Dict[str, RateLimiter]:
+    """Only file backed rate limiters still limit anything in another process.
+    Using any other one fails with an error that says so"""
+
+    return {
+        name: (
+            limiter
+            if isinstance(limiter, FileRateLimiter)
+            else UnsharedRateLimiter(name, limiter.rate, limiter.burst)
+        )
+        for name, limiter in rate_limits.items()
+    }
+
+
+class IsolatedRun:
+    """A single job execution in a forked child process.
+
+    Only the child is killed when the job times out, so the
+    rest of the runner can keep going. Chunk positions the child
+    moves are applied to the given cursors as they arrive"""
+
+    def __init__(
+        self,
+        job,
+        state: Optional[dict] = None,
+        rate_limits: Optional[Dict[str, RateLimiter]] = None,
+        read_alias: Optional[str] = None,
+        cursors: Optional[dict] = None,
+    ):
+        context = multiprocessing.get_context("fork")
+        self.cursors = cursors if cursors is not None else {}
+
+        self._stop = context.Event()
+        self._receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_child_main,
+            args=(
+                job,
+                self._stop,
+                sender,
+                state,
+                _shareable(rate_limits or {}),
+                read_alias,
+                dict(self.cursors),
+            ),
+            name=f"Isolated: {job.name}",
+            daemon=True,
+        )
+        self._sender = sender
+        self.log = logger.bind(job_name=job.name)
+
+    def run(self, stopping: Event, deadline: Optional[float]) -> IsolatedResult:
+        """Run the job to completion, killing it if the deadline passes"""
+
+        self._process.start()
+        # The parent's copy of the sending end must be closed
+        # so a crashed child shows up as an EOF
+        self._sender.close()
+
+        try:
+            return self._wait(stopping, deadline)
+        finally:
+            self._receiver.close()
+
+    def _wait(self, stopping: Event, deadline: Optional[float]) -> IsolatedResult:
+        while True:
+            if stopping.is_set() and not self._stop.is_set():
+                self.log.debug("Forwarding stop request to isolated job")
+                self._stop.set()
+
+            delay = _POLL_INTERVAL
+            if deadline is not None:
+                delay = max(min(delay, deadline - time.monotonic()), 0)
+
+            # Once the child exits, the receiver is readable with the EOF
+            if self._receiver in wait([self._receiver, self._process.sentinel], delay):
+                try:
+                    message = self._receiver.recv()
+                except EOFError:
+                    self._process.join()
+                    return IsolatedResult(
+                        OUTCOME_CRASHED,
+                        error=f"Process exited with code {self._process.exitcode}",
+                    )
+
+                if message[0] == _MESSAGE_RESULT:
+                    self._process.join()
+                    return IsolatedResult(*message[1:])
+
+                self._apply_cursor(*message[1:])
+                continue
+
+            if deadline is not None and time.monotonic() >= deadline:
+                self.log.debug("Killing isolated job process", pid=self._process.pid)
+                self._process.kill()
+                self._process.join()
+                self._drain_cursors()
+                return IsolatedResult(OUTCOME_TIMEOUT)
+
+    def _apply_cursor(self, key, value, present: bool):
+        if present:
+            self.cursors[key] = value
+        else:
+            self.cursors.pop(key, None)
+
+    def _drain_cursors(self):
+        """Apply the positions the killed child sent before it died"""
+
+        try:
+            while self._receiver.poll():
+                message = self._receiver.recv()
+                if message[0] == _MESSAGE_CURSOR:
+                    self._apply_cursor(*message[1:])
+        except EOFError:
+            pass
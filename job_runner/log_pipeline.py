@@ -0,0 +1,201 @@
+"""Keeps logging from dominating the run time of high frequency jobs"""
+
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+from queue import Full, Queue
+import time
+from typing import Callable, List, Optional, Set
+
+from structlog import get_logger
+
+logger = get_logger(__name__)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """Queues records without formatting them.
+
+    The stock QueueHandler formats the message before queueing, which would
+    both keep the cost on the job thread and flatten structlog's event dict
+    before the real handler's formatter gets to see it"""
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+        self._records = queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno >= logging.WARNING:
+            # Anything unusual is always logged, even if it means waiting
+            self._records.put(record)
+            return
+
+        try:
+            self._records.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class AsyncLogSink:
+    """Moves the handlers that job runner logs end up at onto a background thread,
+    so formatting and writing don't happen on the job threads"""
+
+    def __init__(self, logger_name: str = "job_runner", max_size: int = 10000):
+        self._logger_name = logger_name
+        self._max_size = max_size
+        self._target: Optional[logging.Logger] = None
+        self._handlers: List[logging.Handler] = []
+        self._queue_handler: Optional[_RecordQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+
+    def _find_target(self) -> logging.Logger:
+        """Find the logger that actually holds the handlers for our records"""
+
+        current: Optional[logging.Logger] = logging.getLogger(self._logger_name)
+
+        while current:
+            if current.handlers or not current.propagate or not current.parent:
+                return current
+
+            current = current.parent
+
+        return logging.getLogger()
+
+    def start(self):
+        target = self._find_target()
+        queue: Queue = Queue(self._max_size)
+
+        self._target = target
+        self._handlers = list(target.handlers)
+        for handler in self._handlers:
+            target.removeHandler(handler)
+
+        self._queue_handler = _RecordQueueHandler(queue)
+        self._listener = QueueListener(
+            queue, *self._handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        target.addHandler(self._queue_handler)
+        _active_sinks.add(self)
+
+        logger.debug("Asynchronous logging started", logger_name=target.name)
+
+    def stop(self):
+        """Flush all queued records and put the original handlers back"""
+
+        if not self._target or not self._listener or not self._queue_handler:
+            return
+
+        _active_sinks.discard(self)
+        self._target.removeHandler(self._queue_handler)
+        self._listener.stop()
+
+        for handler in self._handlers:
+            self._target.addHandler(handler)
+
+        if self._queue_handler.dropped:
+            logger.warning(
+                "Routine log records were dropped",
+                dropped=self._queue_handler.dropped,
+            )
+
+        self._target = None
+        self._listener = None
+        self._queue_handler = None
+
+    def detach_after_fork(self):
+        """Put the original handlers back in a forked child.
+
+        The listener thread doesn't exist in the child, so anything
+        queued there would never be written"""
+
+        if not self._target or not self._queue_handler:
+            return
+
+        self._target.removeHandler(self._queue_handler)
+        for handler in self._handlers:
+            self._target.addHandler(handler)
+
+        self._target = None
+        self._listener = None
+        self._queue_handler = None
+
+
+_active_sinks: Set[AsyncLogSink] = set()
+
+
+def _detach_sinks_after_fork():
+    for sink in list(_active_sinks):
+        sink.detach_after_fork()
+
+    _active_sinks.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_detach_sinks_after_fork)
+
+
+class RunLogSampler:
+    """Aggregates routine successful runs into a periodic summary line"""
+
+    def __init__(
+        self,
+        log,
+        every_runs: int = 0,
+        every_seconds: float = 0,
+        extra: Optional[Callable[[], dict]] = None,
+    ):
+        self.log = log
+        self._every_runs = every_runs
+        self._every_seconds = every_seconds
+        self._extra = extra
+        self._reset(time.monotonic())
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._every_runs or self._every_seconds)
+
+    def _reset(self, now: float):
+        self._window_started_at = now
+        self._runs = 0
+        self._total_execution_time = 0.0
+        self._max_execution_time = 0.0
+
+    def record(self, execution_time: float):
+        """Record a routine successful run, emitting a summary when due"""
+
+        self._runs += 1
+        self._total_execution_time += execution_time
+        self._max_execution_time = max(self._max_execution_time, execution_time)
+
+        now = time.monotonic()
+
+        if self._every_runs and self._runs >= self._every_runs:
+            self._emit(now)
+        elif self._every_seconds and now - self._window_started_at >= (
+            self._every_seconds
+        ):
+            self._emit(now)
+
+    def flush(self):
+        """Emit whatever has been aggregated so far"""
+
+        if self._runs:
+            self._emit(time.monotonic())
+
+    def _emit(self, now: float):
+        extra = self._extra() if self._extra else {}
+
+        self.log.info(
+            "Job runs summarized",
+            runs=self._runs,
+            window=now - self._window_started_at,
+            total_execution_time=self._total_execution_time,
+            mean_execution_time=self._total_execution_time / self._runs,
+            max_execution_time=self._max_execution_time,
+            **extra,
+        )
+        self._reset(now)
@@ -6,15 +6,38 @@ import sys
 from threading import Event, Thread
 from random import random
 import signal
-from typing import Iterable, List, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set
 
+import django.db
 from django.core.management.base import BaseCommand, CommandParser
 
 from structlog import get_logger
 
-from job_runner.runner import JobThread
+from job_runner.cache import build_runner_cache
+from job_runner.coordination import RestartCoordinator, build_restart_coordinator
+from job_runner.delayed import DelayedTaskRunner, build_delayed_task_runner
+from job_runner.diagnostics import dump_diagnostics
+from job_runner.dispatch import build_dispatcher
+from job_runner.history import DEFAULT_SIZE as DEFAULT_HISTORY_SIZE
+from job_runner.log_pipeline import AsyncLogSink
+from job_runner.phase import PHASE_MODE_SPREAD, PHASE_MODES, compute_phase
+from job_runner.overrides import Override, build_override_monitor
+from job_runner.pool import DEFAULT_POOL_SIZE, WorkerPool
+from job_runner.pressure import build_pressure_monitor
+from job_runner.routing import ROUTER_PATH, router_installed
+from job_runner.runner import JobThread, StopEvent
+from job_runner.schedule import (
+    CATCH_UP_ONCE,
+    CATCH_UP_POLICIES,
+    SavedSchedule,
+    ScheduleStore,
+    build_schedule_store,
+)
+from job_runner.status import StatusServer
+from job_runner.ratelimit import build_rate_limiters
 from job_runner.registration import (
     RegisteredJob,
+    expand_per_database,
     import_default_jobs,
     import_jobs_from_module,
 )
@@ -23,6 +46,9 @@ from job_runner.timeouts import TimeoutTracker
 
 logger = get_logger(__name__)
 
+# How often the main loop checks on retired job threads that are still running
+_REAP_INTERVAL = 1.0
+
 
 class Command(BaseCommand):
     help = "Run all background jobs"
@@ -84,6 +110,224 @@ class Command(BaseCommand):
             help=("When shutting down, how long to wait until a forced exit"),
         )
 
+        parser.add_argument(
+            "--interrupt-after",
+            type=int,
+            default=0,
+            metavar="SECONDS",
+            help=(
+                "When shutting down, how long to wait for jobs to stop on their own "
+                "before forcing a RunInterrupted into them. "
+                "Should be less than the stop timeout to have any effect"
+            ),
+        )
+
+        parser.add_argument(
+            "--async-logging",
+            action="store_const",
+            const=True,
+            default=False,
+            help=(
+                "Format and write job runner logs on a background thread "
+                "instead of on the job threads"
+            ),
+        )
+
+        parser.add_argument(
+            "--log-summary-runs",
+            type=int,
+            default=0,
+            metavar="RUNS",
+            help=(
+                "Instead of logging every successful run, "
+                "log one summary line per job every RUNS successful runs"
+            ),
+        )
+
+        parser.add_argument(
+            "--log-summary-interval",
+            type=float,
+            default=0,
+            metavar="SECONDS",
+            help=(
+                "Instead of logging every successful run, "
+                "log one summary line per job every SECONDS"
+            ),
+        )
+
+        parser.add_argument(
+            "--max-concurrent-jobs",
+            type=int,
+            default=0,
+            metavar="JOBS",
+            help=(
+                "The most jobs that may run at once. When more are due, "
+                "they are started by priority and then by deadline. "
+                "Defaults to no limit"
+            ),
+        )
+
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=DEFAULT_POOL_SIZE,
+            metavar="THREADS",
+            help=(
+                "The number of worker threads shared by jobs that use "
+                "env.map or env.submit. Zero runs that work in the job's "
+                f"own thread. Defaults to {DEFAULT_POOL_SIZE}"
+            ),
+        )
+
+        parser.add_argument(
+            "--delayed-tasks",
+            action="store_true",
+            help=(
+                "Also run one-off tasks added with "
+                "job_runner.delayed.enqueue_at as they come due"
+            ),
+        )
+
+        schedule_group = parser.add_mutually_exclusive_group()
+
+        schedule_group.add_argument(
+            "--schedule-file",
+            default=None,
+            metavar="PATH",
+            help=(
+                "Save when each job last ran and will next run to this file, "
+                "and pick the schedule back up from it at startup"
+            ),
+        )
+
+        schedule_group.add_argument(
+            "--schedule-database",
+            action="store_true",
+            help="Like --schedule-file, but save the schedule in the database",
+        )
+
+        parser.add_argument(
+            "--catch-up",
+            choices=CATCH_UP_POLICIES,
+            default=CATCH_UP_ONCE,
+            help=(
+                "What to do with runs that were missed while the job runner "
+                "was down, when the schedule is saved. Defaults to once"
+            ),
+        )
+
+        override_group = parser.add_mutually_exclusive_group()
+
+        override_group.add_argument(
+            "--overrides-file",
+            default=None,
+            metavar="PATH",
+            help=(
+                "Poll this JSON file for runtime changes to the interval, "
+                "variance, timeout, concurrency or paused state of jobs"
+            ),
+        )
+
+        override_group.add_argument(
+            "--overrides-database",
+            action="store_true",
+            help="Like --overrides-file, but poll the JobOverride table",
+        )
+
+        parser.add_argument(
+            "--diagnostics-file",
+            default=None,
+            metavar="PATH",
+            help=(
+                "Append the diagnostic dump made on SIGUSR1 to this file "
+                "instead of logging it"
+            ),
+        )
+
+        parser.add_argument(
+            "--coordinate-stops",
+            action="store_true",
+            help=(
+                "Only stop for --stop-after once enough other replicas are "
+                "alive and none of them are stopping, using a heartbeat table"
+            ),
+        )
+
+        parser.add_argument(
+            "--min-peers",
+            type=int,
+            default=1,
+            metavar="RUNNERS",
+            help=(
+                "With --coordinate-stops, how many other live replicas are "
+                "needed before this one may stop. Defaults to 1"
+            ),
+        )
+
+        parser.add_argument(
+            "--status-port",
+            type=int,
+            default=None,
+            metavar="PORT",
+            help=(
+                "Serve the live state of the job runner as JSON "
+                "over HTTP on this port"
+            ),
+        )
+
+        parser.add_argument(
+            "--status-host",
+            default="127.0.0.1",
+            metavar="HOST",
+            help="The address for the status endpoint to listen on",
+        )
+
+        parser.add_argument(
+            "--status-socket",
+            default=None,
+            metavar="PATH",
+            help="Serve the status endpoint on a Unix socket instead of a port",
+        )
+
+        parser.add_argument(
+            "--history-size",
+            type=int,
+            default=DEFAULT_HISTORY_SIZE,
+            metavar="RUNS",
+            help=(
+                "How many of the most recent runs of each job to keep "
+                "in memory for statistics. Set to 0 to disable"
+            ),
+        )
+
+        parser.add_argument(
+            "--phase-mode",
+            choices=PHASE_MODES,
+            default="random",
+            help=(
+                "How to pick when each job first runs. random delays the first run "
+                "by up to the job's variance. spread gives every job on every "
+                "replica its own evenly spaced offset into its interval "
+                "and keeps it there, ignoring variance"
+            ),
+        )
+
+        parser.add_argument(
+            "--replica-index",
+            type=int,
+            default=0,
+            metavar="INDEX",
+            help="The zero-based index of this job runner among its replicas",
+        )
+
+        parser.add_argument(
+            "--replica-count",
+            type=int,
+            default=1,
+            metavar="COUNT",
+            help="The total number of job runner replicas",
+        )
+
         parser.add_argument(
             "--trial-run",
             action="store_const",
@@ -113,6 +357,28 @@ class Command(BaseCommand):
         stop_after: int = 0,
         stop_variance: int = 0,
         stop_timeout: int = 5,
+        interrupt_after: int = 0,
+        async_logging: bool = False,
+        log_summary_runs: int = 0,
+        log_summary_interval: float = 0,
+        max_concurrent_jobs: int = 0,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        delayed_tasks: bool = False,
+        schedule_file: Optional[str] = None,
+        schedule_database: bool = False,
+        catch_up: str = CATCH_UP_ONCE,
+        overrides_file: Optional[str] = None,
+        overrides_database: bool = False,
+        diagnostics_file: Optional[str] = None,
+        coordinate_stops: bool = False,
+        min_peers: int = 1,
+        status_port: Optional[int] = None,
+        status_host: str = "127.0.0.1",
+        status_socket: Optional[str] = None,
+        history_size: int = DEFAULT_HISTORY_SIZE,
+        phase_mode: str = "random",
+        replica_index: int = 0,
+        replica_count: int = 1,
         include_jobs: List[str] = [],
         exclude_jobs: List[str] = [],
         trial_run: bool = False,
@@ -122,17 +388,31 @@ class Command(BaseCommand):
     ):
         log = logger.bind()
 
+        if not 0 <= replica_index < replica_count:
+            log.error(
+                "Replica index must be less than the replica count",
+                replica_index=replica_index,
+                replica_count=replica_count,
+            )
+            sys.exit(1)
+
+        def load_jobs(reload: bool = False) -> Set[RegisteredJob]:
+            if include_jobs:
+                jobs = get_jobs_for_included_names(set(include_jobs), reload)
+            elif exclude_jobs:
+                jobs = get_jobs_for_excluded_names(set(exclude_jobs), reload)
+            else:
+                jobs = import_default_jobs(reload)
+
+            return expand_per_database(jobs)
+
         if include_jobs:
             log.debug("Using job inclusion handler", include_jobs=include_jobs)
-            try:
-                jobs = get_jobs_for_included_names(set(include_jobs))
-            except InvalidJobName as exc:
-                log.error("Included job name was invalid", job_name=exc.job_name)
-                sys.exit(1)
-        elif exclude_jobs:
-            jobs = get_jobs_for_excluded_names(set(exclude_jobs))
-        else:
-            jobs = import_default_jobs()
+        try:
+            jobs = load_jobs()
+        except InvalidJobName as exc:
+            log.error("Included job name was invalid", job_name=exc.job_name)
+            sys.exit(1)
 
         job_names = {job.name for job in jobs}
 
@@ -143,7 +423,7 @@ class Command(BaseCommand):
 
         # Confirm all included jobs are there. If not, error
         for job_name in include_jobs:
-            if job_name not in job_names:
+            if job_name not in {job.base_name for job in jobs}:
                 log.error("Included job does not exist", job_name=job_name)
                 sys.exit(1)
 
@@ -165,6 +445,18 @@ class Command(BaseCommand):
                     error=str(exc),
                 )
 
+        read_aliases = {job.read_using for job in jobs if job.read_using}
+        for alias in sorted(read_aliases):
+            if alias not in django.db.connections:
+                jobs_ok = False
+                log.error("Read replica alias is not in DATABASES", read_using=alias)
+
+        if read_aliases and not router_installed():
+            log.warning(
+                "Jobs use read_using, but the job read router is not installed",
+                router=ROUTER_PATH,
+            )
+
         if not jobs_ok:
             sys.exit(1)
 
@@ -174,68 +466,288 @@ class Command(BaseCommand):
                 print(f"\tInterval: {job.interval}")
                 print(f"\tVariance: {job.variance}")
                 print(f"\tTimeout: {job.timeout}")
+                print(f"\tIsolation: {job.isolation}")
+                print(f"\tPriority: {job.priority}")
+                print(f"\tDeadline: {job.deadline}")
+                print(f"\tConcurrency group: {job.concurrency_group}")
+                print(f"\tRerun budget: {job.rerun_budget} per {job.rerun_window}")
+                print(f"\tShare: {job.share}")
+                print(
+                    f"\tFailure backoff: {job.failure_backoff} up to {job.max_backoff}"
+                )
+                print(
+                    f"\tCircuit: opens after {job.circuit_threshold} failures "
+                    f"for {job.circuit_reset}"
+                )
+                if job.database_alias is not None:
+                    print(f"\tDatabase: {job.database_alias}")
+                if job.read_using:
+                    print(f"\tRead using: {job.read_using}")
 
         if trial_run:
             return
 
-        request_stop = Event()
+        log_sink: Optional[AsyncLogSink] = None
+        if async_logging:
+            log_sink = AsyncLogSink()
+            log_sink.start()
 
-        # Signals can throw extra stuff into args and kwargs that we don't care about.
-        # Wrap their handlers up to just call the coordinator stop
-        def stop_signal_handler(*args, **kwargs):
-            request_stop.set()
+        status_server: Optional[StatusServer] = None
+        pool: Optional[WorkerPool] = None
 
-        timeout_tracker = TimeoutTracker(request_stop)
-        timeout_tracker.daemon = True
-        timeout_tracker.start()
-        got_fatal = Event()
+        try:
+            request_stop = StopEvent()
+
+            # Signals can throw extra stuff into args and kwargs that we don't care about.
+            # Wrap their handlers up to just call the coordinator stop
+            def stop_signal_handler(*args, **kwargs):
+                request_stop.set(notify=False)
+                main_wakeup.set()
+
+            timeout_tracker = TimeoutTracker(request_stop)
+            timeout_tracker.daemon = True
+            timeout_tracker.start()
+            got_fatal = Event()
+
+            def on_fatal():
+                log.error("A job runner failed fatally")
+                got_fatal.set()
+                request_stop.set()
 
-        def on_fatal():
-            log.error("A job runner failed fatally")
-            got_fatal.set()
-            request_stop.set()
+            pressure = build_pressure_monitor(request_stop)
+            if pressure:
+                # Take a first reading so jobs don't start before it is known
+                pressure.poll()
+                pressure.daemon = True
+                pressure.start()
+
+            dispatcher = build_dispatcher(request_stop, max_concurrent_jobs)
+            if dispatcher:
+                dispatcher.start()
+
+            if pool_size:
+                pool = WorkerPool(pool_size, dispatcher)
+
+            cache = build_runner_cache(request_stop)
+            rate_limits = build_rate_limiters()
+
+            schedule_store = build_schedule_store(schedule_file, schedule_database)
+            saved_schedules = schedule_store.load() if schedule_store else {}
+
+            threads: List[JobThread] = []
+            retired: List[JobThread] = []
+
+            def on_override_change(job_name: str, override: Optional[Override]):
+                for thread in threads:
+                    if thread.job.name == job_name:
+                        thread.apply_override(override)
+
+            overrides = build_override_monitor(
+                request_stop, on_override_change, overrides_file, overrides_database
+            )
+            if overrides:
+                # Take a first reading so jobs start with their overrides
+                overrides.poll()
+                overrides.daemon = True
+                overrides.start()
+
+            # Woken for a stop, or for a reload of the jobs
+            main_wakeup = Event()
+            request_stop.add_listener(main_wakeup.set)
+            reload_requested = Event()
+
+            def reload_signal_handler(*args, **kwargs):
+                reload_requested.set()
+                main_wakeup.set()
+
+            dump_requested = Event()
+
+            def dump_signal_handler(*args, **kwargs):
+                dump_requested.set()
+                main_wakeup.set()
+
+            signal.signal(signal.SIGINT, stop_signal_handler)
+            signal.signal(signal.SIGTERM, stop_signal_handler)
+            signal.signal(signal.SIGQUIT, stop_signal_handler)
+            signal.signal(signal.SIGHUP, reload_signal_handler)
+            signal.signal(signal.SIGUSR1, dump_signal_handler)
+
+            def start_job_thread(job: RegisteredJob) -> JobThread:
+                phase: Optional[float] = None
+                if phase_mode == PHASE_MODE_SPREAD:
+                    phase = compute_phase(
+                        job.name, job_names, replica_index, replica_count
+                    )
+
+                runner = JobThread(
+                    job,
+                    request_stop,
+                    on_fatal,
+                    timeout_tracker,
+                    log_summary_runs=log_summary_runs,
+                    log_summary_interval=log_summary_interval,
+                    phase=phase,
+                    pressure=pressure,
+                    dispatcher=dispatcher,
+                    history_size=history_size,
+                    cache=cache,
+                    pool=pool,
+                    rate_limits=rate_limits,
+                    schedule_store=schedule_store,
+                    saved_schedule=saved_schedules.get(job.name),
+                    catch_up=catch_up,
+                    override=overrides.get(job.name) if overrides else None,
+                )
+                runner.daemon = True
+                runner.start()
+                return runner
+
+            for job in jobs:
+                threads.append(start_job_thread(job))
+
+            delayed: Optional[DelayedTaskRunner] = None
+            if delayed_tasks:
+                delayed = build_delayed_task_runner(request_stop)
+                delayed.daemon = True
+                delayed.start()
+
+            coordinator: Optional[RestartCoordinator] = None
+            if coordinate_stops:
+                coordinator = build_restart_coordinator(request_stop, min_peers)
+                coordinator.daemon = True
+                coordinator.start()
+
+            if stop_after:
+                final_delay = stop_after + stop_variance * random()
+                log.info("Job runner stop registered", run_time=final_delay)
+
+                def stop_callback():
+                    if coordinator:
+                        coordinator.request_restart()
+                        return
+
+                    log.info("Setting stop event due to stop timeout")
+                    request_stop.set()
+
+                timeout_tracker.add_timeout(
+                    timedelta(seconds=final_delay), stop_callback, name="stop after"
+                )
 
-        signal.signal(signal.SIGINT, stop_signal_handler)
-        signal.signal(signal.SIGTERM, stop_signal_handler)
-        signal.signal(signal.SIGQUIT, stop_signal_handler)
+            if status_port is not None or status_socket:
+
+                def collect_status() -> dict:
+                    return {
+                        "stopping": request_stop.is_set(),
+                        "jobs": [thread.snapshot() for thread in threads],
+                        "timeouts": timeout_tracker.snapshot(),
+                        "pressure": pressure.stretch if pressure else None,
+                        "dispatch_lag": (
+                            dispatcher.lag_stats() if dispatcher else None
+                        ),
+                        "cache": cache.stats(),
+                        "pool": pool.stats() if pool else None,
+                        "delayed_tasks": delayed.stats() if delayed else None,
+                        "coordinator": coordinator.stats() if coordinator else None,
+                    }
+
+                status_server = StatusServer(
+                    collect_status,
+                    port=status_port,
+                    host=status_host,
+                    socket_path=status_socket,
+                )
+                status_server.start()
+
+            log.info("All jobs have been started")
+            overdue: Set[JobThread] = set()
+            while True:
+                # Retired threads finish in the background, and are checked on here
+                main_wakeup.wait(_REAP_INTERVAL if retired else None)
+                main_wakeup.clear()
+                reap_retired(log, retired, overdue, stop_timeout)
+
+                if request_stop.is_set():
+                    # Signal handlers leave halting the job threads to us
+                    request_stop.notify_listeners()
+                    break
+
+                if dump_requested.is_set():
+                    dump_requested.clear()
+                    dump_diagnostics(log, threads, timeout_tracker, diagnostics_file)
+
+                if reload_requested.is_set():
+                    reload_requested.clear()
+                    retired += reload_jobs(
+                        log,
+                        threads,
+                        load_jobs,
+                        start_job_thread,
+                        job_names,
+                        schedule_store,
+                        saved_schedules,
+                    )
+
+            log.info("Beginning job runner shutdown")
+
+            if coordinator:
+                coordinator.leave()
+
+            shutdown_started_at = time.monotonic()
+            log.info("Waiting for all jobs to stop", timeout=stop_timeout)
+
+            if interrupt_after:
+                interrupt_stuck_threads(
+                    log,
+                    threads + retired,
+                    interrupt_after - (time.monotonic() - shutdown_started_at),
+                    shutdown_started_at + stop_timeout,
+                )
 
-        threads: List[JobThread] = []
+            for thread in threads + retired:
+                time_left = stop_timeout - (time.monotonic() - shutdown_started_at)
 
-        for job in jobs:
-            runner = JobThread(job, request_stop, on_fatal, timeout_tracker)
-            runner.daemon = True
-            threads.append(runner)
-            runner.start()
+                thread.join(timeout=time_left)
+                if thread.is_alive():
+                    log_alive_threads_and_exit(log, threads + retired)
 
-        if stop_after:
-            final_delay = stop_after + stop_variance * random()
-            log.info("Job runner stop registered", run_time=final_delay)
+            if delayed:
+                delayed.join(stop_timeout - (time.monotonic() - shutdown_started_at))
+                if delayed.is_alive():
+                    log.error("Delayed task runner is still running")
+                    log_alive_threads_and_exit(log, threads + retired)
 
-            def stop_callback():
-                log.info("Setting stop event due to stop timeout")
-                request_stop.set()
+            log.info("All jobs have stopped")
 
-            timeout_tracker.add_timeout(timedelta(seconds=final_delay), stop_callback)
+            if coordinator:
+                coordinator.unregister()
 
-        log.info("All jobs have been started")
-        request_stop.wait()
-        log.info("Beginning job runner shutdown")
+            for thread in threads:
+                thread.save_schedule()
 
-        shutdown_started_at = time.monotonic()
-        log.info("Waiting for all jobs to stop", timeout=stop_timeout)
+            if print_jobs:
+                print_job_history(threads)
 
-        for thread in threads:
-            time_left = stop_timeout - (time.monotonic() - shutdown_started_at)
+            if dispatcher:
+                log.info("Dispatch lag by priority", lag=dispatcher.lag_stats())
 
-            thread.join(timeout=time_left)
-            if thread.is_alive():
-                log_alive_threads_and_exit(log, threads)
+            log.info("Runner cache statistics", **cache.stats())
 
-        log.info("All jobs have stopped")
+            if pool:
+                log.info("Worker pool statistics", **pool.stats())
 
-        if got_fatal.is_set():
-            log.warning("A fatal error was thrown from a job, exiting with code 1")
-            sys.exit(1)
+            if got_fatal.is_set():
+                log.warning("A fatal error was thrown from a job, exiting with code 1")
+                sys.exit(1)
+        finally:
+            # Also reached when jobs are stuck, which can leave pool calls running
+            if pool:
+                pool.shutdown()
+
+            if status_server:
+                status_server.stop()
+
+            if log_sink:
+                log_sink.stop()
 
 
 class InvalidJobName(ValueError):
@@ -259,27 +771,158 @@ def get_module_names_for_included_jobs(names: Set[str]) -> Set[str]:
     return {_get_module_name(name) for name in names}
 
 
-def get_jobs_for_included_names(names: Set[str]) -> Set[RegisteredJob]:
+def get_jobs_for_included_names(
+    names: Set[str], reload: bool = False
+) -> Set[RegisteredJob]:
     module_names = get_module_names_for_included_jobs(names)
 
     jobs: Set[RegisteredJob] = set()
 
     for module_name in module_names:
         try:
-            for job in import_jobs_from_module(module_name):
+            for job in import_jobs_from_module(module_name, reload):
                 jobs.add(job)
         except ModuleNotFoundError:
+            if reload and module_name in sys.modules:
+                raise
             logger.warning("Module not found during import", module_name=module_name)
 
     return {job for job in jobs if job.name in names}
 
 
-def get_jobs_for_excluded_names(names: Set[str]) -> Set[RegisteredJob]:
-    default_jobs = import_default_jobs()
+def get_jobs_for_excluded_names(
+    names: Set[str], reload: bool = False
+) -> Set[RegisteredJob]:
+    default_jobs = import_default_jobs(reload)
 
     return {job for job in default_jobs if job.name not in names}
 
 
+def reload_jobs(
+    log,
+    threads: List[JobThread],
+    load_jobs: Callable[[bool], Set[RegisteredJob]],
+    start_job_thread: Callable[[RegisteredJob], JobThread],
+    job_names: Set[str],
+    schedule_store: Optional[ScheduleStore] = None,
+    saved_schedules: Optional[Dict[str, SavedSchedule]] = None,
+) -> List[JobThread]:
+    """Re-import the jobs and bring the running threads in line with them.
+
+    Threads of removed jobs are retired, new jobs get a thread, and the rest
+    pick up the reloaded job in place. The threads list, job names and saved
+    schedules that new threads start from are updated in place. The retired
+    threads are returned without waiting for them to finish their runs"""
+
+    log.info("Reloading jobs")
+
+    try:
+        jobs = {job.name: job for job in load_jobs(True)}
+    except Exception as exc:
+        log.exception("Job reload failed, keeping the current jobs", error=str(exc))
+        return []
+
+    for name, job in list(jobs.items()):
+        try:
+            job.check_callable_valid()
+        except TypeError as exc:
+            log.error("Reloaded job is not callable", job_name=name, error=str(exc))
+            del jobs[name]
+
+    running = {thread.job.name: thread for thread in threads}
+    removed = [thread for name, thread in running.items() if name not in jobs]
+    for thread in removed:
+        thread.retire()
+        threads.remove(thread)
+
+    job_names.clear()
+    job_names.update(jobs)
+
+    if schedule_store and saved_schedules is not None:
+        # New jobs may have a schedule saved by an earlier job runner
+        try:
+            saved_schedules.clear()
+            saved_schedules.update(schedule_store.load())
+        except Exception as exc:
+            log.warning("Could not load the saved schedules", error=str(exc))
+
+    for name, job in jobs.items():
+        if name in running:
+            running[name].update_job(job)
+        else:
+            log.info("Starting new job", job_name=name)
+            threads.append(start_job_thread(job))
+
+    log.info(
+        "Jobs reloaded",
+        running=sorted(thread.job.name for thread in threads),
+        retired=sorted(thread.job.name for thread in removed),
+    )
+    return removed
+
+
+def reap_retired(
+    log, retired: List[JobThread], overdue: Set[JobThread], stop_timeout: float
+):
+    """Forget retired threads that have stopped, and warn once about any
+    that are still running after the stop timeout"""
+
+    now = time.monotonic()
+
+    for thread in list(retired):
+        if not thread.is_alive():
+            log.info("Retired job stopped", job_name=thread.job.name)
+            retired.remove(thread)
+            overdue.discard(thread)
+        elif (
+            thread not in overdue
+            and thread.retired_at is not None
+            and now - thread.retired_at > stop_timeout
+        ):
+            log.warning("Retired job is still running", job_name=thread.job.name)
+            overdue.add(thread)
+
+
+def interrupt_stuck_threads(
+    log, threads: Iterable[JobThread], grace: float, stop_deadline: float
+):
+    """Give all threads the grace period to stop, then interrupt any still running.
+
+    The grace period ends by the stop deadline at the latest, and nothing is
+    interrupted once the deadline has passed"""
+
+    time_left = max(0.0, stop_deadline - time.monotonic())
+    if not time_left:
+        return
+
+    grace_ends_at = time.monotonic() + min(grace, time_left)
+
+    for thread in threads:
+        thread.join(timeout=grace_ends_at - time.monotonic())
+
+    for thread in threads:
+        if thread.is_alive() and thread.interrupt():
+            log.warning("Forced interruption of stuck job", job_name=thread.job.name)
+
+
+def print_job_history(threads: Iterable[JobThread]):
+    for thread in sorted(threads, key=lambda thread: thread.job.name):
+        stats = thread.history.stats()
+
+        print(thread.job.name)
+        print(f"\tRecent runs: {stats['runs']}")
+        if not stats["runs"]:
+            continue
+
+        print(f"\tOutcomes: {stats['outcomes']}")
+        print(
+            f"\tDuration: mean {stats['mean_duration']:.3f}s, "
+            f"min {stats['min_duration']:.3f}s, max {stats['max_duration']:.3f}s"
+        )
+        print(f"\tMean CPU time: {stats['mean_cpu_time']:.3f}s")
+        print(f"\tMean queries: {stats['mean_query_count']:.1f}")
+
+
 def log_alive_threads_and_exit(log, threads: Iterable[JobThread]):
     for thread in threads:
         if thread.is_alive():
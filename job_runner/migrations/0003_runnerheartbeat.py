@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_runner", "0002_jobschedule"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RunnerHeartbeat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("runner_id", models.CharField(max_length=255, unique=True)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("last_seen_at", models.DateTimeField(db_index=True)),
+                ("stopping_since", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_runner", "0003_runnerheartbeat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobOverride",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("job_name", models.CharField(max_length=255, unique=True)),
+                ("interval", models.FloatField(blank=True, null=True)),
+                ("variance", models.FloatField(blank=True, null=True)),
+                ("timeout", models.FloatField(blank=True, null=True)),
+                ("concurrency", models.PositiveIntegerField(blank=True, null=True)),
+                ("paused", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
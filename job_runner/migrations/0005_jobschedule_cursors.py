@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_runner", "0004_joboverride"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobschedule",
+            name="cursors",
+            field=models.TextField(default="{}"),
+        ),
+    ]
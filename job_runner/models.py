@@ -0,0 +1,59 @@
+from django.db import models
+
+
+class DelayedTask(models.Model):
+    """A single call to a function, to be made by the job runner at a given time"""
+
+    func_path = models.CharField(max_length=255)
+    # JSON encoded, to keep supporting databases without a JSON type
+    args = models.TextField(default="[]")
+    kwargs = models.TextField(default="{}")
+    due_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.func_path} at {self.due_at}"
+
+
+class JobSchedule(models.Model):
+    """When a job last ran and should next run, kept across job runner restarts"""
+
+    job_name = models.CharField(max_length=255, unique=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    next_run_at = models.DateTimeField()
+    # JSON encoded, to keep supporting databases without a JSON type
+    cursors = models.TextField(default="{}")
+
+    def __str__(self):
+        return self.job_name
+
+
+class RunnerHeartbeat(models.Model):
+    """A live job runner, used to coordinate restarts between replicas"""
+
+    runner_id = models.CharField(max_length=255, unique=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(db_index=True)
+    stopping_since = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.runner_id
+
+
+class JobOverride(models.Model):
+    """Settings for a job that replace its registered ones while the runner is running"""
+
+    job_name = models.CharField(max_length=255, unique=True)
+    # All in seconds. Empty values keep the registered setting
+    interval = models.FloatField(null=True, blank=True)
+    variance = models.FloatField(null=True, blank=True)
+    timeout = models.FloatField(null=True, blank=True)
+    concurrency = models.PositiveIntegerField(null=True, blank=True)
+    paused = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.job_name
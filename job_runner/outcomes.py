@@ -0,0 +1,8 @@
+"""The possible outcomes of a single job execution"""
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_INTERRUPTED = "interrupted"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CRASHED = "crashed"
+OUTCOME_SKIPPED = "skipped"
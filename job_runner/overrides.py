@@ -0,0 +1,197 @@
+"""Settings for individual jobs that operators can change while the runner is running"""
+
+from datetime import timedelta
+import json
+import os
+from threading import Event, Thread
+from typing import Callable, Dict, Optional
+
+import django.db
+from django.conf import settings
+
+from structlog import get_logger
+
+from job_runner.models import JobOverride
+
+logger = get_logger(__name__)
+
+DEFAULT_POLL_INTERVAL = 10.0
+
+
+def _seconds(value: Optional[float]) -> Optional[timedelta]:
+    return timedelta(seconds=value) if value is not None else None
+
+
+class Override:
+    """Replacements for a job's registered settings. None keeps the registered value"""
+
+    __slots__ = ("interval", "variance", "timeout", "concurrency", "paused")
+
+    def __init__(
+        self,
+        interval: Optional[timedelta] = None,
+        variance: Optional[timedelta] = None,
+        timeout: Optional[timedelta] = None,
+        concurrency: Optional[int] = None,
+        paused: bool = False,
+    ):
+        self.interval = interval
+        self.variance = variance
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.paused = paused
+
+    @classmethod
+    def from_seconds(cls, options: dict) -> "Override":
+        return cls(
+            interval=_seconds(options.get("interval")),
+            variance=_seconds(options.get("variance")),
+            timeout=_seconds(options.get("timeout")),
+            concurrency=options.get("concurrency"),
+            paused=bool(options.get("paused", False)),
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "interval": self.interval.total_seconds() if self.interval else None,
+            "variance": self.variance.total_seconds() if self.variance else None,
+            "timeout": self.timeout.total_seconds() if self.timeout else None,
+            "concurrency": self.concurrency,
+            "paused": self.paused,
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Override) and self.as_dict() == other.as_dict()
+
+
+class OverrideStore:
+    def load(self) -> Dict[str, Override]:
+        raise NotImplementedError()
+
+
+class FileOverrideStore(OverrideStore):
+    """Reads overrides from a local JSON file of job names to settings in seconds.
+
+    The file is only parsed again when its modification time changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._overrides: Dict[str, Override] = {}
+
+    def load(self) -> Dict[str, Override]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            self._mtime = None
+            self._overrides = {}
+            return {}
+
+        if mtime != self._mtime:
+            with open(self.path) as override_file:
+                data = json.load(override_file)
+
+            self._overrides = {
+                job_name: Override.from_seconds(options)
+                for job_name, options in data.items()
+            }
+            self._mtime = mtime
+
+        return dict(self._overrides)
+
+
+class DatabaseOverrideStore(OverrideStore):
+    """Reads overrides from the JobOverride model"""
+
+    def load(self) -> Dict[str, Override]:
+        django.db.close_old_connections()
+
+        return {
+            row.job_name: Override(
+                interval=_seconds(row.interval),
+                variance=_seconds(row.variance),
+                timeout=_seconds(row.timeout),
+                concurrency=row.concurrency,
+                paused=row.paused,
+            )
+            for row in JobOverride.objects.all()
+        }
+
+
+class OverrideMonitor(Thread):
+    """Polls the override store, and passes every change on to the job threads"""
+
+    def __init__(
+        self,
+        store: OverrideStore,
+        stop: Event,
+        on_change: Callable[[str, Optional[Override]], None],
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.store = store
+        self.interval = interval
+        self._on_change = on_change
+        self._stop_evt = stop
+        self._log = logger.bind(process="override monitor")
+
+        # Replaced, never changed in place, so it can be read without locking
+        self.overrides: Dict[str, Override] = {}
+
+        super().__init__(name="Override monitor")
+
+    def poll(self):
+        try:
+            overrides = self.store.load()
+        except Exception as exc:
+            # Keep the last known overrides rather than dropping them
+            self._log.warning("Could not load job overrides", error=str(exc))
+            return
+
+        previous, self.overrides = self.overrides, overrides
+
+        for job_name in sorted(set(previous) | set(overrides)):
+            before = previous.get(job_name)
+            after = overrides.get(job_name)
+            if before == after:
+                continue
+
+            self._log.info(
+                "Job override changed",
+                job_name=job_name,
+                before=before.as_dict() if before else None,
+                after=after.as_dict() if after else None,
+            )
+            self._on_change(job_name, after)
+
+    def get(self, job_name: str) -> Optional[Override]:
+        return self.overrides.get(job_name)
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval):
+            self.poll()
+
+        self._log.info("Override monitor exiting")
+
+
+def build_override_monitor(
+    stop: Event,
+    on_change: Callable[[str, Optional[Override]], None],
+    path: Optional[str],
+    use_database: bool,
+) -> Optional[OverrideMonitor]:
+    store: OverrideStore
+    if use_database:
+        store = DatabaseOverrideStore()
+    elif path:
+        store = FileOverrideStore(path)
+    else:
+        return None
+
+    return OverrideMonitor(
+        store,
+        stop,
+        on_change,
+        interval=getattr(
+            settings, "JOB_RUNNER_OVERRIDE_POLL_INTERVAL", DEFAULT_POLL_INTERVAL
+        ),
+    )
@@ -0,0 +1,34 @@
+"""Deterministic phase assignment, to spread job start times evenly"""
+
+from typing import Iterable
+
+PHASE_MODE_RANDOM = "random"
+PHASE_MODE_SPREAD = "spread"
+PHASE_MODES = (PHASE_MODE_RANDOM, PHASE_MODE_SPREAD)
+
+
+def compute_phase(
+    job_name: str,
+    job_names: Iterable[str],
+    replica_index: int = 0,
+    replica_count: int = 1,
+) -> float:
+    """Get the fraction of its interval that a job should be offset by.
+
+    Every job on every replica gets its own evenly spaced slot, so with
+    n jobs and r replicas the slots are 1 / (n * r) of an interval apart"""
+
+    names = sorted(set(job_names))
+    position = names.index(job_name)
+
+    return (position + replica_index / replica_count) / len(names)
+
+
+def delay_until_phase(interval: float, phase: float, now: float) -> float:
+    """How long from now (wall clock seconds) until the next
+    time that lines up with the phase of the interval"""
+
+    if interval <= 0:
+        return 0
+
+    return (phase * interval - now) % interval
@@ -0,0 +1,218 @@
+"""A worker pool owned by the job runner, for fanning work out from inside a job"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from queue import SimpleQueue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterable, List, Optional, Set
+
+import django.db
+
+from job_runner.dispatch import Dispatcher, Slot
+from job_runner.environment import RunInterrupted
+from job_runner.registration import RegisteredJob
+from job_runner.routing import current_read_alias, reading_from
+
+DEFAULT_POOL_SIZE = 4
+
+# How often a job waiting on the pool checks for a stop request
+_POLL_INTERVAL = 0.1
+
+
+class _DaemonExecutor:
+    """A fixed set of daemon threads running submitted calls.
+
+    Unlike ThreadPoolExecutor, a call that never returns can't keep
+    the process alive after the job runner gives up on it"""
+
+    def __init__(self, size: int, name: str):
+        self._tasks: SimpleQueue = SimpleQueue()
+        self._shutdown = False
+        self._threads = [
+            Thread(target=self._work, name=f"{name}_{index}", daemon=True)
+            for index in range(size)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func: Callable, *args) -> Future:
+        if self._shutdown:
+            raise RuntimeError("Cannot submit to a pool that has been shut down")
+
+        future: Future = Future()
+        self._tasks.put((future, func, args))
+        return future
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+
+            future, func, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = func(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def shutdown(self):
+        """Stop the threads once the calls already submitted have run"""
+
+        self._shutdown = True
+        for _ in self._threads:
+            self._tasks.put(None)
+
+
+class WorkerPool:
+    """Threads shared by every job in the runner.
+
+    When the runner limits concurrency, each task needs a free run slot
+    to go to the pool. Tasks that can't get one run in the job's own thread"""
+
+    def __init__(
+        self, size: int = DEFAULT_POOL_SIZE, dispatcher: Optional[Dispatcher] = None
+    ):
+        self.size = size
+        self._dispatcher = dispatcher
+        self._executor = _DaemonExecutor(size, "Job pool")
+
+        self._lock = Lock()
+        self.submitted = 0
+        self.inline = 0
+
+    def for_job(self, job: RegisteredJob, stop: Event) -> "JobPool":
+        return JobPool(self, job, stop)
+
+    def _run_task(
+        self,
+        stop: Event,
+        slot: Optional[Slot],
+        read_alias: Optional[str],
+        func: Callable,
+        args,
+        kwargs,
+    ) -> Any:
+        try:
+            if stop.is_set():
+                raise RunInterrupted()
+
+            # Reads go where they would have gone from the job's own thread
+            with reading_from(read_alias):
+                return func(*args, **kwargs)
+        finally:
+            # Only closes the connections that belong to this thread
+            django.db.connections.close_all()
+
+            if slot and self._dispatcher:
+                self._dispatcher.release(slot)
+
+    def submit(
+        self, job: RegisteredJob, stop: Event, func: Callable, *args, **kwargs
+    ) -> Future:
+        slot: Optional[Slot] = None
+        if self._dispatcher:
+            slot = self._dispatcher.try_acquire(job)
+
+        if self._dispatcher and not slot:
+            with self._lock:
+                self.inline += 1
+
+            return _run_inline(stop, func, args, kwargs)
+
+        with self._lock:
+            self.submitted += 1
+
+        return self._executor.submit(
+            self._run_task, stop, slot, current_read_alias(), func, args, kwargs
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "submitted": self.submitted,
+                "inline": self.inline,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class JobPool:
+    """The worker pool as seen by a single job"""
+
+    def __init__(self, pool: WorkerPool, job: RegisteredJob, stop: Event):
+        self._pool = pool
+        self._job = job
+        self._stop = stop
+        # The most calls map may have in flight at once, set by runtime overrides
+        self.max_workers: Optional[int] = None
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        return self._pool.submit(self._job, self._stop, func, *args, **kwargs)
+
+    def map(
+        self, func: Callable, items: Iterable, max_workers: Optional[int] = None
+    ) -> List[Any]:
+        """Call func on every item, returning the results in order.
+
+        The first exception raised by a call is raised here, and any calls
+        that haven't started yet are cancelled"""
+
+        futures: List[Future] = []
+        pending: Set[Future] = set()
+
+        if self.max_workers:
+            max_workers = min(max_workers or self.max_workers, self.max_workers)
+
+        try:
+            for item in items:
+                while max_workers and len(pending) >= max_workers:
+                    pending = self._wait(pending)
+
+                future = self.submit(func, item)
+                futures.append(future)
+                pending.add(future)
+
+            while pending:
+                pending = self._wait(pending)
+        finally:
+            for future in futures:
+                future.cancel()
+
+        return [future.result() for future in futures]
+
+    def _wait(self, pending: Set[Future]) -> Set[Future]:
+        """Wait for at least one future to finish, raising its exception if it failed"""
+
+        while True:
+            if self._stop.is_set():
+                raise RunInterrupted()
+
+            done, pending = wait(pending, _POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                future.result()
+
+            if done:
+                return pending
+
+
+def _run_inline(stop: Event, func: Callable, args, kwargs) -> Future:
+    future: Future = Future()
+
+    if stop.is_set():
+        raise RunInterrupted()
+
+    try:
+        future.set_result(func(*args, **kwargs))
+    except RunInterrupted:
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+
+    return future
@@ -0,0 +1,184 @@
+"""Pressure probes, used to hold off jobs while the system is saturated"""
+
+import os
+import time
+from threading import Event, Thread
+from typing import Iterable, List, Optional
+
+import django.db
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from structlog import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_MAX_STRETCH = 4.0
+DEFAULT_EXEMPT_PRIORITY = 1
+
+
+class PressureProbe:
+    """Measures one source of pressure.
+
+    A measurement of 1 means the probe's threshold has been reached,
+    and higher values mean proportionally more pressure"""
+
+    name = "probe"
+
+    def measure(self) -> float:
+        raise NotImplementedError()
+
+
+class LoadAverageProbe(PressureProbe):
+    """Pressure from the one minute load average, per CPU"""
+
+    name = "load_average"
+
+    def __init__(self, threshold: float = 1.0):
+        self._threshold = threshold
+
+    def measure(self) -> float:
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        return load / self._threshold
+
+
+class CgroupThrottleProbe(PressureProbe):
+    """Pressure from the fraction of cgroup CPU periods that were throttled"""
+
+    name = "cgroup_throttle"
+
+    def __init__(self, threshold: float = 0.25, path: str = "/sys/fs/cgroup/cpu.stat"):
+        self._threshold = threshold
+        self._path = path
+        self._last: Optional[tuple] = None
+
+    def _read(self) -> tuple:
+        stats = {}
+        with open(self._path) as stat_file:
+            for line in stat_file:
+                key, _, value = line.partition(" ")
+                stats[key] = int(value)
+
+        return stats["nr_periods"], stats["nr_throttled"]
+
+    def measure(self) -> float:
+        current = self._read()
+        last, self._last = self._last, current
+
+        if not last or current[0] <= last[0]:
+            return 0
+
+        periods = current[0] - last[0]
+        throttled = current[1] - last[1]
+        return throttled / periods / self._threshold
+
+
+class DatabaseLatencyProbe(PressureProbe):
+    """Pressure from the round trip time of a trivial query"""
+
+    name = "database_latency"
+
+    def __init__(self, threshold: float = 0.05, using: str = "default"):
+        self._threshold = threshold
+        self._using = using
+
+    def measure(self) -> float:
+        django.db.close_old_connections()
+        started_at = time.monotonic()
+
+        with django.db.connections[self._using].cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+        return (time.monotonic() - started_at) / self._threshold
+
+
+class PressureMonitor(Thread):
+    """Periodically polls all probes and publishes how much jobs should be stretched"""
+
+    def __init__(
+        self,
+        probes: Iterable[PressureProbe],
+        stop: Event,
+        interval: float = DEFAULT_INTERVAL,
+        max_stretch: float = DEFAULT_MAX_STRETCH,
+        exempt_priority: int = DEFAULT_EXEMPT_PRIORITY,
+    ):
+        self.probes: List[PressureProbe] = list(probes)
+        self.interval = interval
+        self.max_stretch = max_stretch
+        self.exempt_priority = exempt_priority
+        self._stop_evt = stop
+        self._log = logger.bind(process="pressure monitor")
+
+        # Read without locking by the job threads
+        self.pressure = 0.0
+        self.stretch = 1.0
+
+        super().__init__(name="Pressure monitor")
+
+    def poll(self):
+        readings = {}
+
+        for probe in self.probes:
+            try:
+                readings[probe.name] = probe.measure()
+            except Exception as exc:
+                # A probe that can't be read is treated as saturated
+                self._log.warning(
+                    "Pressure probe failed", probe=probe.name, error=str(exc)
+                )
+                readings[probe.name] = self.max_stretch
+
+        pressure = max(readings.values(), default=0.0)
+        stretch = min(max(pressure, 1.0), self.max_stretch)
+
+        if stretch > 1 and self.stretch <= 1:
+            self._log.warning(
+                "System under pressure, deferring jobs",
+                readings=readings,
+                stretch=stretch,
+            )
+        elif stretch <= 1 and self.stretch > 1:
+            self._log.info("System pressure relieved", readings=readings)
+        else:
+            self._log.debug("Pressure measured", readings=readings, stretch=stretch)
+
+        self.pressure = pressure
+        self.stretch = stretch
+
+    def applies_to(self, priority: int) -> bool:
+        return priority < self.exempt_priority
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval):
+            self.poll()
+
+        self._log.info("Pressure monitor exiting")
+
+
+def build_pressure_monitor(stop: Event) -> Optional[PressureMonitor]:
+    """Build the pressure monitor from the Django settings, if any probes are set"""
+
+    probe_settings = getattr(settings, "JOB_RUNNER_PRESSURE_PROBES", [])
+    if not probe_settings:
+        return None
+
+    probes: List[PressureProbe] = []
+    for probe_setting in probe_settings:
+        options = dict(probe_setting)
+        probe_class = import_string(options.pop("class"))
+        probes.append(probe_class(**options))
+
+    return PressureMonitor(
+        probes,
+        stop,
+        interval=getattr(settings, "JOB_RUNNER_PRESSURE_INTERVAL", DEFAULT_INTERVAL),
+        max_stretch=getattr(
+            settings, "JOB_RUNNER_PRESSURE_MAX_STRETCH", DEFAULT_MAX_STRETCH
+        ),
+        exempt_priority=getattr(
+            settings, "JOB_RUNNER_PRESSURE_EXEMPT_PRIORITY", DEFAULT_EXEMPT_PRIORITY
+        ),
+    )
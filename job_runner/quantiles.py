@@ -0,0 +1,144 @@
+"""Constant memory streaming quantile estimates, using the P-squared algorithm"""
+
+from typing import Dict, List, Optional
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class P2Quantile:
+    """Estimates a single quantile of a stream with five markers
+    (Jain and Chlamtac, 1985), without storing the observations"""
+
+    def __init__(self, p: float):
+        self.p = p
+        self.count = 0
+        self._initial: List[float] = []
+        self._heights = [0.0] * 5
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value: float):
+        # Counted only once the value is in place, so value can be read
+        # without a lock while an observation is being added
+        if self.count < 5:
+            self._initial.append(value)
+            if len(self._initial) == 5:
+                self._heights = sorted(self._initial)
+            self.count += 1
+            return
+
+        self.count += 1
+
+        heights = self._heights
+        positions = self._positions
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (
+                offset <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, step)
+
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        heights = self._heights
+        positions = self._positions
+
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step)
+            * (heights[i + 1] - heights[i])
+            / (positions[i + 1] - positions[i])
+            + (positions[i + 1] - positions[i] - step)
+            * (heights[i] - heights[i - 1])
+            / (positions[i] - positions[i - 1])
+        )
+
+    def _linear(self, i: int, step: int) -> float:
+        heights = self._heights
+        positions = self._positions
+
+        return heights[i] + step * (heights[i + step] - heights[i]) / (
+            positions[i + step] - positions[i]
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.count:
+            return None
+
+        if self.count < 5:
+            ordered = sorted(self._initial)
+            return ordered[round(self.p * (len(ordered) - 1))]
+
+        return self._heights[2]
+
+
+class LatencySketch:
+    """Streaming quantiles, maximum and count for one measurement"""
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES):
+        self._quantiles = [P2Quantile(p) for p in quantiles]
+        self.count = 0
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        self.count += 1
+        if self.max is None or value > self.max:
+            self.max = value
+
+        for quantile in self._quantiles:
+            quantile.add(value)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        out: Dict[str, Optional[float]] = {
+            f"p{quantile.p * 100:g}": quantile.value for quantile in self._quantiles
+        }
+        out["max"] = self.max
+        out["count"] = self.count
+        return out
+
+
+class JobLatency:
+    """The latency sketches kept for every job"""
+
+    def __init__(self):
+        self.execution_time = LatencySketch()
+        self.scheduling_lag = LatencySketch()
+        self.query_time = LatencySketch()
+
+    def add(self, execution_time: float, scheduling_lag: float, query_time: float):
+        self.execution_time.add(execution_time)
+        self.scheduling_lag.add(scheduling_lag)
+        self.query_time.add(query_time)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            "execution_time": self.execution_time.summary(),
+            "scheduling_lag": self.scheduling_lag.summary(),
+            "query_time": self.query_time.summary(),
+        }
@@ -0,0 +1,33 @@
+"""Counting and timing the database queries made during a job run"""
+
+from contextlib import ExitStack, contextmanager
+import time
+
+import django.db
+
+
+class QueryCounter:
+    """A database execute wrapper that counts and times every query"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.monotonic()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.monotonic() - started_at
+
+    @contextmanager
+    def installed(self):
+        """Wrap every database connection of the current thread"""
+
+        with ExitStack() as stack:
+            for connection in django.db.connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+
+            yield self
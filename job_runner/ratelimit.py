@@ -0,0 +1,131 @@
+"""Named token bucket rate limiters, shared by every job in the runner"""
+
+import os
+from threading import Lock
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+BACKEND_MEMORY = "memory"
+BACKEND_FILE = "file"
+
+
+class RateLimiter:
+    """A token bucket that refills at rate tokens per second, up to burst tokens"""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Rate limit {name} must have a positive rate")
+
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+
+    def _refill(
+        self, tokens: float, updated_at: float, now: float
+    ) -> Tuple[float, float]:
+        return min(self.burst, tokens + (now - updated_at) * self.rate), now
+
+    def _take(
+        self, state: Tuple[float, float], tokens: float, now: float
+    ) -> Tuple[Tuple[float, float], float]:
+        """Returns the new bucket state, and how long to wait if there weren't enough"""
+
+        available, updated_at = self._refill(*state, now)
+
+        if available >= tokens:
+            return (available - tokens, updated_at), 0.0
+
+        return (available, updated_at), (tokens - available) / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if they are available. Otherwise returns how long to wait"""
+        raise NotImplementedError()
+
+
+class MemoryRateLimiter(RateLimiter):
+    """A bucket shared by the threads of a single job runner"""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None):
+        super().__init__(name, rate, burst)
+        self._lock = Lock()
+        self._state = (self.burst, time.monotonic())
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        with self._lock:
+            self._state, wait = self._take(self._state, tokens, time.monotonic())
+            return wait
+
+
+class UnsharedRateLimiter(RateLimiter):
+    """Stands in for a memory backed bucket in an isolated process, which can't share it"""
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        raise ValueError(
+            f"Rate limit {self.name} uses the {BACKEND_MEMORY} backend, which jobs "
+            f"with subprocess isolation can't share. Use the {BACKEND_FILE} backend"
+        )
+
+
+class FileRateLimiter(RateLimiter):
+    """A bucket kept in a locked local file, shared by every process using the path"""
+
+    def __init__(
+        self, name: str, rate: float, path: str, burst: Optional[float] = None
+    ):
+        if fcntl is None:
+            raise ValueError("File rate limiters require fcntl support")
+
+        super().__init__(name, rate, burst)
+        self.path = path
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            now = time.time()
+            state = (self.burst, now)
+            content = os.read(fd, 64).decode()
+            if content:
+                available, updated_at = content.split()
+                state = (float(available), float(updated_at))
+
+            state, wait = self._take(state, tokens, now)
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{state[0]!r} {state[1]!r}".encode())
+            return wait
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+
+def build_rate_limiters() -> Dict[str, RateLimiter]:
+    """Build the rate limiters declared in the Django settings"""
+
+    limiters: Dict[str, RateLimiter] = {}
+
+    for name, options in getattr(settings, "JOB_RUNNER_RATE_LIMITS", {}).items():
+        backend = options.get("backend", BACKEND_MEMORY)
+
+        if backend == BACKEND_MEMORY:
+            limiters[name] = MemoryRateLimiter(
+                name, options["rate"], options.get("burst")
+            )
+        elif backend == BACKEND_FILE:
+            limiters[name] = FileRateLimiter(
+                name, options["rate"], options["path"], options.get("burst")
+            )
+        else:
+            raise ValueError(f"Unknown rate limit backend for {name}: {backend}")
+
+    return limiters
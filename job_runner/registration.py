@@ -1,20 +1,31 @@
 """Tracking utils for job runner"""
 
+import copy
 import importlib
 import inspect
+import sys
 from threading import Event
 
-from typing import Callable, Iterable, Optional, Set
+from typing import Any, Callable, Iterable, List, Optional, Set, Union
 from datetime import timedelta
 
 from structlog import get_logger
 
+import django.db
 from django.conf import settings
 
 from .environment import RunEnv, get_environments
+from .isolation import (
+    ISOLATION_MODES,
+    ISOLATION_SUBPROCESS,
+    ISOLATION_THREAD,
+    subprocess_isolation_available,
+)
 from .time import AutoTime, auto_time, auto_time_default
 
 Job = Callable[[RunEnv], None]
+Fingerprint = Callable[[RunEnv], Any]
+DatabaseProvider = Callable[[], Iterable[str]]
 
 logger = get_logger(__name__)
 
@@ -28,17 +39,55 @@ class RegisteredJob:
         variance: timedelta,
         timeout: Optional[timedelta],
         func: Job,
+        isolation: str = ISOLATION_THREAD,
+        priority: int = 0,
+        deadline: Optional[timedelta] = None,
+        concurrency_group: Optional[str] = None,
+        rerun_budget: Optional[int] = None,
+        rerun_window: timedelta = timedelta(seconds=60),
+        share: float = 1.0,
+        fingerprint: Optional[Fingerprint] = None,
+        failure_backoff: Optional[timedelta] = None,
+        max_backoff: timedelta = timedelta(hours=1),
+        circuit_threshold: Optional[int] = None,
+        circuit_reset: timedelta = timedelta(seconds=60),
+        per_database: Union[bool, DatabaseProvider] = False,
+        read_using: Optional[str] = None,
+        max_replica_lag: Optional[timedelta] = None,
     ):
         self._interval = interval
         self._variance = variance
         self._func = func
         self._timeout = timeout
+        self._isolation = isolation
+        self._priority = priority
+        self._deadline = deadline
+        self._concurrency_group = concurrency_group
+        self._rerun_budget = rerun_budget
+        self._rerun_window = rerun_window
+        self._share = share
+        self._fingerprint = fingerprint
+        self._failure_backoff = failure_backoff
+        self._max_backoff = max_backoff
+        self._circuit_threshold = circuit_threshold
+        self._circuit_reset = circuit_reset
+        self._per_database = per_database
+        self._database_alias: Optional[str] = None
+        self._read_using = read_using
+        self._max_replica_lag = max_replica_lag
 
     @property
-    def name(self):
+    def base_name(self) -> str:
         """The full name of the function to be called"""
         return f"{self._func.__module__}.{self._func.__name__}"
 
+    @property
+    def name(self) -> str:
+        """The base name, plus the database alias for an instance of a per database job"""
+        if self._database_alias is None:
+            return self.base_name
+        return f"{self.base_name}[{self._database_alias}]"
+
     @property
     def timeout(self) -> Optional[timedelta]:
         return self._timeout
@@ -51,6 +100,107 @@ class RegisteredJob:
     def variance(self) -> timedelta:
         return self._variance
 
+    @property
+    def isolation(self) -> str:
+        return self._isolation
+
+    @property
+    def priority(self) -> int:
+        return self._priority
+
+    @property
+    def deadline(self) -> Optional[timedelta]:
+        """How long after it is due the job should have started by"""
+        return self._deadline
+
+    @property
+    def concurrency_group(self) -> Optional[str]:
+        return self._concurrency_group
+
+    @property
+    def rerun_budget(self) -> Optional[int]:
+        """How many immediate reruns are allowed per rerun window"""
+        return self._rerun_budget
+
+    @property
+    def rerun_window(self) -> timedelta:
+        return self._rerun_window
+
+    @property
+    def share(self) -> float:
+        """The relative share of contended run slots this job should get"""
+        return self._share
+
+    @property
+    def fingerprint(self) -> Optional[Fingerprint]:
+        """A cheap function of the job's inputs. The job is skipped
+        when it returns the same value as the last successful run"""
+        return self._fingerprint
+
+    @property
+    def failure_backoff(self) -> Optional[timedelta]:
+        """The delay after the first consecutive failure, doubled for each one after"""
+        return self._failure_backoff
+
+    @property
+    def max_backoff(self) -> timedelta:
+        return self._max_backoff
+
+    @property
+    def circuit_threshold(self) -> Optional[int]:
+        """How many consecutive failures open the circuit"""
+        return self._circuit_threshold
+
+    @property
+    def circuit_reset(self) -> timedelta:
+        """How long an open circuit waits before a probe run"""
+        return self._circuit_reset
+
+    @property
+    def per_database(self) -> bool:
+        return bool(self._per_database)
+
+    @property
+    def database_alias(self) -> Optional[str]:
+        return self._database_alias
+
+    @property
+    def read_using(self) -> Optional[str]:
+        """The read replica alias the job's reads are routed to"""
+        return self._read_using
+
+    @property
+    def max_replica_lag(self) -> Optional[timedelta]:
+        """How far behind the replica may be before reads go to the primary"""
+        return self._max_replica_lag
+
+    def database_aliases(self, replicas: Iterable[str] = ()) -> List[str]:
+        """The aliases a per database job should run an instance for.
+
+        Without a callable that is every alias, apart from the given read
+        replicas and the aliases that mirror another one in tests"""
+
+        if callable(self._per_database):
+            return list(self._per_database())
+
+        excluded = set(replicas)
+        if self._read_using:
+            excluded.add(self._read_using)
+
+        return [
+            alias
+            for alias in django.db.connections
+            if alias not in excluded
+            and not django.db.connections.settings[alias].get("TEST", {}).get("MIRROR")
+        ]
+
+    def for_database(self, alias: str) -> "RegisteredJob":
+        """An instance of this job that owns a single database alias"""
+
+        instance = copy.copy(self)
+        instance._database_alias = alias
+        return instance
+
     def check_callable_valid(self):
         # We don't need a "real" stop event since we aren't calling the function
         sample_env, _ = get_environments(Event())
@@ -58,6 +208,9 @@ class RegisteredJob:
         # This will throw a type error if it isn't callable
         signature.bind(sample_env)
 
+        if self._fingerprint:
+            inspect.signature(self._fingerprint).bind(sample_env)
+
     def __call__(self, env: RunEnv):
         return self._func(env)
 
@@ -67,10 +220,37 @@ def register_job(
     variance: Optional[AutoTime] = None,
     timeout: Optional[AutoTime] = None,
     enabled=True,
+    isolation: str = ISOLATION_THREAD,
+    priority: int = 0,
+    deadline: Optional[AutoTime] = None,
+    concurrency_group: Optional[str] = None,
+    rerun_budget: Optional[int] = None,
+    rerun_window: AutoTime = 60,
+    share: float = 1.0,
+    fingerprint: Optional[Fingerprint] = None,
+    failure_backoff: Optional[AutoTime] = None,
+    max_backoff: AutoTime = 3600,
+    circuit_threshold: Optional[int] = None,
+    circuit_reset: AutoTime = 60,
+    per_database: Union[bool, DatabaseProvider] = False,
+    read_using: Optional[str] = None,
+    max_replica_lag: Optional[AutoTime] = None,
 ):
     """Decorator to schedule the job to be run every
     interval plus a random time up to variance"""
 
+    if share <= 0:
+        raise ValueError("Share must be greater than zero")
+
+    if circuit_threshold is not None and circuit_threshold < 1:
+        raise ValueError("Circuit threshold must be at least 1")
+
+    if isolation not in ISOLATION_MODES:
+        raise ValueError(f"Unknown isolation mode: {isolation}")
+
+    if isolation == ISOLATION_SUBPROCESS and not subprocess_isolation_available():
+        raise ValueError("Subprocess isolation requires fork support")
+
     def decorator(func: Job):
         if not enabled:
             return func
@@ -80,25 +260,72 @@ def register_job(
             variance=auto_time_default(variance, timedelta(0)),
             timeout=auto_time_default(timeout, None),
             func=func,
+            isolation=isolation,
+            priority=priority,
+            deadline=auto_time_default(deadline, None),
+            concurrency_group=concurrency_group,
+            rerun_budget=rerun_budget,
+            rerun_window=auto_time(rerun_window),
+            share=share,
+            fingerprint=fingerprint,
+            failure_backoff=auto_time_default(failure_backoff, None),
+            max_backoff=auto_time(max_backoff),
+            circuit_threshold=circuit_threshold,
+            circuit_reset=auto_time(circuit_reset),
+            per_database=per_database,
+            read_using=read_using,
+            max_replica_lag=auto_time_default(max_replica_lag, None),
         )
 
     return decorator
 
 
-def import_jobs_from_module(module_name: str) -> Iterable[RegisteredJob]:
-    """Get all the registered jobs from a given module"""
+def expand_per_database(jobs: Iterable[RegisteredJob]) -> Set[RegisteredJob]:
+    """Replace each per database job with an instance for every one of its aliases"""
+
+    out: Set[RegisteredJob] = set()
+    jobs = list(jobs)
+    # Replicas are read from by jobs, they aren't databases of their own
+    replicas = {job.read_using for job in jobs if job.read_using}
+
+    for job in jobs:
+        if not job.per_database:
+            out.add(job)
+            continue
+
+        aliases = job.database_aliases(replicas)
+        logger.debug("Expanding per database job", job_name=job.name, aliases=aliases)
+        out.update(job.for_database(alias) for alias in aliases)
+
+    return out
+
+
+def import_jobs_from_module(
+    module_name: str, reload: bool = False
+) -> Iterable[RegisteredJob]:
+    """Get all the registered jobs from a given module.
+    With reload, a module that was already imported is executed again"""
 
     log = logger.bind(module_name=module_name)
 
-    log.debug("Importing module")
-    module = importlib.import_module(module_name)
+    if reload and module_name in sys.modules:
+        log.debug("Reloading module")
+        module = sys.modules[module_name]
+        # Reloading keeps old globals around, which would hide removed jobs
+        for name, item in list(module.__dict__.items()):
+            if isinstance(item, RegisteredJob):
+                del module.__dict__[name]
+        module = importlib.reload(module)
+    else:
+        log.debug("Importing module")
+        module = importlib.import_module(module_name)
 
     for item in module.__dict__.values():
         if isinstance(item, RegisteredJob):
             yield item
 
 
-def import_default_jobs() -> Set[RegisteredJob]:
+def import_default_jobs(reload: bool = False) -> Set[RegisteredJob]:
     """Get all the registered jobs from all Django installed apps"""
 
     out: Set[RegisteredJob] = set()
@@ -115,12 +342,16 @@ def import_default_jobs() -> Set[RegisteredJob]:
 
         try:
             log.debug("Importing module")
-            for job in import_jobs_from_module(module_name):
+            for job in import_jobs_from_module(module_name, reload):
                 out.add(job)
 
             log.info("Module successfully imported")
 
         except ImportError:
+            if reload and module_name in sys.modules:
+                # A broken reload must not look like the jobs were removed
+                raise
+
             log.debug("Module not imported")
 
     return out
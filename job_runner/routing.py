@@ -0,0 +1,167 @@
+"""Sends the reads of a running job to a read replica, unless it lags too far behind"""
+
+from contextlib import contextmanager
+from threading import Lock, local
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import django.db
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from structlog import get_logger
+
+logger = get_logger(__name__)
+
+ROUTER_PATH = "job_runner.routing.JobReadRouter"
+DEFAULT_MAX_LAG = 30.0
+DEFAULT_LAG_CACHE = 5.0
+
+_routing = local()
+
+_lag_lock = Lock()
+_lag_readings: Dict[str, Tuple[float, Optional[float]]] = {}
+_legacy_replica_status = False
+
+
+class JobReadRouter:
+    """A database router that sends reads from a job thread to its read alias.
+
+    Add it to the start of DATABASE_ROUTERS. Outside of jobs with
+    read_using it leaves every decision to the routers after it"""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return current_read_alias()
+
+
+def current_read_alias() -> Optional[str]:
+    """The alias the reads of the current thread are routed to, if any"""
+    return getattr(_routing, "alias", None)
+
+
+def router_installed() -> bool:
+    return ROUTER_PATH in getattr(settings, "DATABASE_ROUTERS", [])
+
+
+@contextmanager
+def reading_from(alias: Optional[str]) -> Iterator[None]:
+    """Route the reads of the current thread to the alias. None changes nothing"""
+
+    previous = current_read_alias()
+    _routing.alias = alias
+
+    try:
+        yield
+    finally:
+        _routing.alias = previous
+
+
+def _postgresql_lag(cursor) -> Optional[float]:
+    cursor.execute(
+        "SELECT CASE WHEN pg_is_in_recovery() THEN "
+        "COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+        "ELSE 0 END"
+    )
+    return float(cursor.fetchone()[0])
+
+
+def _show_replica_status(cursor) -> None:
+    global _legacy_replica_status
+
+    if not _legacy_replica_status:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            return
+        except django.db.DatabaseError as exc:
+            # Before MySQL 8.0.22 and MariaDB 10.5.1
+            _legacy_replica_status = True
+            logger.warning(
+                "SHOW REPLICA STATUS is not supported, using SHOW SLAVE STATUS",
+                error=str(exc),
+            )
+
+    cursor.execute("SHOW SLAVE STATUS")
+
+
+def _mysql_lag(cursor) -> Optional[float]:
+    _show_replica_status(cursor)
+    row = cursor.fetchone()
+    if not row:
+        # Not a replica, so it can't lag
+        return 0.0
+
+    columns = [column[0] for column in cursor.description]
+    for name in ("Seconds_Behind_Source", "Seconds_Behind_Master"):
+        if name in columns:
+            value = row[columns.index(name)]
+            # Empty while replication is stopped
+            return float(value) if value is not None else float("inf")
+
+    return None
+
+
+_VENDOR_CHECKS: Dict[str, Callable] = {
+    "postgresql": _postgresql_lag,
+    "mysql": _mysql_lag,
+}
+
+
+def measure_lag(alias: str) -> Optional[float]:
+    """How many seconds the replica is behind, or None if it can't be measured"""
+
+    check_path = getattr(settings, "JOB_RUNNER_REPLICA_LAG_CHECK", None)
+    if check_path:
+        return import_string(check_path)(alias)
+
+    connection = django.db.connections[alias]
+    vendor_check = _VENDOR_CHECKS.get(connection.vendor)
+    if not vendor_check:
+        return None
+
+    with connection.cursor() as cursor:
+        return vendor_check(cursor)
+
+
+def _cached_lag(alias: str) -> Optional[float]:
+    cache_for = getattr(settings, "JOB_RUNNER_REPLICA_LAG_CACHE", DEFAULT_LAG_CACHE)
+    now = time.monotonic()
+
+    with _lag_lock:
+        reading = _lag_readings.get(alias)
+        if reading and now - reading[0] < cache_for:
+            return reading[1]
+
+    lag = measure_lag(alias)
+
+    with _lag_lock:
+        _lag_readings[alias] = (now, lag)
+
+    return lag
+
+
+def choose_read_alias(alias: str, max_lag: Optional[float], log) -> Optional[str]:
+    """The alias a run should read from, or None to read from the primary"""
+
+    if max_lag is None:
+        max_lag = getattr(settings, "JOB_RUNNER_MAX_REPLICA_LAG", DEFAULT_MAX_LAG)
+
+    try:
+        lag = _cached_lag(alias)
+    except Exception as exc:
+        log.warning(
+            "Could not measure replica lag, reading from the primary",
+            read_using=alias,
+            error=str(exc),
+        )
+        return None
+
+    if lag is not None and lag > max_lag:
+        log.warning(
+            "Replica is lagging, reading from the primary",
+            read_using=alias,
+            lag=lag,
+            max_lag=max_lag,
+        )
+        return None
+
+    return alias
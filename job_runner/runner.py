@@ -1,20 +1,140 @@
 """The coordinator is responsible for running all jobs"""
 
+from datetime import timedelta
 from random import random
-from threading import Thread, Event
+from threading import Lock, Thread, Event
 import time
-from typing import Callable, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import django.db
 
-from job_runner.environment import get_environments, RunInterrupted
+from job_runner.cache import RunnerCache
+from job_runner.cancellation import inject_exception
+from job_runner.circuit import CIRCUIT_OPEN, CircuitBreaker
+from job_runner.dispatch import Dispatcher
+from job_runner.environment import (
+    get_environments,
+    RunEnv,
+    RunInterrupted,
+    TrackerEnv,
+)
+from job_runner.fairshare import RerunBudget
+from job_runner.history import DEFAULT_SIZE, RunHistory
+from job_runner.isolation import (
+    ISOLATION_SUBPROCESS,
+    IsolatedJobError,
+    IsolatedResult,
+    IsolatedRun,
+)
+from job_runner.log_pipeline import RunLogSampler
+from job_runner.overrides import Override
+from job_runner.outcomes import (
+    OUTCOME_CRASHED,
+    OUTCOME_ERROR,
+    OUTCOME_INTERRUPTED,
+    OUTCOME_SKIPPED,
+    OUTCOME_SUCCESS,
+    OUTCOME_TIMEOUT,
+)
+from job_runner.phase import delay_until_phase
+from job_runner.pool import WorkerPool
+from job_runner.pressure import PressureMonitor
+from job_runner.quantiles import JobLatency
+from job_runner.queries import QueryCounter
 from job_runner.registration import RegisteredJob
+from job_runner.ratelimit import RateLimiter
+from job_runner.routing import choose_read_alias, reading_from
+from job_runner.schedule import (
+    CATCH_UP_ONCE,
+    SavedSchedule,
+    ScheduleStore,
+    max_catch_up_runs,
+    plan_resume,
+)
 from job_runner.timeouts import TimeoutTracker
 
 from structlog import get_logger
 
 logger = get_logger(__name__)
 
+STATE_WAITING = "waiting"
+STATE_DEFERRED = "deferred"
+STATE_WAITING_FOR_SLOT = "waiting_for_slot"
+STATE_RUNNING = "running"
+STATE_PAUSED = "paused"
+STATE_STOPPED = "stopped"
+
+_FAILURE_OUTCOMES = (OUTCOME_ERROR, OUTCOME_TIMEOUT, OUTCOME_CRASHED)
+
+# Marks that no fingerprint has been taken, since None is a valid fingerprint
+_NO_FINGERPRINT: Any = object()
+
+
+def _circuit_settings(job: RegisteredJob) -> tuple:
+    return (
+        job.failure_backoff,
+        job.max_backoff,
+        job.circuit_threshold,
+        job.circuit_reset,
+    )
+
+
+def _build_circuit(job: RegisteredJob) -> Optional[CircuitBreaker]:
+    if job.failure_backoff is None and job.circuit_threshold is None:
+        return None
+
+    return CircuitBreaker(
+        backoff=job.failure_backoff.total_seconds() if job.failure_backoff else 0,
+        max_backoff=job.max_backoff.total_seconds(),
+        threshold=job.circuit_threshold,
+        reset_timeout=job.circuit_reset.total_seconds(),
+    )
+
+
+def _build_rerun_budget(job: RegisteredJob) -> Optional[RerunBudget]:
+    if job.rerun_budget is None:
+        return None
+
+    return RerunBudget(job.rerun_budget, job.rerun_window.total_seconds())
+
+
+class StopEvent(Event):
+    """The runner wide stop event, which also halts every job thread listening to it"""
+
+    def __init__(self):
+        super().__init__()
+        self._listeners_lock = Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]):
+        with self._listeners_lock:
+            self._listeners.append(listener)
+
+        if self.is_set():
+            listener()
+
+    def remove_listener(self, listener: Callable[[], None]):
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def set(self, notify: bool = True):
+        """Set the event. Signal handlers pass notify=False and leave telling
+        the listeners to the main loop, since the main thread may be holding
+        the listeners lock when the signal arrives"""
+
+        super().set()
+
+        if notify:
+            self.notify_listeners()
+
+    def notify_listeners(self):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener()
+
 
 class JobThread(Thread):
     """Runs a single job on a single schedule"""
@@ -22,59 +142,367 @@ class JobThread(Thread):
     def __init__(
         self,
         job: RegisteredJob,
-        stop: Event,
+        stop: StopEvent,
         throw_error: Callable[[], None],
         timeout_tracker: TimeoutTracker,
+        log_summary_runs: int = 0,
+        log_summary_interval: float = 0,
+        phase: Optional[float] = None,
+        pressure: Optional[PressureMonitor] = None,
+        dispatcher: Optional[Dispatcher] = None,
+        history_size: int = DEFAULT_SIZE,
+        cache: Optional[RunnerCache] = None,
+        pool: Optional[WorkerPool] = None,
+        rate_limits: Optional[Dict[str, RateLimiter]] = None,
+        schedule_store: Optional[ScheduleStore] = None,
+        saved_schedule: Optional[SavedSchedule] = None,
+        catch_up: str = CATCH_UP_ONCE,
+        override: Optional[Override] = None,
     ):
         self.job = job
+        self._override = override
         self.stopping = stop
+        # Halts only this thread, either as part of the runner stopping
+        # or when its job is removed by a reload
+        self._halt = Event()
+        self._wakeup = Event()
+        self.retired = False
+        self.retired_at: Optional[float] = None
         self._on_fatal = throw_error
         self.log = logger.bind(job_name=self.job.name)
+        self.latency = JobLatency()
+        self._log_sampler = RunLogSampler(
+            self.log,
+            log_summary_runs,
+            log_summary_interval,
+            extra=self._latency_summary,
+        )
+
+        self._phase = phase
+        if phase is None:
+            self._next_run = self.variance.total_seconds() * random()
+        else:
+            self._next_run = time.monotonic() + delay_until_phase(
+                self.interval.total_seconds(), phase, time.time()
+            )
+        self._catch_up_runs = 0
+        if saved_schedule:
+            delay, self._catch_up_runs = plan_resume(
+                saved_schedule,
+                self.interval.total_seconds(),
+                catch_up,
+                time.time(),
+                max_catch_up_runs(),
+            )
+            self._next_run = time.monotonic() + delay
+            self.log.info(
+                "Job schedule restored",
+                delay=delay,
+                catch_up_runs=self._catch_up_runs,
+            )
+        self._schedule_store = schedule_store
+        self._last_run_at: Optional[float] = (
+            saved_schedule.last_run_at if saved_schedule else None
+        )
+        # Where chunked iteration left off, saved along with the schedule
+        self._cursors: Dict[str, Any] = (
+            dict(saved_schedule.cursors) if saved_schedule else {}
+        )
 
-        self._next_run = job.variance.total_seconds() * random()
         self._next_database_cleanup: Optional[float] = None
+        self._pressure = pressure
+        self._pressure_hold: Optional[float] = None
+        self._dispatcher = dispatcher
+        self._rerun_pending = False
+        # The end of the current failure backoff or open circuit, which rescheduling keeps
+        self._not_before = 0.0
+        # When the job was due as it was paused, so resuming can run it straight away
+        self._paused_due: Optional[float] = None
+        self._circuit = _build_circuit(job)
+        self._rerun_budget = _build_rerun_budget(job)
         self._timeout_tracker = timeout_tracker
 
+        # Read by the status endpoint without any locking
+        self.state = STATE_WAITING
+        self._run_started_at: Optional[float] = None
+        self._last_duration: Optional[float] = None
+        self._last_outcome: Optional[str] = None
+        self.history = RunHistory(history_size)
+        self._last_fingerprint: Any = _NO_FINGERPRINT
+
+        # Carried over from run to run through the RunEnv
+        self._job_state: Dict[str, Any] = {}
+        self._cache = cache if cache is not None else RunnerCache()
+        self._worker_pool = pool
+        self._pool = pool.for_job(job, self._halt) if pool else None
+        if self._pool and override:
+            self._pool.max_workers = override.concurrency
+        self._rate_limits = rate_limits
+
+        # Forced interruptions may only be delivered while the job body is running
+        self._interrupt_lock = Lock()
+        self._in_job = False
+        self._interrupt_sent = False
+
         super().__init__()
 
         self.name = f"Runner: {self.job.name}"
+        stop.add_listener(self.halt)
+
+    def halt(self):
+        """Stop the thread once any current run has finished"""
+
+        self._halt.set()
+        self._wakeup.set()
+
+    def retire(self):
+        """Stop the thread because its job is no longer registered"""
+
+        self.log.info("Retiring job")
+        self.retired = True
+        self.retired_at = time.monotonic()
+        self.stopping.remove_listener(self.halt)
+        self.halt()
+
+    def update_job(self, job: RegisteredJob):
+        """Swap in a reloaded version of the job, applying any schedule change"""
+
+        old_job = self.job
+        schedule = (self.interval, self.variance)
+        self.job = job
+        self._rebuild_from_job(old_job)
+
+        if (old_job.interval, old_job.variance, old_job.timeout) == (
+            job.interval,
+            job.variance,
+            job.timeout,
+        ):
+            return
+
+        # Overrides win over the reloaded values, and a new timeout needs no reschedule
+        if (self.interval, self.variance) != schedule:
+            self._reschedule()
+        self.log.info(
+            "Job schedule changed",
+            interval=job.interval,
+            variance=job.variance,
+            timeout=job.timeout,
+            next_run_in=self._next_run - time.monotonic(),
+        )
+
+    def _rebuild_from_job(self, old_job: RegisteredJob):
+        """Replace what was built from the old registration of the job"""
+
+        if _circuit_settings(old_job) != _circuit_settings(self.job):
+            old_circuit = self._circuit
+            self._circuit = _build_circuit(self.job)
+            if old_circuit and self._circuit:
+                # An open circuit stays open, under the new settings
+                self._circuit.state = old_circuit.state
+                self._circuit.failures = old_circuit.failures
+            self.log.info("Job failure handling changed")
+
+        if (old_job.rerun_budget, old_job.rerun_window) != (
+            self.job.rerun_budget,
+            self.job.rerun_window,
+        ):
+            self._rerun_budget = _build_rerun_budget(self.job)
+            self.log.info("Job rerun budget changed")
+
+        if self._pool and self._worker_pool:
+            # The pool asks the dispatcher for slots in the job's concurrency group
+            max_workers = self._pool.max_workers
+            self._pool = self._worker_pool.for_job(self.job, self._halt)
+            self._pool.max_workers = max_workers
+
+    def apply_override(self, override: Optional[Override]):
+        """Use new runtime overrides from the next scheduling decision on"""
+
+        schedule = (self.interval, self.variance)
+        was_paused = self.paused
+        self._override = override
+        if self._pool:
+            self._pool.max_workers = override.concurrency if override else None
+
+        if (self.interval, self.variance) != schedule:
+            self._reschedule()
+
+        if was_paused and not self.paused:
+            self._resume()
+        self._trace(
+            "Job override applied", next_run_in=self._next_run - time.monotonic()
+        )
+
+    def _resume(self):
+        """Go back to the schedule the job had when it was paused"""
+
+        self.log.info("Job resumed")
+        if self._paused_due is not None:
+            self._next_run = max(self._paused_due, self._not_before)
+            self._paused_due = None
+        if self.state == STATE_PAUSED:
+            self.state = STATE_WAITING
+        self._wakeup.set()
+
+    def _reschedule(self):
+        """Work out the next run again after the job's schedule changed.
+
+        A pending rerun or catch up run still goes first, and the
+        next run never comes before the end of a backoff or open circuit"""
+
+        if self._rerun_pending or self._catch_up_runs:
+            return
+
+        interval = self.interval.total_seconds()
+        if self._phase is not None:
+            self._next_run = time.monotonic() + delay_until_phase(
+                interval, self._phase, time.time()
+            )
+        elif self._last_run_at is not None:
+            next_run_at = self._last_run_at + interval
+            next_run_at += self.variance.total_seconds() * random()
+            self._next_run = time.monotonic() + (next_run_at - time.time())
+
+        self._next_run = max(self._next_run, self._not_before)
+        self._wakeup.set()
+
+    @property
+    def interval(self) -> timedelta:
+        if self._override and self._override.interval is not None:
+            return self._override.interval
+        return self.job.interval
+
+    @property
+    def variance(self) -> timedelta:
+        if self._override and self._override.variance is not None:
+            return self._override.variance
+        return self.job.variance
+
+    @property
+    def timeout(self) -> Optional[timedelta]:
+        if self._override and self._override.timeout is not None:
+            return self._override.timeout
+        return self.job.timeout
+
+    @property
+    def paused(self) -> bool:
+        return bool(self._override and self._override.paused)
+
+    def _routine(self, event: str, **kwargs):
+        """Log a routine event, unless routine runs are being summarized"""
+
+        if not self._log_sampler.enabled:
+            self.log.info(event, **kwargs)
+
+    def _trace(self, event: str, **kwargs):
+        """Log scheduling details, unless routine runs are being summarized"""
+
+        if not self._log_sampler.enabled:
+            self.log.debug(event, **kwargs)
 
     @property
     def _next_event(self) -> float:
         """Figure out the next time anything happens"""
 
+        next_run = self._next_run
+        if self._pressure_hold:
+            next_run = max(next_run, self._pressure_hold)
+
         if self._next_database_cleanup:
-            return min(self._next_database_cleanup, self._next_run)
+            return min(self._next_database_cleanup, next_run)
 
-        return self._next_run
+        return next_run
 
     @property
     def _next_event_delay(self) -> float:
         return max(self._next_event - time.monotonic(), 0)
 
     def _conditional_cleanup(self):
-        self.log.debug("Beginning conditional cleanup")
+        self._trace("Beginning conditional cleanup")
 
         if not self._next_database_cleanup:
-            self.log.debug("Cleanup not scheduled")
+            self._trace("Cleanup not scheduled")
             return
 
         if time.monotonic() < self._next_database_cleanup:
-            self.log.debug("Cleanup not ready")
+            self._trace("Cleanup not ready")
             return
 
         self._cleanup_database()
 
     def _conditional_run(self):
-        self.log.debug("Beginning conditional run")
-        if time.monotonic() < self._next_run:
-            self.log.debug("Not ready to run")
+        self._trace("Beginning conditional run")
+        now = time.monotonic()
+        if now < self._next_run:
+            self._trace("Not ready to run")
             return
 
-        self._run_once()
+        if self.paused:
+            if self.state != STATE_PAUSED:
+                self.log.info("Job is paused, skipping runs")
+                self._paused_due = self._next_run
+            self.state = STATE_PAUSED
+            # Check back every interval. Resuming reschedules straight away
+            self._next_run = now + self.interval.total_seconds()
+            return
+
+        hold_until = self._get_pressure_hold(now)
+        if hold_until:
+            if not self._pressure_hold:
+                self.log.info(
+                    "Deferring job due to system pressure",
+                    stretch=self._pressure.stretch,
+                )
+            self._pressure_hold = hold_until
+            self.state = STATE_DEFERRED
+            return
+
+        self._pressure_hold = None
+
+        if not self._dispatcher:
+            self._run_once()
+            return
+
+        self._trace("Waiting for a run slot")
+        self.state = STATE_WAITING_FOR_SLOT
+        slot = self._dispatcher.acquire(
+            self.job, self._next_run, rerun=self._rerun_pending
+        )
+        if not slot:
+            self._trace("Stopped while waiting for a run slot")
+            return
+
+        if self._halt.is_set():
+            self._dispatcher.release(slot)
+            return
+
+        try:
+            self._run_once()
+        finally:
+            self._dispatcher.release(slot)
+
+    def _get_pressure_hold(self, now: float) -> Optional[float]:
+        """If the job should be held off due to pressure, when to check again.
+
+        The run is pushed back by the pressure stretch times the interval, but it is
+        rechecked every pressure poll so it goes back to schedule once pressure drops"""
+
+        if not self._pressure or not self._pressure.applies_to(self.job.priority):
+            return None
+
+        stretch = self._pressure.stretch
+        if stretch <= 1:
+            return None
+
+        period = max(self.interval.total_seconds(), self._pressure.interval)
+        deferred_until = self._next_run + period * (stretch - 1)
+        if now >= deferred_until:
+            return None
+
+        return min(deferred_until, now + self._pressure.interval)
 
     def _cleanup_database(self):
-        self.log.info("Running cleanup")
+        self._routine("Running cleanup")
 
         # Near as I can tell, the connection handler is thread local,
         # so this does need to be run for every different job
@@ -97,51 +525,231 @@ class JobThread(Thread):
 
         delay = min(delays)
         self._next_database_cleanup = time.monotonic() + delay
-        self.log.debug(
+        self._trace(
             "Scheduling database cleanup",
             next_run=self._next_database_cleanup,
             now=time.monotonic(),
         )
 
     def _run_once(self):
-        self.log.info("Job starting")
+        self._routine("Job starting")
+
+        if self._circuit and self._circuit.start_run():
+            self.log.info("Job circuit half open, probing for recovery")
 
-        run_env, tracker_env = get_environments(self.stopping)
         started_at = time.monotonic()
+        started_at_wall = time.time()
+        scheduling_lag = max(started_at - self._next_run, 0)
+        self._run_started_at = started_at
+        self.state = STATE_RUNNING
+        tracker_env: Union[TrackerEnv, IsolatedResult]
+
+        if self.job.isolation == ISOLATION_SUBPROCESS:
+            tracker_env = self._execute_isolated(started_at)
+            outcome = tracker_env.outcome
+            cpu_time = tracker_env.cpu_time
+            query_count = tracker_env.query_count
+            query_time = tracker_env.query_time
+        else:
+            queries = QueryCounter()
+            cpu_started_at = time.thread_time()
+
+            with queries.installed():
+                tracker_env, outcome = self._execute_in_thread(started_at)
+
+            cpu_time = time.thread_time() - cpu_started_at
+            query_count = queries.count
+            query_time = queries.time
+
+        now = time.monotonic()
+        execution_time = now - started_at
+        self.history.record(
+            started_at_wall, execution_time, outcome, cpu_time, query_count
+        )
+        self.latency.add(execution_time, scheduling_lag, query_time)
+
+        self._last_duration = execution_time
+        self._last_outcome = outcome
+        self._run_started_at = None
+        self.state = STATE_WAITING
+
+        interval = self.interval.total_seconds()
+
+        if self._phase is None:
+            variance = self.variance.total_seconds() * random()
+            # The default is to obey the job mechanics
+            self._next_run = now + interval + variance - execution_time
+        else:
+            # Stay on the assigned phase, skipping the slot we just ran in
+            not_before = started_at_wall + interval / 2
+            self._next_run = (
+                now
+                + (not_before - time.time())
+                + delay_until_phase(interval, self._phase, not_before)
+            )
+
+        failed = outcome in _FAILURE_OUTCOMES
+        if self._circuit:
+            self._track_failures(self._circuit, outcome, now)
+
+        self._rerun_pending = False
+        if failed and self._circuit:
+            # A failing job must wait out its backoff rather than retry in a hot loop
+            if tracker_env.requested_rerun:
+                self.log.debug("Ignoring rerun request from failed run")
+        elif tracker_env.requested_rerun:
+            self._schedule_rerun(now)
+        elif self._catch_up_runs:
+            self._catch_up_runs -= 1
+            self.log.debug("Catching up on a missed run")
+            self._next_run = now
+
+        self._last_run_at = started_at_wall
+        self.save_schedule()
+
+        if tracker_env.requested_stop:
+            self.log.warning("Job requested stop")
+            self.stopping.set()
+
+        self._cleanup_database()
+        self._schedule_next_db_cleanup()
+
+        if outcome in (OUTCOME_SUCCESS, OUTCOME_SKIPPED) and (
+            self._log_sampler.enabled
+        ):
+            self._log_sampler.record(execution_time)
+            return
+
+        self.log.info(
+            "Job execution finished",
+            next_run=self._next_run,
+            execution_time=execution_time,
+            now=now,
+            outcome=outcome,
+            rows_written=tracker_env.rows_written,
+            flush_time=tracker_env.flush_time,
+        )
+
+    def _track_failures(self, circuit: CircuitBreaker, outcome: str, now: float):
+        if outcome == OUTCOME_SUCCESS:
+            if circuit.record_success():
+                self.log.info("Job circuit closed")
+            return
+
+        if outcome not in _FAILURE_OUTCOMES:
+            # Interrupted and skipped runs say nothing about whether the job works
+            return
+
+        delay = circuit.record_failure()
+        self._not_before = now + delay
+        self._next_run = max(self._next_run, self._not_before)
+
+        if circuit.state == CIRCUIT_OPEN:
+            self.log.warning(
+                "Job circuit opened",
+                failures=circuit.failures,
+                retry_in=delay,
+            )
+        elif delay:
+            self.log.info(
+                "Backing off failing job",
+                failures=circuit.failures,
+                retry_in=self._next_run - now,
+            )
+
+    def save_schedule(self):
+        """Save when the job last ran and will next run, so a restart can pick it up"""
+
+        if not self._schedule_store:
+            return
+
+        next_run_at = time.time() + (self._next_run - time.monotonic())
+
+        try:
+            self._schedule_store.save(
+                self.job.name,
+                SavedSchedule(self._last_run_at, next_run_at, dict(self._cursors)),
+            )
+        except Exception as exc:
+            self.log.warning("Could not save the job schedule", error=str(exc))
+
+    def _schedule_rerun(self, now: float):
+        if self._rerun_budget and not self._rerun_budget.allow(now):
+            # Past the budget the rerun waits for the window to free up,
+            # unless the normal schedule comes around first
+            self._next_run = min(self._next_run, self._rerun_budget.next_allowed(now))
+            self.log.info(
+                "Job exceeded its rerun budget, delaying rerun",
+                rerun_budget=self._rerun_budget.budget,
+                rerun_window=self._rerun_budget.window,
+                next_run=self._next_run,
+            )
+            return
+
+        # Override next run to go immediately if the job requests it
+        self.log.debug("Job requested rerun without delay")
+        self._next_run = now
+        self._rerun_pending = True
+
+    def _execute_in_thread(self, started_at: float) -> Tuple[TrackerEnv, str]:
+        read_alias = self._read_alias()
+        run_env, tracker_env = get_environments(
+            self._halt,
+            self._job_state,
+            self._cache,
+            self._pool,
+            self._rate_limits,
+            self.job.database_alias,
+            read_alias,
+            self._cursors,
+        )
         timeout_fired = Event()
+        outcome = OUTCOME_SUCCESS
+        timeout = self.timeout
 
         def fire_timeout():
             self.log.error(
                 "Job timed out",
                 start_time=started_at,
-                timeout=self.job.timeout.total_seconds(),
+                timeout=timeout.total_seconds(),
             )
             timeout_fired.set()
             self.stopping.set()
 
         cancel_func: Optional[Callable[[], None]] = None
 
-        if self.job.timeout:
+        if timeout:
             cancel_func = self._timeout_tracker.add_timeout(
-                self.job.timeout, fire_timeout
+                timeout, fire_timeout, name=self.job.name
             )
 
         try:
             django.db.reset_queries()  # This is normally run before each request
-            self.job(run_env)
-            self.log.info("Job finished successfully")
+            with reading_from(read_alias):
+                fingerprint = self._take_fingerprint(run_env)
+
+                if self._inputs_unchanged(fingerprint):
+                    outcome = OUTCOME_SKIPPED
+                    self._routine("Job inputs unchanged, skipping run")
+                else:
+                    self._call_job(run_env)
+                    self._last_fingerprint = fingerprint
+                    self._routine("Job finished successfully")
         except RunInterrupted:
+            outcome = OUTCOME_INTERRUPTED
             self.log.info("Job was interrupted during run cycle")
         except Exception as exc:
             if tracker_env.requested_fatal_errors:
                 self.log.warning("Job requested fatal errors, propagating error")
                 raise exc
+            outcome = OUTCOME_ERROR
             self.log.exception("Finished job with exception", error=str(exc))
         finally:
             if cancel_func:
                 cancel_func()
 
         if timeout_fired.is_set():
+            outcome = OUTCOME_TIMEOUT
             self.log.debug(
                 "Edge case race condition detected: "
                 "job timeout fired out and also finished"
@@ -151,44 +759,137 @@ class JobThread(Thread):
             # we don't want a clean exit if we are exiting due to timeout
             self._on_fatal()
 
-        now = time.monotonic()
-        execution_time = now - started_at
+        return tracker_env, outcome
 
-        interval = self.job.interval.total_seconds()
-        variance = self.job.variance.total_seconds() * random()
-        # The default is to obey the job mechanics
-        self._next_run = now + interval + variance - execution_time
+    def _read_alias(self) -> Optional[str]:
+        if not self.job.read_using:
+            return None
 
-        if tracker_env.requested_rerun:
-            # Override next run to go immediately if the job requests it
-            self.log.debug("Job requested rerun without delay")
-            self._next_run = now
+        max_lag = self.job.max_replica_lag
+        return choose_read_alias(
+            self.job.read_using,
+            max_lag.total_seconds() if max_lag is not None else None,
+            self.log,
+        )
 
-        if tracker_env.requested_stop:
-            self.log.warning("Job requested stop")
-            self.stopping.set()
+    def _take_fingerprint(self, run_env: RunEnv) -> Any:
+        if not self.job.fingerprint:
+            return _NO_FINGERPRINT
 
-        self._cleanup_database()
-        self._schedule_next_db_cleanup()
-        self.log.info(
-            "Job execution finished",
-            next_run=self._next_run,
-            execution_time=execution_time,
-            now=now,
+        return self.job.fingerprint(run_env)
+
+    def _inputs_unchanged(self, fingerprint: Any) -> bool:
+        if fingerprint is _NO_FINGERPRINT:
+            return False
+
+        return fingerprint == self._last_fingerprint
+
+    def _call_job(self, run_env: RunEnv):
+        with self._interrupt_lock:
+            self._in_job = True
+            self._interrupt_sent = False
+
+        try:
+            self.job(run_env)
+        finally:
+            with self._interrupt_lock:
+                self._in_job = False
+
+    def interrupt(self) -> bool:
+        """Force a RunInterrupted into the job if it is currently running.
+
+        This is for jobs that never check for stops, and is only done
+        while the job body itself is executing"""
+
+        if self.job.isolation == ISOLATION_SUBPROCESS:
+            return False
+
+        with self._interrupt_lock:
+            if not self._in_job or self._interrupt_sent or self.ident is None:
+                return False
+
+            self.log.warning("Forcing job interruption")
+            self._interrupt_sent = inject_exception(self.ident, RunInterrupted)
+            return self._interrupt_sent
+
+    def _execute_isolated(self, started_at: float) -> IsolatedResult:
+        deadline: Optional[float] = None
+        timeout = self.timeout
+        if timeout:
+            deadline = started_at + timeout.total_seconds()
+
+        # The fingerprint is cheap, so it is taken here rather than in the child
+        read_alias = self._read_alias()
+        run_env, _ = get_environments(
+            self._halt,
+            self._job_state,
+            self._cache,
+            database_alias=self.job.database_alias,
+            read_alias=read_alias,
         )
+        try:
+            with reading_from(read_alias):
+                fingerprint = self._take_fingerprint(run_env)
+        except RunInterrupted:
+            self.log.info("Job was interrupted during run cycle")
+            return IsolatedResult(OUTCOME_INTERRUPTED)
+        except Exception as exc:
+            self.log.exception("Finished job with exception", error=str(exc))
+            return IsolatedResult(OUTCOME_ERROR, error=str(exc))
+
+        if self._inputs_unchanged(fingerprint):
+            self._routine("Job inputs unchanged, skipping run")
+            return IsolatedResult(OUTCOME_SKIPPED)
+
+        # The forked child must not share this thread's database connections
+        django.db.connections.close_all()
+
+        result = IsolatedRun(
+            self.job, self._job_state, self._rate_limits, read_alias, self._cursors
+        ).run(self._halt, deadline)
+
+        if result.outcome == OUTCOME_SUCCESS:
+            self._last_fingerprint = fingerprint
+            self._routine("Job finished successfully")
+        elif result.outcome == OUTCOME_INTERRUPTED:
+            self.log.info("Job was interrupted during run cycle")
+        elif result.outcome == OUTCOME_TIMEOUT:
+            # Only set when there was a deadline, which needs a timeout
+            assert timeout is not None
+            # Only the child was killed, so the job is rescheduled as normal
+            self.log.error(
+                "Job timed out, isolated process killed",
+                start_time=started_at,
+                timeout=timeout.total_seconds(),
+            )
+        else:
+            if result.requested_fatal_errors:
+                self.log.warning("Job requested fatal errors, propagating error")
+                raise IsolatedJobError(result.error)
+            self.log.error(
+                "Finished job with exception",
+                error=result.error,
+                outcome=result.outcome,
+            )
+
+        return result
 
     def _run(self):
         self.log.info(
             "Starting job execution thread",
-            interval=self.job.interval,
-            variance=self.job.variance,
+            interval=self.interval,
+            variance=self.variance,
+            isolation=self.job.isolation,
+            phase=self._phase,
         )
 
-        while not self.stopping.is_set():
+        while not self._halt.is_set():
             delay = self._next_event_delay
-            self.log.debug("Delaying thread loop", delay=delay)
-            if self.stopping.wait(delay):
-                return
+            self._trace("Delaying thread loop", delay=delay)
+            if self._wakeup.wait(delay):
+                # Halted, or the schedule changed and the delay needs working out again
+                self._wakeup.clear()
+                continue
 
             self._conditional_run()
             self._conditional_cleanup()
@@ -198,9 +899,51 @@ class JobThread(Thread):
     def run(self):
         try:
             self._run()
+        except RunInterrupted:
+            # A forced interruption can land just after the job body returned.
+            # They are only sent while stopping, so the thread can just exit
+            self.log.warning("Forced interruption arrived outside of the job")
         except Exception as exc:
             # All exceptions from jobs should be caught in the job run method.
             # An exception here indicates that something went wrong with
             # the runner itself and is not anticipated to be recoverable.
             self.log.exception("Error thrown in job thread", error=str(exc))
             self._on_fatal()
+        finally:
+            self.state = STATE_STOPPED
+            self._log_sampler.flush()
+
+            if self.latency.execution_time.count:
+                self.log.info("Job latency summary", **self._latency_summary())
+
+    def _latency_summary(self) -> dict:
+        return {
+            f"{measurement}_{key}": value
+            for measurement, summary in self.latency.summary().items()
+            for key, value in summary.items()
+            if key != "count"
+        }
+
+    def snapshot(self) -> dict:
+        """The current state of the job, read without any locking"""
+
+        now = time.monotonic()
+        run_started_at = self._run_started_at
+
+        return {
+            "job_name": self.job.name,
+            "state": self.state,
+            "next_run_in": self._next_run - now,
+            "next_database_cleanup_in": (
+                self._next_database_cleanup - now
+                if self._next_database_cleanup
+                else None
+            ),
+            "current_run_age": now - run_started_at if run_started_at else None,
+            "last_duration": self._last_duration,
+            "last_outcome": self._last_outcome,
+            "history": self.history.stats(),
+            "latency": self.latency.summary(),
+            "circuit": self._circuit.snapshot() if self._circuit else None,
+            "override": self._override.as_dict() if self._override else None,
+        }
@@ -0,0 +1,177 @@
+"""Keeps each job's schedule across job runner restarts"""
+
+from datetime import datetime, timezone as dt_timezone
+import json
+import math
+import os
+import tempfile
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from job_runner.models import JobSchedule
+
+CATCH_UP_SKIP = "skip"
+CATCH_UP_ONCE = "once"
+CATCH_UP_ALL = "all"
+CATCH_UP_POLICIES = (CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL)
+
+DEFAULT_MAX_CATCH_UP_RUNS = 100
+
+
+class SavedSchedule:
+    """Wall clock times, as seconds since the epoch, along with
+    the positions of any chunked iteration the job was part way through"""
+
+    __slots__ = ("last_run_at", "next_run_at", "cursors")
+
+    def __init__(
+        self,
+        last_run_at: Optional[float],
+        next_run_at: float,
+        cursors: Optional[Dict[str, Any]] = None,
+    ):
+        self.last_run_at = last_run_at
+        self.next_run_at = next_run_at
+        self.cursors = cursors or {}
+
+
+class ScheduleStore:
+    def load(self) -> Dict[str, SavedSchedule]:
+        raise NotImplementedError()
+
+    def save(self, job_name: str, schedule: SavedSchedule):
+        raise NotImplementedError()
+
+
+class FileScheduleStore(ScheduleStore):
+    """Keeps every job's schedule in a single local JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._schedules: Dict[str, SavedSchedule] = {}
+
+    def load(self) -> Dict[str, SavedSchedule]:
+        try:
+            with open(self.path) as schedule_file:
+                data = json.load(schedule_file)
+        except FileNotFoundError:
+            data = {}
+
+        with self._lock:
+            self._schedules = {
+                job_name: SavedSchedule(
+                    entry["last_run_at"], entry["next_run_at"], entry.get("cursors")
+                )
+                for job_name, entry in data.items()
+            }
+            return dict(self._schedules)
+
+    def save(self, job_name: str, schedule: SavedSchedule):
+        with self._lock:
+            self._schedules[job_name] = schedule
+            data = {
+                name: {
+                    "last_run_at": saved.last_run_at,
+                    "next_run_at": saved.next_run_at,
+                    "cursors": saved.cursors,
+                }
+                for name, saved in self._schedules.items()
+            }
+
+            # Write and then rename, so a crash never leaves a partial file behind
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as temp_file:
+                    json.dump(data, temp_file, cls=DjangoJSONEncoder)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    value = datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+    if not settings.USE_TZ:
+        return timezone.make_naive(value)
+
+    return value
+
+
+class DatabaseScheduleStore(ScheduleStore):
+    """Keeps each job's schedule in a JobSchedule row"""
+
+    def load(self) -> Dict[str, SavedSchedule]:
+        return {
+            row.job_name: SavedSchedule(
+                row.last_run_at.timestamp() if row.last_run_at else None,
+                row.next_run_at.timestamp(),
+                json.loads(row.cursors),
+            )
+            for row in JobSchedule.objects.all()
+        }
+
+    def save(self, job_name: str, schedule: SavedSchedule):
+        JobSchedule.objects.update_or_create(
+            job_name=job_name,
+            defaults={
+                "last_run_at": (
+                    _to_datetime(schedule.last_run_at)
+                    if schedule.last_run_at is not None
+                    else None
+                ),
+                "next_run_at": _to_datetime(schedule.next_run_at),
+                "cursors": json.dumps(schedule.cursors, cls=DjangoJSONEncoder),
+            },
+        )
+
+
+def plan_resume(
+    saved: SavedSchedule,
+    interval: float,
+    policy: str,
+    now: float,
+    max_catch_up_runs: int = DEFAULT_MAX_CATCH_UP_RUNS,
+) -> Tuple[float, int]:
+    """Work out how long until a restored job's first run, and how many
+    missed runs should follow it straight away"""
+
+    overdue = now - saved.next_run_at
+    if overdue < 0:
+        return -overdue, 0
+
+    missed = 1 + (math.floor(overdue / interval) if interval > 0 else 0)
+
+    if policy == CATCH_UP_SKIP:
+        if interval <= 0:
+            return 0, 0
+
+        # Wait for the next slot on the old schedule
+        return interval * missed - overdue, 0
+
+    if policy == CATCH_UP_ALL:
+        return 0, min(missed, max_catch_up_runs) - 1
+
+    return 0, 0
+
+
+def max_catch_up_runs() -> int:
+    return getattr(settings, "JOB_RUNNER_MAX_CATCH_UP_RUNS", DEFAULT_MAX_CATCH_UP_RUNS)
+
+
+def build_schedule_store(
+    path: Optional[str], use_database: bool
+) -> Optional[ScheduleStore]:
+    if use_database:
+        return DatabaseScheduleStore()
+
+    if path:
+        return FileScheduleStore(path)
+
+    return None
@@ -0,0 +1,98 @@
+"""A local status endpoint exposing the live state of the job runner"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import os
+from socketserver import BaseServer, ThreadingMixIn, UnixStreamServer
+from threading import Thread
+from typing import Callable, Optional
+
+from structlog import get_logger
+
+logger = get_logger(__name__)
+
+StatusCollector = Callable[[], dict]
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def _get_handler(collect: StatusCollector):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/status"):
+                self.send_error(404)
+                return
+
+            body = json.dumps(collect(), default=str).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self) -> str:
+            # Unix socket clients don't have an address
+            if isinstance(self.client_address, tuple):
+                return str(self.client_address[0])
+
+            return "unix"
+
+        def log_message(self, format: str, *args):
+            logger.debug("Status request", request=format % args)
+
+    return StatusHandler
+
+
+class StatusServer:
+    """Serves the collected status as JSON over TCP or a Unix socket"""
+
+    def __init__(
+        self,
+        collect: StatusCollector,
+        port: Optional[int] = None,
+        host: str = "127.0.0.1",
+        socket_path: Optional[str] = None,
+    ):
+        handler = _get_handler(collect)
+        self._socket_path = socket_path
+        self._server: BaseServer
+
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+            self._server = _ThreadingUnixHTTPServer(socket_path, handler)
+        elif port is not None:
+            self._server = _ThreadingHTTPServer((host, port), handler)
+        else:
+            raise ValueError("Either a port or a socket path is required")
+
+        self._thread = Thread(
+            target=self._server.serve_forever, name="Status server", daemon=True
+        )
+
+    @property
+    def port(self) -> Optional[int]:
+        if self._socket_path:
+            return None
+
+        return self._server.server_address[1]  # type: ignore
+
+    def start(self):
+        self._thread.start()
+        logger.info(
+            "Status server started", port=self.port, socket_path=self._socket_path
+        )
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
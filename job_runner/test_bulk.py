@@ -0,0 +1,71 @@
+"""Tests for the buffered bulk writer"""
+
+from threading import Event
+
+import pytest
+
+from test_app.models import Widget
+
+from .environment import RunInterrupted, get_environments
+
+
+def test_batches(db, django_assert_num_queries):
+    env, tracker = get_environments(Event())
+
+    with env.bulk_writer(Widget, batch_size=2) as writer:
+        with django_assert_num_queries(1):
+            writer.create(Widget(name="one"))
+            writer.create(Widget(name="two"))
+
+        writer.create(Widget(name="three"))
+        assert Widget.objects.count() == 2
+
+    assert Widget.objects.count() == 3
+    assert writer.rows_written == 3
+    assert tracker.rows_written == 3
+    assert tracker.flush_time > 0
+
+
+def test_update(db):
+    Widget.objects.bulk_create(Widget(name=f"widget {i}") for i in range(3))
+    env, _ = get_environments(Event())
+
+    with env.bulk_writer(Widget, fields=["processed"]) as writer:
+        for widget in Widget.objects.all():
+            widget.processed = True
+            writer.update(widget)
+
+    assert Widget.objects.filter(processed=True).count() == 3
+
+
+def test_update_requires_fields(db):
+    env, _ = get_environments(Event())
+
+    with pytest.raises(ValueError):
+        with env.bulk_writer(Widget) as writer:
+            writer.update(Widget(name="one"))
+
+
+def test_flush_on_interrupt(db):
+    stop = Event()
+    env, _ = get_environments(stop)
+
+    with pytest.raises(RunInterrupted):
+        with env.bulk_writer(Widget) as writer:
+            writer.create(Widget(name="one"))
+            stop.set()
+            env.raise_if_stopping()
+
+    assert Widget.objects.count() == 1
+
+
+def test_discard_on_error(db):
+    env, tracker = get_environments(Event())
+
+    with pytest.raises(KeyError):
+        with env.bulk_writer(Widget) as writer:
+            writer.create(Widget(name="one"))
+            raise KeyError()
+
+    assert Widget.objects.count() == 0
+    assert tracker.rows_written == 0
@@ -0,0 +1,144 @@
+"""Tests for per-job state and the runner cache"""
+
+from threading import Event, Thread
+import time
+from typing import List
+
+from django.core.management import call_command
+
+from .cache import RunnerCache
+from .environment import RunEnv, RunInterrupted
+from .registration import register_job
+
+
+def test_lru_eviction():
+    cache = RunnerCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Using "a" makes "b" the least recently used
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_ttl():
+    cache = RunnerCache(ttl=10)
+    cache.set("short", 1, ttl=0)
+    cache.set("long", 2)
+
+    assert cache.get("short", "expired") == "expired"
+    assert cache.get("long") == 2
+
+
+def test_single_flight():
+    cache = RunnerCache()
+    release = Event()
+    calls: List[int] = []
+    results: List[int] = []
+
+    def factory():
+        calls.append(1)
+        release.wait(5)
+        return 42
+
+    def worker():
+        results.append(cache.get_or_set("answer", factory))
+
+    threads = [Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == [42] * 5
+    assert cache.stats()["misses"] == 1
+
+
+def test_waiter_gives_up_on_stop():
+    stop = Event()
+    cache = RunnerCache(stop=stop)
+    release = Event()
+    errors: List[Exception] = []
+
+    def hung():
+        release.wait(5)
+        return 1
+
+    loader = Thread(target=cache.get_or_set, args=("key", hung))
+    loader.start()
+    time.sleep(0.1)
+
+    def waiter():
+        try:
+            cache.get_or_set("key", lambda: 2)
+        except RunInterrupted as exc:
+            errors.append(exc)
+
+    waiting = Thread(target=waiter)
+    waiting.start()
+    stop.set()
+    waiting.join(1)
+
+    assert not waiting.is_alive()
+    assert len(errors) == 1
+
+    release.set()
+    loader.join(5)
+
+
+def test_failed_factory_is_retried():
+    cache = RunnerCache()
+
+    def failing():
+        raise ValueError()
+
+    try:
+        cache.get_or_set("key", failing)
+    except ValueError:
+        pass
+
+    assert cache.get_or_set("key", lambda: 1) == 1
+
+
+stateful_runs = 0
+stateful_setups = 0
+
+
+@register_job(0.1)
+def stateful_job(env: RunEnv):
+    global stateful_runs, stateful_setups
+
+    def setup():
+        global stateful_setups
+        stateful_setups += 1
+        return "expensive"
+
+    assert env.cache.get_or_set("setup", setup) == "expensive"
+    env.state["runs"] = env.state.get("runs", 0) + 1
+    stateful_runs = env.state["runs"]
+
+
+def test_state_persists_across_runs():
+    global stateful_runs, stateful_setups
+    stateful_runs = 0
+    stateful_setups = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_cache.stateful_job",
+    )
+
+    assert stateful_runs > 3
+    assert stateful_setups == 1
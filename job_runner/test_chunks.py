@@ -0,0 +1,126 @@
+"""Tests for chunked queryset iteration"""
+
+from threading import Event
+import time
+
+import pytest
+
+from django.db import transaction
+
+from test_app.models import Widget
+
+from .environment import RunEnv, RunInterrupted, get_environments
+from .isolation import IsolatedRun, subprocess_isolation_available
+from .outcomes import OUTCOME_TIMEOUT
+from .registration import register_job
+
+
+@pytest.fixture
+def widgets(db):
+    Widget.objects.bulk_create(Widget(name=f"widget {i}") for i in range(10))
+
+
+def test_chunks(widgets):
+    env, _ = get_environments(Event())
+
+    chunks = list(env.iter_chunks(Widget.objects.all(), 4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [widget.name for chunk in chunks for widget in chunk] == [
+        f"widget {i}" for i in range(10)
+    ]
+
+
+def test_descending_chunks(widgets):
+    env, _ = get_environments(Event())
+
+    chunks = list(env.iter_chunks(Widget.objects.all(), 5, order_by="-id"))
+
+    assert chunks[0][0].name == "widget 9"
+    assert chunks[-1][-1].name == "widget 0"
+
+
+def test_resume_after_stop(widgets):
+    stop = Event()
+    cursors: dict = {}
+    env, _ = get_environments(stop, cursors=cursors)
+    seen = []
+
+    with pytest.raises(RunInterrupted):
+        for chunk in env.iter_chunks(Widget.objects.all(), 3, resume_key="widgets"):
+            seen.extend(widget.name for widget in chunk)
+            stop.set()
+
+    assert len(seen) == 3
+    assert "widgets" in cursors
+
+    env, _ = get_environments(Event(), cursors=cursors)
+    for chunk in env.iter_chunks(Widget.objects.all(), 3, resume_key="widgets"):
+        seen.extend(widget.name for widget in chunk)
+
+    assert seen == [f"widget {i}" for i in range(10)]
+    assert "widgets" not in cursors
+
+
+@pytest.mark.django_db(transaction=True)
+def test_atomic_chunk_rolls_back():
+    Widget.objects.bulk_create(Widget(name=f"widget {i}") for i in range(4))
+    cursors: dict = {}
+    env, _ = get_environments(Event(), cursors=cursors)
+
+    def process(chunk):
+        for widget in chunk:
+            widget.processed = True
+            widget.save()
+
+        if chunk[0].name == "widget 2":
+            raise ValueError()
+
+    with pytest.raises(ValueError):
+        env.process_chunks(
+            Widget.objects.all(), process, 2, atomic=True, resume_key="widgets"
+        )
+
+    assert Widget.objects.filter(processed=True).count() == 2
+    assert cursors["widgets"] == Widget.objects.get(name="widget 1").pk
+
+
+@pytest.mark.django_db(transaction=True)
+def test_atomic_chunk_committed_before_next():
+    Widget.objects.bulk_create(Widget(name=f"widget {i}") for i in range(4))
+    env, _ = get_environments(Event())
+    committed = []
+
+    def process(chunk):
+        for widget in chunk:
+            widget.processed = True
+            widget.save()
+        transaction.on_commit(lambda: committed.append(len(chunk)))
+
+    env.process_chunks(Widget.objects.all(), process, 2, atomic=True)
+
+    assert committed == [2, 2]
+    assert Widget.objects.filter(processed=True).count() == 4
+
+
+@register_job(60, isolation="subprocess")
+def moves_cursor_then_hangs(env: RunEnv):
+    # Stands in for iter_chunks, which needs a database the child can reach
+    env._env.cursors["widgets"] = 3
+    env._env.cursors.pop("done", None)
+    time.sleep(30)
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.skipif(
+    not subprocess_isolation_available(), reason="Subprocess isolation needs fork"
+)
+def test_killed_child_keeps_cursor():
+    cursors = {"done": 1}
+
+    result = IsolatedRun(moves_cursor_then_hangs, cursors=cursors).run(
+        Event(), time.monotonic() + 1
+    )
+
+    assert result.outcome == OUTCOME_TIMEOUT
+    assert cursors == {"widgets": 3}
@@ -0,0 +1,89 @@
+"""Tests for failure backoff and the circuit breaker"""
+
+import pytest
+
+from django.core.management import call_command
+
+from .circuit import CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker
+from .environment import RunEnv, RunInterrupted
+from .registration import register_job
+from .runner import JobThread, StopEvent
+from .timeouts import TimeoutTracker
+
+failing_count = 0
+
+
+def test_exponential_backoff():
+    circuit = CircuitBreaker(backoff=1, max_backoff=6)
+
+    delays = [circuit.record_failure() for _ in range(5)]
+
+    for delay, expected in zip(delays, [1, 2, 4, 6, 6]):
+        assert expected / 2 <= delay <= expected
+
+    assert circuit.state == CIRCUIT_CLOSED
+
+
+def test_circuit_opens_and_probes():
+    circuit = CircuitBreaker(threshold=2, reset_timeout=30)
+
+    assert circuit.record_failure() == 0
+    assert circuit.record_failure() == 30
+    assert circuit.state == CIRCUIT_OPEN
+
+    # A failed probe opens the circuit again
+    assert circuit.start_run()
+    assert circuit.state == CIRCUIT_HALF_OPEN
+    assert circuit.record_failure() == 30
+    assert circuit.state == CIRCUIT_OPEN
+
+    assert circuit.start_run()
+    assert circuit.record_success()
+    assert circuit.snapshot() == {"state": CIRCUIT_CLOSED, "failures": 0}
+
+
+def test_invalid_threshold():
+    with pytest.raises(ValueError):
+        register_job(1, circuit_threshold=0)
+
+
+@register_job(0, circuit_threshold=3, circuit_reset=60)
+def failing_rerun_job(env: RunEnv):
+    global failing_count
+
+    failing_count += 1
+    env.request_rerun()
+    raise Exception("The dependency is down")
+
+
+def test_failing_job_stops_at_open_circuit():
+    global failing_count
+    failing_count = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_circuit.failing_rerun_job",
+    )
+
+    assert failing_count == 3
+
+
+@register_job(60, circuit_threshold=1)
+def interrupted_job(env: RunEnv):
+    raise RunInterrupted()
+
+
+def test_interrupted_probe_leaves_circuit_half_open(db):
+    stop = StopEvent()
+    thread = JobThread(interrupted_job, stop, lambda: None, TimeoutTracker(stop))
+    assert thread._circuit
+    thread._circuit.record_failure()
+    assert thread._circuit.state == CIRCUIT_OPEN
+
+    thread._run_once()
+
+    assert thread._circuit.state == CIRCUIT_HALF_OPEN
+    assert thread._circuit.failures == 1
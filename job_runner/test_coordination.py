@@ -0,0 +1,142 @@
+"""Tests for coordinated restarts between replicas"""
+
+import time
+from datetime import timedelta
+from threading import Event
+from typing import List
+
+from django.utils import timezone
+
+from .coordination import RestartCoordinator
+from .models import RunnerHeartbeat
+
+
+def make_coordinator(runner_id: str, min_peers: int = 1) -> RestartCoordinator:
+    return RestartCoordinator(Event(), min_peers=min_peers, runner_id=runner_id)
+
+
+def test_stops_with_enough_peers(db):
+    a = make_coordinator("a")
+    b = make_coordinator("b")
+    b.beat()
+
+    a.request_restart()
+    a.beat()
+
+    assert a._stop_evt.is_set()
+    assert RunnerHeartbeat.objects.get(runner_id="a").stopping_since
+
+
+def test_waits_without_peers(db):
+    a = make_coordinator("a")
+    a.request_restart()
+    a.beat()
+
+    assert not a._stop_evt.is_set()
+    assert a.restart_pending
+
+
+def test_ignores_stale_peers(db):
+    RunnerHeartbeat.objects.create(
+        runner_id="gone", last_seen_at=timezone.now() - timedelta(hours=1)
+    )
+    a = make_coordinator("a")
+    a.request_restart()
+    a.beat()
+
+    assert not a._stop_evt.is_set()
+
+
+def test_one_restart_at_a_time(db):
+    a = make_coordinator("a")
+    b = make_coordinator("b")
+    c = make_coordinator("c")
+    for coordinator in (a, b, c):
+        coordinator.beat()
+
+    a.request_restart()
+    b.request_restart()
+    a.beat()
+    b.beat()
+
+    assert a._stop_evt.is_set()
+    assert not b._stop_evt.is_set()
+
+    # Once the first runner is gone, the next may go
+    a.unregister()
+    b.beat()
+    assert b._stop_evt.is_set()
+
+
+def test_backs_off_from_earlier_announcement(db):
+    a = make_coordinator("a")
+    b = make_coordinator("b")
+    c = make_coordinator("c")
+    for coordinator in (a, b, c):
+        coordinator.beat()
+
+    b.request_restart()
+    b.beat()
+    assert b._stop_evt.is_set()
+
+    # The first look at the peers happened just before b announced its stop
+    peers = a._peers
+    looks: List[str] = []
+
+    def racing_peers():
+        looks.append("look")
+        if len(looks) == 1:
+            return peers().filter(stopping_since__isnull=True)
+        return peers()
+
+    a._peers = racing_peers  # type: ignore[method-assign]
+    a.request_restart()
+    a.beat()
+
+    assert not a._stop_evt.is_set()
+    assert not RunnerHeartbeat.objects.get(runner_id="a").stopping_since
+
+
+def test_backs_off_despite_clock_behind(db, monkeypatch):
+    a = make_coordinator("a")
+    b = make_coordinator("b")
+    c = make_coordinator("c")
+    for coordinator in (a, b, c):
+        coordinator.beat()
+
+    b.request_restart()
+    b.beat()
+    assert b._stop_evt.is_set()
+    time.sleep(0.01)
+
+    # a's clock runs an hour behind and it raced b's announcement
+    behind = timezone.now() - timedelta(hours=1)
+    monkeypatch.setattr(timezone, "now", lambda: behind)
+    peers = a._peers
+    looks: List[str] = []
+
+    def racing_peers():
+        looks.append("look")
+        if len(looks) == 1:
+            return peers().filter(stopping_since__isnull=True)
+        return peers()
+
+    a._peers = racing_peers  # type: ignore[method-assign]
+    a.request_restart()
+    a.beat()
+
+    assert not a._stop_evt.is_set()
+
+
+def test_leave_marks_stopping(db):
+    a = make_coordinator("a")
+    b = make_coordinator("b")
+    a.beat()
+    b.beat()
+    a.leave()
+
+    b.request_restart()
+    b.beat()
+
+    assert not b._stop_evt.is_set()
+    assert b.peers_alive == 0
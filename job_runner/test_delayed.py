@@ -0,0 +1,149 @@
+"""Tests for one-off delayed tasks"""
+
+from datetime import timedelta
+from threading import Event
+import time
+from typing import List
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .delayed import DelayedTaskRunner, enqueue_at, enqueue_many
+from .models import DelayedTask
+
+calls: List[tuple] = []
+
+
+def record_call(*args, **kwargs):
+    calls.append((time.monotonic(), args, kwargs))
+
+
+def explode():
+    raise ValueError("Delayed explosion")
+
+
+def test_enqueue_at_delay(db):
+    before = timezone.now()
+    task = enqueue_at("job_runner.test_delayed.record_call", 60, [1], {"a": 2})
+
+    assert task.due_at >= before + timedelta(seconds=60)
+    assert task.args == "[1]"
+
+
+def test_enqueue_invalid_path(db):
+    with pytest.raises(ImportError):
+        enqueue_at("job_runner.test_delayed.missing", 0)
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_runner_runs_due_tasks():
+    calls.clear()
+    enqueue_many(
+        [
+            ("job_runner.test_delayed.record_call", 0.5, ["later"]),
+            ("job_runner.test_delayed.record_call", 0, ["now"]),
+            ("job_runner.test_delayed.explode", 0, []),
+            ("job_runner.test_delayed.record_call", 3600, ["much later"]),
+        ]
+    )
+
+    stop = Event()
+    runner = DelayedTaskRunner(stop, poll_interval=60)
+    started_at = time.monotonic()
+    runner.start()
+
+    while runner.finished < 2 and time.monotonic() - started_at < 5:
+        time.sleep(0.05)
+
+    stop.set()
+    runner.join(5)
+
+    assert [args for _, args, _ in calls] == [("now",), ("later",)]
+    # Loaded in the first query, the later task still starts on time
+    assert calls[1][0] - started_at < 1
+    assert runner.failed == 1
+    assert DelayedTask.objects.filter(failed_at__isnull=False).count() == 1
+    assert DelayedTask.objects.filter(failed_at__isnull=True).count() == 1
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_claimed_task_is_skipped():
+    calls.clear()
+    task = enqueue_at("job_runner.test_delayed.record_call", 0)
+    DelayedTask.objects.filter(pk=task.pk).update(claimed_at=timezone.now())
+
+    stop = Event()
+    runner = DelayedTaskRunner(stop)
+    runner._load()
+
+    assert runner.stats()["queued"] == 0
+    assert calls == []
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_expired_claim_is_run_again():
+    calls.clear()
+    task = enqueue_at("job_runner.test_delayed.record_call", 0)
+    DelayedTask.objects.filter(pk=task.pk).update(
+        claimed_at=timezone.now() - timedelta(seconds=120)
+    )
+
+    stop = Event()
+    runner = DelayedTaskRunner(stop, lease=60)
+    runner._load()
+    runner._step()
+
+    assert runner.finished == 1
+    assert len(calls) == 1
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_load_continues_after_full_batch():
+    enqueue_many(
+        [("job_runner.test_delayed.record_call", 0, [index]) for index in range(5)]
+    )
+
+    runner = DelayedTaskRunner(Event(), batch_size=2)
+    runner._load()
+    runner._load()
+    runner._load()
+
+    assert runner.stats()["queued"] == 5
+    assert runner._load_after is None
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_stopped_runner_leaves_task_unclaimed():
+    task = enqueue_at("job_runner.test_delayed.record_call", 0)
+
+    stop = Event()
+    runner = DelayedTaskRunner(stop)
+    stop.set()
+    runner._run_task(task.pk, 0)
+
+    assert DelayedTask.objects.get(pk=task.pk).claimed_at is None
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.django_db(transaction=True)
+def test_delayed_tasks_flag():
+    calls.clear()
+    enqueue_at("job_runner.test_delayed.record_call", 0)
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--delayed-tasks",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+    )
+
+    assert len(calls) == 1
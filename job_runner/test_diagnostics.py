@@ -0,0 +1,104 @@
+"""Tests for the SIGUSR1 diagnostic dump"""
+
+from threading import Event
+import signal
+import threading
+import time
+
+import pytest
+
+from django.core.management import call_command
+from structlog import get_logger
+
+from .diagnostics import collect_diagnostics, dump_diagnostics
+from .environment import RunEnv
+from .registration import register_job
+from .runner import STATE_RUNNING, JobThread, StopEvent
+from .timeouts import TimeoutTracker
+
+blocked = Event()
+
+
+@register_job(60, timeout=30)
+def blocking_job(env: RunEnv):
+    blocked.wait()
+
+
+@pytest.fixture
+def running_job():
+    blocked.clear()
+    stop = StopEvent()
+    tracker = TimeoutTracker(stop)
+    tracker.daemon = True
+    tracker.start()
+    thread = JobThread(blocking_job, stop, lambda: None, tracker)
+    thread.daemon = True
+    thread.start()
+
+    while thread.state != STATE_RUNNING:
+        time.sleep(0.01)
+
+    yield thread, tracker
+
+    blocked.set()
+    stop.set()
+    thread.join(1)
+
+
+def test_stacks_grouped_by_job(running_job):
+    thread, tracker = running_job
+    time.sleep(0.1)
+
+    diagnostics = collect_diagnostics([thread], tracker)
+
+    job = diagnostics["jobs"][0]
+    assert job["job_name"] == blocking_job.name
+    assert job["state"] == STATE_RUNNING
+    assert job["current_run_age"] > 0
+    assert any("blocking_job" in line for line in job["stack"])
+    assert diagnostics["timeouts"][0]["name"] == blocking_job.name
+    assert all(other["thread_name"] != thread.name for other in diagnostics["threads"])
+
+
+def test_unstarted_thread_skipped():
+    stop = StopEvent()
+    tracker = TimeoutTracker(stop)
+    thread = JobThread(blocking_job, stop, lambda: None, tracker)
+
+    assert collect_diagnostics([thread], tracker)["jobs"] == []
+
+
+def test_dump_to_file(running_job, tmp_path):
+    thread, tracker = running_job
+    path = tmp_path / "dump.txt"
+
+    dump_diagnostics(get_logger(), [thread], tracker, str(path))
+    dump_diagnostics(get_logger(), [thread], tracker, str(path))
+
+    content = path.read_text()
+    assert content.count(f"Job {blocking_job.name}: running") == 2
+    assert "Pending timeouts" in content
+
+
+@pytest.mark.timeout(5)
+def test_sigusr1_keeps_running(tmp_path):
+    path = tmp_path / "dump.txt"
+
+    def send_signals():
+        main_thread = threading.main_thread().ident
+        time.sleep(0.5)
+        signal.pthread_kill(main_thread, signal.SIGUSR1)
+        time.sleep(0.5)
+        signal.pthread_kill(main_thread, signal.SIGTERM)
+
+    threading.Thread(target=send_signals, name="Signal sender").start()
+
+    call_command(
+        "run_jobs",
+        "--include-job",
+        "job_runner.sample_jobs.sample_job_1",
+        "--diagnostics-file",
+        str(path),
+    )
+
+    assert "Job job_runner.sample_jobs.sample_job_1" in path.read_text()
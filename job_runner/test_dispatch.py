@@ -0,0 +1,160 @@
+"""Tests for priority and deadline dispatch of limited run slots"""
+
+from threading import Event, Thread
+import time
+from typing import List
+
+from django.core.management import call_command
+
+from .dispatch import Dispatcher
+from .environment import RunEnv
+from .registration import RegisteredJob, register_job
+
+grouped_running = 0
+grouped_max_running = 0
+
+
+@register_job(1)
+def low(env: RunEnv):
+    pass
+
+
+@register_job(1, priority=5)
+def high(env: RunEnv):
+    pass
+
+
+@register_job(1, deadline=1)
+def urgent(env: RunEnv):
+    pass
+
+
+@register_job(1, deadline=60)
+def relaxed(env: RunEnv):
+    pass
+
+
+def _queue(dispatcher: Dispatcher, job: RegisteredJob, order: List[str]):
+    """Acquire a slot in the background, and record the grant order"""
+
+    def target():
+        slot = dispatcher.acquire(job, time.monotonic())
+        order.append(job.name)
+        dispatcher.release(slot)
+
+    thread = Thread(target=target)
+    thread.start()
+    time.sleep(0.1)  # Make sure they queue up in order
+    return thread
+
+
+def _dispatch_order(dispatcher: Dispatcher, *jobs: RegisteredJob) -> List[str]:
+    blocker = dispatcher.acquire(low, time.monotonic())
+    assert blocker is not None
+    order: List[str] = []
+    threads = [_queue(dispatcher, job, order) for job in jobs]
+    dispatcher.release(blocker)
+
+    for thread in threads:
+        thread.join(1)
+
+    return order
+
+
+def test_priority_first():
+    dispatcher = Dispatcher(Event(), max_concurrent=1)
+    assert _dispatch_order(dispatcher, low, high) == [high.name, low.name]
+
+
+def test_earliest_deadline_first():
+    dispatcher = Dispatcher(Event(), max_concurrent=1)
+    assert _dispatch_order(dispatcher, relaxed, urgent) == [urgent.name, relaxed.name]
+
+
+def test_aging_prevents_starvation():
+    # With a tiny aging period the long waiting low priority job wins
+    dispatcher = Dispatcher(Event(), max_concurrent=1, aging=0.01)
+    assert _dispatch_order(dispatcher, low, high) == [low.name, high.name]
+
+
+def test_zero_aging_disables_aging():
+    dispatcher = Dispatcher(Event(), max_concurrent=1, aging=0)
+    assert _dispatch_order(dispatcher, low, high) == [high.name, low.name]
+
+
+def test_stop_releases_waiters():
+    stop = Event()
+    dispatcher = Dispatcher(stop, max_concurrent=1)
+    dispatcher.start()
+    dispatcher.acquire(low, time.monotonic())
+
+    results = []
+    thread = Thread(target=lambda: results.append(dispatcher.acquire(high, 0)))
+    thread.start()
+    time.sleep(0.1)
+    stop.set()
+    thread.join(1)
+
+    assert results == [None]
+
+
+def test_lag_stats():
+    dispatcher = Dispatcher(Event(), max_concurrent=1)
+    slot = dispatcher.acquire(high, time.monotonic() - 2)
+    dispatcher.release(slot)
+
+    stats = dispatcher.lag_stats()
+    assert stats[5]["count"] == 1
+    assert stats[5]["max"] >= 2
+
+
+@register_job(0.1, concurrency_group="limited")
+def grouped_1(env: RunEnv):
+    _grouped_run(env)
+
+
+@register_job(0.1, concurrency_group="limited")
+def grouped_2(env: RunEnv):
+    _grouped_run(env)
+
+
+def _grouped_run(env: RunEnv):
+    global grouped_running, grouped_max_running
+
+    grouped_running += 1
+    grouped_max_running = max(grouped_max_running, grouped_running)
+    env.sleep(0.05)
+    grouped_running -= 1
+
+
+def test_concurrency_group(settings):
+    global grouped_max_running
+    grouped_max_running = 0
+
+    settings.JOB_RUNNER_CONCURRENCY_GROUPS = {"limited": 1}
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_dispatch.grouped_1",
+        "--include-job",
+        "job_runner.test_dispatch.grouped_2",
+    )
+
+    assert grouped_max_running == 1
+
+
+def test_max_concurrent_jobs():
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--max-concurrent-jobs",
+        "1",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+        "--include-job",
+        "job_runner.test_management_command.slow_job",
+    )
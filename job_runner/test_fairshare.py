@@ -0,0 +1,120 @@
+"""Tests for rerun budgets and fair share between rerunning jobs"""
+
+from threading import Event, Thread
+import time
+from typing import List
+
+import pytest
+
+from django.core.management import call_command
+
+from .dispatch import Dispatcher
+from .environment import RunEnv
+from .fairshare import RerunBudget, UsageTracker
+from .registration import register_job
+
+budgeted_count = 0
+
+
+def test_rerun_budget():
+    budget = RerunBudget(2, 10)
+
+    assert budget.allow(0)
+    assert budget.allow(1)
+    assert not budget.allow(2)
+    assert budget.next_allowed(2) == 10
+    assert budget.allow(10)
+
+
+def test_usage_decays():
+    usage = UsageTracker(half_life=10)
+    usage.add("a", 8, now=0)
+
+    assert usage.weighted("a", 1, now=0) == pytest.approx(8)
+    assert usage.weighted("a", 1, now=10) == pytest.approx(4)
+    assert usage.weighted("a", 2, now=10) == pytest.approx(2)
+    assert usage.weighted("b", 1, now=10) == 0
+
+
+@register_job(1)
+def queued(env: RunEnv):
+    pass
+
+
+@register_job(1)
+def heavy(env: RunEnv):
+    pass
+
+
+@register_job(1, share=4)
+def favored(env: RunEnv):
+    pass
+
+
+def _order(dispatcher: Dispatcher, *requests) -> List[str]:
+    blocker = dispatcher.acquire(queued, time.monotonic())
+    assert blocker is not None
+    order: List[str] = []
+    threads = []
+
+    for job, rerun in requests:
+
+        def target(job=job, rerun=rerun):
+            slot = dispatcher.acquire(job, time.monotonic(), rerun=rerun)
+            order.append(job.name)
+            dispatcher.release(slot)
+
+        thread = Thread(target=target)
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.1)
+
+    dispatcher.release(blocker)
+    for thread in threads:
+        thread.join(1)
+
+    return order
+
+
+def test_reruns_yield_to_due_jobs():
+    dispatcher = Dispatcher(Event(), max_concurrent=1)
+    order = _order(dispatcher, (heavy, True), (queued, False))
+    assert order == [queued.name, heavy.name]
+
+
+def test_reruns_share_by_weight():
+    dispatcher = Dispatcher(Event(), max_concurrent=1)
+
+    # Both have used the same amount of time, but favored has four times the share
+    for job in (heavy, favored):
+        slot = dispatcher.acquire(job, time.monotonic())
+        time.sleep(0.05)
+        dispatcher.release(slot)
+
+    order = _order(dispatcher, (heavy, True), (favored, True))
+    assert order == [favored.name, heavy.name]
+
+
+@register_job(30, rerun_budget=3)
+def budgeted_rerun_job(env: RunEnv):
+    global budgeted_count
+
+    budgeted_count += 1
+    env.request_rerun()
+
+
+@pytest.mark.timeout(15)
+def test_rerun_budget_limits_reruns():
+    global budgeted_count
+    budgeted_count = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_fairshare.budgeted_rerun_job",
+    )
+
+    # The first run plus three reruns
+    assert budgeted_count == 4
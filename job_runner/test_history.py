@@ -0,0 +1,53 @@
+"""Tests for the in-memory run history"""
+
+from django.core.management import call_command
+
+from .history import RunHistory
+
+
+def test_ring_buffer_keeps_latest():
+    history = RunHistory(3)
+
+    for i in range(5):
+        history.record(float(i), i / 10, "success", cpu_time=0.01, query_count=i)
+
+    records = history.records()
+    assert len(history) == 3
+    assert [record.started_at for record in records] == [2.0, 3.0, 4.0]
+    assert [record.query_count for record in records] == [2, 3, 4]
+
+
+def test_stats():
+    history = RunHistory(10)
+    history.record(1.0, 1.0, "success")
+    history.record(2.0, 3.0, "error")
+
+    stats = history.stats()
+    assert stats["runs"] == 2
+    assert stats["outcomes"] == {"success": 1, "error": 1}
+    assert stats["mean_duration"] == 2.0
+    assert stats["max_duration"] == 3.0
+    assert stats["last_started_at"] == 2.0
+
+
+def test_disabled_history():
+    history = RunHistory(0)
+    history.record(1.0, 1.0, "success")
+
+    assert history.stats() == {"runs": 0}
+
+
+def test_print_job_history(capsys):
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--print-jobs",
+        "--history-size",
+        "5",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+    )
+
+    output = capsys.readouterr().out
+    assert "Recent runs: 5" in output
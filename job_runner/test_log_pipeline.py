@@ -0,0 +1,107 @@
+"""Tests for the asynchronous log sink and run log sampling"""
+
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+from django.core.management import call_command
+
+from .log_pipeline import AsyncLogSink, RunLogSampler
+
+
+class CaptureLog:
+    def __init__(self):
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+
+    def info(self, event: str, **kwargs):
+        self.events.append((event, kwargs))
+
+
+class CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+def test_sampler_every_runs():
+    log = CaptureLog()
+    sampler = RunLogSampler(log, every_runs=3)
+
+    for _ in range(7):
+        sampler.record(0.5)
+
+    assert len(log.events) == 2
+    event, fields = log.events[0]
+    assert event == "Job runs summarized"
+    assert fields["runs"] == 3
+    assert fields["total_execution_time"] == 1.5
+
+    sampler.flush()
+    assert len(log.events) == 3
+    assert log.events[-1][1]["runs"] == 1
+
+
+def test_sampler_disabled():
+    sampler = RunLogSampler(CaptureLog())
+    assert not sampler.enabled
+
+
+def test_async_sink_delivers_and_restores():
+    target = logging.getLogger("job_runner_test_sink")
+    target.setLevel(logging.INFO)
+    target.propagate = False
+    handler = CaptureHandler()
+    target.addHandler(handler)
+
+    sink = AsyncLogSink("job_runner_test_sink.child")
+    sink.start()
+    assert handler not in target.handlers
+
+    logging.getLogger("job_runner_test_sink.child").info("Queued record")
+    sink.stop()
+
+    assert handler in target.handlers
+    assert [record.getMessage() for record in handler.records] == ["Queued record"]
+
+    target.removeHandler(handler)
+
+
+def test_async_sink_detached_in_forked_child(tmp_path):
+    path = tmp_path / "child.log"
+    target = logging.getLogger("job_runner_test_fork")
+    target.setLevel(logging.INFO)
+    target.propagate = False
+    handler = logging.FileHandler(str(path))
+    target.addHandler(handler)
+
+    sink = AsyncLogSink("job_runner_test_fork")
+    sink.start()
+
+    pid = os.fork()
+    if pid == 0:
+        target.info("Logged from the child")
+        handler.flush()
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    sink.stop()
+    target.removeHandler(handler)
+    handler.close()
+
+    assert "Logged from the child" in path.read_text()
+
+
+def test_management_command_sampled_logging():
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--async-logging",
+        "--log-summary-runs",
+        "5",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+    )
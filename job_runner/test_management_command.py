@@ -1,15 +1,19 @@
 """Tests for management command"""
 
+from multiprocessing import Value
 from threading import Event
 import signal
 import threading
 import time
+from typing import List, Optional, Tuple
 
 import pytest
 
 from django.core.management import call_command
+from structlog import get_logger
 
 from job_runner.environment import RunEnv, RunInterrupted
+from job_runner.management.commands.run_jobs import interrupt_stuck_threads
 from job_runner.registration import register_job
 
 test_val = None
@@ -17,6 +21,9 @@ run_forever_event = Event()
 slow_job_count = 0
 fast_job_count = 0
 rerun_job_count = 0
+isolated_run_count = Value("i", 0)
+fingerprint_count = 0
+fingerprinted_job_count = 0
 
 
 def test_management_command_smoke():
@@ -454,3 +461,194 @@ def test_invalid_job_for_coverage():
     """Just call the invalid job to make my coverage higher"""
 
     invalid._func()
+
+
+@register_job(0, timeout=1, isolation="subprocess")
+def isolated_hang(env: RunEnv):
+    """A job that hangs without checking for stops, but only in a child process"""
+
+    with isolated_run_count.get_lock():
+        isolated_run_count.value += 1
+
+    while True:
+        time.sleep(1)
+
+
+@pytest.mark.timeout(20)
+def test_isolated_timeout_reschedules():
+    """A timed out isolated job is killed and rescheduled without stopping the runner"""
+
+    isolated_run_count.value = 0
+    global fast_job_count
+    fast_job_count = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "3",
+        "--include-job",
+        "job_runner.test_management_command.isolated_hang",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+    )
+
+    assert isolated_run_count.value >= 2
+    assert fast_job_count > 5
+
+
+@register_job(1, isolation="subprocess")
+def isolated_fatal(env: RunEnv):
+    env.request_fatal_errors()
+    raise Exception("I'm in danger in a child process!")
+
+
+@pytest.mark.timeout(10)
+def test_isolated_fatal():
+    with pytest.raises(SystemExit):
+        call_command(
+            "run_jobs",
+            "--include-job",
+            "job_runner.test_management_command.isolated_fatal",
+        )
+
+
+@register_job(0)
+def busy_loop_job(env: RunEnv):
+    """A job that never checks for stops"""
+
+    while True:
+        pass
+
+
+@pytest.mark.timeout(10)
+def test_interrupt_busy_loop():
+    """A stuck pure-Python job is interrupted instead of forcing an exit"""
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--interrupt-after",
+        "1",
+        "--include-job",
+        "job_runner.test_management_command.busy_loop_job",
+    )
+
+
+class StuckThread:
+    """Stands in for a job thread that never stops by itself"""
+
+    def __init__(self):
+        self.joins: List[float] = []
+        self.interrupted = False
+
+    def join(self, timeout: float):
+        self.joins.append(timeout)
+
+    def is_alive(self) -> bool:
+        return True
+
+    def interrupt(self) -> bool:
+        self.interrupted = True
+        return True
+
+    @property
+    def job(self):
+        return type("Job", (), {"name": "stuck"})
+
+
+def test_interrupt_grace_ends_by_stop_deadline():
+    log = get_logger()
+    thread = StuckThread()
+    interrupt_stuck_threads(log, [thread], 60, time.monotonic() + 0.1)
+
+    assert thread.interrupted
+    assert thread.joins[0] <= 0.1
+
+    late = StuckThread()
+    interrupt_stuck_threads(log, [late], 60, time.monotonic() - 1)
+
+    assert not late.interrupted
+    assert not late.joins
+
+
+def unchanged_fingerprint(env: RunEnv):
+    global fingerprint_count
+
+    fingerprint_count += 1
+    return "unchanged"
+
+
+@register_job(0.1, fingerprint=unchanged_fingerprint)
+def fingerprinted_job(env: RunEnv):
+    global fingerprinted_job_count
+
+    fingerprinted_job_count += 1
+
+
+def test_fingerprint_skips_unchanged():
+    global fingerprint_count, fingerprinted_job_count
+    fingerprint_count = 0
+    fingerprinted_job_count = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "2",
+        "--include-job",
+        "job_runner.test_management_command.fingerprinted_job",
+    )
+
+    assert fingerprint_count > 5
+    assert fingerprinted_job_count == 1
+
+
+@register_job(0.1, fingerprint=lambda env: None)
+def failing_fingerprinted_job(env: RunEnv):
+    global fingerprinted_job_count
+
+    fingerprinted_job_count += 1
+    raise Exception("Try again next time")
+
+
+def test_fingerprint_kept_only_on_success():
+    """A failed run is retried even though its inputs haven't changed"""
+
+    global fingerprinted_job_count
+    fingerprinted_job_count = 0
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "2",
+        "--include-job",
+        "job_runner.test_management_command.failing_fingerprinted_job",
+    )
+
+    assert fingerprinted_job_count > 5
+
+
+tenant_runs: List[Tuple[str, Optional[str]]] = []
+
+
+@register_job(1, per_database=lambda: ["tenant_a", "tenant_b"])
+def per_tenant_job(env: RunEnv):
+    tenant_runs.append((threading.current_thread().name, env.database_alias))
+
+
+def test_per_database_instances():
+    tenant_runs.clear()
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_management_command.per_tenant_job",
+    )
+
+    name = "job_runner.test_management_command.per_tenant_job"
+    assert sorted(set(tenant_runs)) == [
+        (f"Runner: {name}[tenant_a]", "tenant_a"),
+        (f"Runner: {name}[tenant_b]", "tenant_b"),
+    ]
@@ -0,0 +1,133 @@
+"""Tests for runtime job overrides"""
+
+from datetime import timedelta
+import json
+from threading import Event
+import time
+
+from .models import JobOverride
+from .overrides import (
+    DatabaseOverrideStore,
+    FileOverrideStore,
+    Override,
+    OverrideMonitor,
+)
+from .runner import STATE_PAUSED, JobThread, StopEvent
+from .sample_jobs import sample_job_1
+from .timeouts import TimeoutTracker
+
+
+def test_file_store(tmp_path):
+    path = tmp_path / "overrides.json"
+    store = FileOverrideStore(str(path))
+    assert store.load() == {}
+
+    path.write_text(json.dumps({"app.jobs.job": {"interval": 30, "paused": True}}))
+    overrides = store.load()
+
+    assert overrides["app.jobs.job"].interval == timedelta(seconds=30)
+    assert overrides["app.jobs.job"].variance is None
+    assert overrides["app.jobs.job"].paused
+
+
+def test_database_store(db):
+    JobOverride.objects.create(job_name="app.jobs.job", timeout=5, concurrency=2)
+
+    override = DatabaseOverrideStore().load()["app.jobs.job"]
+
+    assert override.timeout == timedelta(seconds=5)
+    assert override.concurrency == 2
+    assert not override.paused
+
+
+class FakeStore:
+    def __init__(self):
+        self.overrides = {}
+
+    def load(self):
+        return dict(self.overrides)
+
+
+def test_monitor_reports_changes():
+    store = FakeStore()
+    changes = []
+    monitor = OverrideMonitor(store, Event(), lambda *change: changes.append(change))
+
+    store.overrides["job"] = Override(paused=True)
+    monitor.poll()
+    monitor.poll()
+    del store.overrides["job"]
+    monitor.poll()
+
+    assert changes == [("job", Override(paused=True)), ("job", None)]
+
+
+def make_thread() -> JobThread:
+    stop = StopEvent()
+    return JobThread(sample_job_1, stop, lambda: None, TimeoutTracker(stop))
+
+
+def test_override_changes_schedule():
+    thread = make_thread()
+    thread._last_run_at = time.time()
+
+    thread.apply_override(Override(interval=timedelta(seconds=1000)))
+
+    assert thread.interval == timedelta(seconds=1000)
+    assert thread.variance == sample_job_1.variance
+    assert 990 < thread._next_run - time.monotonic() <= 1000 + 10
+
+    thread.apply_override(None)
+    assert thread.interval == sample_job_1.interval
+
+
+def test_resumed_job_runs_when_overdue(db):
+    thread = make_thread()
+    thread._override = Override(paused=True)
+    thread._next_run = time.monotonic() - 60
+    thread._conditional_run()
+    assert thread._next_run > time.monotonic()
+
+    thread.apply_override(None)
+
+    assert thread.state != STATE_PAUSED
+    assert thread._next_run <= time.monotonic()
+    assert thread._wakeup.is_set()
+
+    thread._conditional_run()
+    assert thread.history.stats()["runs"] == 1
+
+
+def test_override_keeps_backoff():
+    thread = make_thread()
+    thread._last_run_at = time.time()
+    thread._not_before = time.monotonic() + 500
+    thread._next_run = thread._not_before
+
+    thread.apply_override(Override(concurrency=2))
+    assert thread._next_run == thread._not_before
+
+    thread.apply_override(Override(interval=timedelta(seconds=10)))
+    assert thread._next_run == thread._not_before
+
+
+def test_override_keeps_pending_rerun():
+    thread = make_thread()
+    thread._last_run_at = time.time()
+    thread._next_run = time.monotonic()
+    thread._rerun_pending = True
+
+    thread.apply_override(Override(interval=timedelta(seconds=1000)))
+
+    assert thread._next_run <= time.monotonic()
+
+
+def test_paused_job_does_not_run():
+    thread = make_thread()
+    thread.apply_override(Override(paused=True))
+    thread._next_run = 0
+
+    thread._conditional_run()
+
+    assert thread.state == STATE_PAUSED
+    assert thread.history.stats()["runs"] == 0
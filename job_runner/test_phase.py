@@ -0,0 +1,58 @@
+"""Tests for deterministic phase assignment"""
+
+import pytest
+
+from django.core.management import call_command
+
+from .phase import compute_phase, delay_until_phase
+
+
+def test_phases_are_evenly_spread():
+    names = ["app.jobs.a", "app.jobs.b", "app.jobs.c", "app.jobs.d"]
+
+    phases = sorted(
+        compute_phase(name, names, replica, 2) for name in names for replica in (0, 1)
+    )
+
+    assert phases == pytest.approx([i / 8 for i in range(8)])
+
+
+def test_phase_is_stable():
+    names = ["app.jobs.b", "app.jobs.a"]
+
+    assert compute_phase("app.jobs.b", names) == compute_phase(
+        "app.jobs.b", list(reversed(names))
+    )
+
+
+def test_delay_until_phase():
+    assert delay_until_phase(60, 0.5, 1000 * 60) == pytest.approx(30)
+    assert delay_until_phase(60, 0.5, 1000 * 60 + 40) == pytest.approx(50)
+    assert delay_until_phase(0, 0.5, 12345) == 0
+
+
+def test_invalid_replica_index():
+    with pytest.raises(SystemExit):
+        call_command(
+            "run_jobs",
+            "--phase-mode",
+            "spread",
+            "--replica-index",
+            "2",
+            "--replica-count",
+            "2",
+            "--include-job",
+            "job_runner.test_management_command.fast_job",
+        )
+
+
+def test_management_command_spread():
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--phase-mode",
+        "spread",
+        "--include-job",
+        "job_runner.test_management_command.fast_job",
+    )
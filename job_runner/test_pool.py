@@ -0,0 +1,150 @@
+"""Tests for fanning work out from a job to the runner's worker pool"""
+
+from threading import Event, current_thread
+import threading
+import time
+from typing import List
+
+import pytest
+
+from django.core.management import call_command
+
+from .dispatch import Dispatcher
+from .environment import RunEnv, RunInterrupted, get_environments
+from .pool import WorkerPool
+from .registration import register_job
+
+
+@register_job(1)
+def pooled(env: RunEnv):
+    pass
+
+
+def get_pool_env(pool: WorkerPool, stop: Event) -> RunEnv:
+    env, _ = get_environments(stop, pool=pool.for_job(pooled, stop))
+    return env
+
+
+def test_map_in_order():
+    pool = WorkerPool(4)
+    env = get_pool_env(pool, Event())
+
+    def slow_square(value: int) -> int:
+        time.sleep(0.01 * (5 - value))
+        return value * value
+
+    assert env.map(slow_square, range(5)) == [0, 1, 4, 9, 16]
+    assert pool.stats()["submitted"] == 5
+    pool.shutdown()
+
+
+def test_map_uses_pool_threads():
+    pool = WorkerPool(2)
+    env = get_pool_env(pool, Event())
+
+    names = env.map(lambda _: current_thread().name, range(4), max_workers=2)
+
+    assert all(name.startswith("Job pool") for name in names)
+    pool.shutdown()
+
+
+def test_hung_call_does_not_hold_the_process():
+    pool = WorkerPool(2)
+    env = get_pool_env(pool, Event())
+    release = Event()
+
+    env.submit(release.wait, 5)
+    pool.shutdown()
+
+    assert all(
+        thread.daemon
+        for thread in threading.enumerate()
+        if thread.name.startswith("Job pool")
+    )
+    with pytest.raises(RuntimeError):
+        env.submit(str, 1)
+
+    release.set()
+
+
+def test_map_raises_first_error():
+    pool = WorkerPool(2)
+    env = get_pool_env(pool, Event())
+
+    def fail_on_three(value: int) -> int:
+        if value == 3:
+            raise ValueError()
+
+        return value
+
+    with pytest.raises(ValueError):
+        env.map(fail_on_three, range(5))
+
+    pool.shutdown()
+
+
+def test_map_stops():
+    pool = WorkerPool(1)
+    stop = Event()
+    env = get_pool_env(pool, stop)
+    ran = []
+
+    def stop_runner(value: int):
+        ran.append(value)
+        stop.set()
+
+    with pytest.raises(RunInterrupted):
+        env.map(stop_runner, range(10))
+
+    assert ran == [0]
+    pool.shutdown()
+
+
+def test_runs_inline_without_free_slot():
+    stop = Event()
+    dispatcher = Dispatcher(stop, max_concurrent=1)
+    slot = dispatcher.acquire(pooled, time.monotonic())
+
+    pool = WorkerPool(2, dispatcher)
+    env = get_pool_env(pool, stop)
+    names = env.map(lambda _: current_thread().name, range(3))
+
+    assert names == [current_thread().name] * 3
+    assert pool.stats()["inline"] == 3
+
+    dispatcher.release(slot)
+    pool.shutdown()
+
+
+def test_no_pool():
+    env, _ = get_environments(Event())
+
+    assert env.map(str, range(3)) == ["0", "1", "2"]
+    assert env.submit(str, 4).result() == "4"
+
+
+fan_out_results: List[int] = []
+
+
+@register_job(0.1)
+def fan_out_job(env: RunEnv):
+    global fan_out_results
+
+    fan_out_results = env.map(lambda value: value + 1, range(10), max_workers=3)
+
+
+def test_fan_out_job():
+    global fan_out_results
+    fan_out_results = []
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--pool-size",
+        "3",
+        "--include-job",
+        "job_runner.test_pool.fan_out_job",
+    )
+
+    assert fan_out_results == list(range(1, 11))
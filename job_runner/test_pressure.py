@@ -0,0 +1,99 @@
+"""Tests for pressure probes and job deferral"""
+
+from threading import Event
+
+from django.core.management import call_command
+
+from .environment import RunEnv
+from .pressure import LoadAverageProbe, PressureMonitor, PressureProbe
+from .registration import register_job
+
+deferred_job_count = 0
+exempt_job_count = 0
+
+
+class StaticProbe(PressureProbe):
+    name = "static"
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def measure(self) -> float:
+        return self.value
+
+
+class BrokenProbe(PressureProbe):
+    name = "broken"
+
+    def measure(self) -> float:
+        raise OSError("Nope")
+
+
+def test_monitor_stretch():
+    probe = StaticProbe(0.5)
+    monitor = PressureMonitor([probe], Event(), max_stretch=4)
+
+    monitor.poll()
+    assert monitor.stretch == 1
+
+    probe.value = 2.5
+    monitor.poll()
+    assert monitor.stretch == 2.5
+
+    probe.value = 100
+    monitor.poll()
+    assert monitor.stretch == 4
+
+
+def test_broken_probe_is_saturated():
+    monitor = PressureMonitor([BrokenProbe()], Event(), max_stretch=3)
+    monitor.poll()
+    assert monitor.stretch == 3
+
+
+def test_load_average_probe():
+    assert LoadAverageProbe().measure() >= 0
+
+
+def test_priority_exemption():
+    monitor = PressureMonitor([], Event(), exempt_priority=5)
+    assert monitor.applies_to(0)
+    assert not monitor.applies_to(5)
+
+
+@register_job(0.1)
+def deferred_job(env: RunEnv):
+    global deferred_job_count
+    deferred_job_count += 1
+
+
+@register_job(0.1, priority=1)
+def exempt_job(env: RunEnv):
+    global exempt_job_count
+    exempt_job_count += 1
+
+
+def test_pressure_defers_jobs(settings):
+    global deferred_job_count
+    global exempt_job_count
+    deferred_job_count = 0
+    exempt_job_count = 0
+
+    settings.JOB_RUNNER_PRESSURE_PROBES = [
+        {"class": "job_runner.test_pressure.StaticProbe", "value": 3}
+    ]
+    settings.JOB_RUNNER_PRESSURE_INTERVAL = 0.5
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "2",
+        "--include-job",
+        "job_runner.test_pressure.deferred_job",
+        "--include-job",
+        "job_runner.test_pressure.exempt_job",
+    )
+
+    # The deferred job waits an extra second per run, the exempt one doesn't
+    assert 1 <= deferred_job_count <= 3
+    assert exempt_job_count > 10
@@ -0,0 +1,61 @@
+"""Tests for the streaming quantile estimates"""
+
+import random
+
+import pytest
+
+from .quantiles import LatencySketch, P2Quantile
+
+
+def test_small_counts_are_exact():
+    quantile = P2Quantile(0.5)
+    assert quantile.value is None
+
+    for value in (3, 1, 2):
+        quantile.add(value)
+
+    assert quantile.value == 2
+
+
+def test_value_readable_during_add():
+    quantile = P2Quantile(0.5)
+    seen = []
+
+    class ReadingList(list):
+        # Reads the estimate the way an unlocked status request would
+        def append(self, value):
+            seen.append(quantile.value)
+            super().append(value)
+
+    quantile._initial = ReadingList()
+    for value in range(1, 7):
+        quantile.add(value)
+
+    assert seen == [None, 1, 1, 2, 3]
+
+
+def test_uniform_estimates():
+    generator = random.Random(1234)
+    sketch = LatencySketch()
+
+    for _ in range(20000):
+        sketch.add(generator.random())
+
+    summary = sketch.summary()
+    assert summary["count"] == 20000
+    assert summary["p50"] == pytest.approx(0.5, abs=0.02)
+    assert summary["p90"] == pytest.approx(0.9, abs=0.02)
+    assert summary["p99"] == pytest.approx(0.99, abs=0.01)
+    assert summary["max"] <= 1
+
+
+def test_skewed_estimates():
+    generator = random.Random(4321)
+    sketch = LatencySketch()
+
+    for _ in range(20000):
+        sketch.add(generator.expovariate(1))
+
+    summary = sketch.summary()
+    assert summary["p50"] == pytest.approx(0.693, rel=0.05)
+    assert summary["p99"] == pytest.approx(4.605, rel=0.1)
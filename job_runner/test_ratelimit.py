@@ -0,0 +1,95 @@
+"""Tests for the shared token bucket rate limiters"""
+
+from threading import Event, Timer
+import time
+
+import pytest
+
+from django.test import override_settings
+
+from .environment import RunInterrupted, get_environments
+from .isolation import _shareable
+from .ratelimit import FileRateLimiter, MemoryRateLimiter, build_rate_limiters
+
+
+def test_burst_then_rate():
+    limiter = MemoryRateLimiter("api", rate=10, burst=3)
+
+    assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+
+    wait = limiter.try_acquire()
+    assert 0 < wait <= 0.1
+
+
+def test_file_limiter_shared(tmp_path):
+    path = str(tmp_path / "bucket")
+    first = FileRateLimiter("api", rate=1, path=path, burst=2)
+    second = FileRateLimiter("api", rate=1, path=path, burst=2)
+
+    assert first.try_acquire() == 0
+    assert second.try_acquire() == 0
+    assert first.try_acquire() > 0
+
+
+def test_env_rate_limit_waits():
+    limiter = MemoryRateLimiter("api", rate=20, burst=1)
+    env, _ = get_environments(Event(), rate_limits={"api": limiter})
+
+    started_at = time.monotonic()
+    for _ in range(3):
+        env.rate_limit("api")
+
+    assert time.monotonic() - started_at >= 0.09
+
+
+def test_env_rate_limit_stops():
+    stop = Event()
+    limiter = MemoryRateLimiter("api", rate=0.01, burst=1)
+    env, _ = get_environments(stop, rate_limits={"api": limiter})
+    env.rate_limit("api")
+
+    Timer(0.1, stop.set).start()
+    with pytest.raises(RunInterrupted):
+        env.rate_limit("api")
+
+
+def test_env_rate_limit_errors():
+    env, _ = get_environments(
+        Event(), rate_limits={"api": MemoryRateLimiter("api", 1, burst=2)}
+    )
+
+    with pytest.raises(ValueError):
+        env.rate_limit("missing")
+
+    with pytest.raises(ValueError):
+        env.rate_limit("api", tokens=3)
+
+
+def test_memory_limiter_in_isolated_process(tmp_path):
+    path = str(tmp_path / "bucket")
+    limiters = _shareable(
+        {
+            "memory": MemoryRateLimiter("memory", 1),
+            "file": FileRateLimiter("file", 1, path=path),
+        }
+    )
+    env, _ = get_environments(Event(), rate_limits=limiters)
+
+    env.rate_limit("file")
+    with pytest.raises(ValueError, match="file backend"):
+        env.rate_limit("memory")
+
+
+def test_build_from_settings(tmp_path):
+    rate_limits = {
+        "memory": {"rate": 5, "burst": 10},
+        "file": {"rate": 1, "backend": "file", "path": str(tmp_path / "bucket")},
+    }
+
+    with override_settings(JOB_RUNNER_RATE_LIMITS=rate_limits):
+        limiters = build_rate_limiters()
+
+    assert isinstance(limiters["memory"], MemoryRateLimiter)
+    assert limiters["memory"].burst == 10
+    assert isinstance(limiters["file"], FileRateLimiter)
+    assert limiters["file"].burst == 1
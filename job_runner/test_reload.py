@@ -0,0 +1,190 @@
+"""Tests for reloading jobs on SIGHUP"""
+
+from datetime import timedelta
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import pytest
+
+from django.core.management import call_command
+from structlog import get_logger
+
+from .management.commands.run_jobs import reap_retired, reload_jobs
+from .pool import WorkerPool
+from .registration import import_jobs_from_module, register_job
+from .runner import JobThread, StopEvent
+from .schedule import FileScheduleStore, SavedSchedule
+from .timeouts import TimeoutTracker
+
+MODULE = "reloadable_sample_jobs"
+
+JOBS = """
+from job_runner.registration import register_job
+
+@register_job({interval})
+def job_a(env):
+    pass
+
+@register_job(60)
+def {second}(env):
+    pass
+"""
+
+
+@pytest.fixture
+def job_module(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # Rewrites within the same second must not be served from a stale cache
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    path = tmp_path / f"{MODULE}.py"
+
+    def write(interval: int, second: str = "job_b"):
+        path.write_text(JOBS.format(interval=interval, second=second))
+
+    write(60)
+    yield write
+
+    sys.modules.pop(MODULE, None)
+
+
+def load(reload: bool = False):
+    return set(import_jobs_from_module(MODULE, reload))
+
+
+def start_threads(stop: StopEvent):
+    tracker = TimeoutTracker(stop)
+
+    def start(job) -> JobThread:
+        thread = JobThread(job, stop, lambda: None, tracker)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    return start, [start(job) for job in load()]
+
+
+def job_body(env):
+    pass
+
+
+def names(threads):
+    return sorted(thread.job.name.split(".")[-1] for thread in threads)
+
+
+def test_reload_diffs_jobs(job_module):
+    stop = StopEvent()
+    start, threads = start_threads(stop)
+    old_b = next(thread for thread in threads if thread.job.name.endswith("job_b"))
+
+    job_module(1, "job_c")
+    job_names = {"stale"}
+    retired = reload_jobs(get_logger(), threads, load, start, job_names)
+
+    assert names(threads) == ["job_a", "job_c"]
+    assert sorted(name.split(".")[-1] for name in job_names) == ["job_a", "job_c"]
+    assert retired == [old_b] and old_b.retired
+
+    old_b.join(1)
+    reap_retired(get_logger(), retired, set(), 5)
+    assert retired == []
+
+    job_a = next(thread for thread in threads if thread.job.name.endswith("job_a"))
+    assert job_a.job.interval == timedelta(seconds=1)
+
+    stop.set()
+    for thread in threads:
+        thread.join(1)
+        assert not thread.is_alive()
+
+
+def test_reload_keeps_backoff(job_module):
+    stop = StopEvent()
+    job_a = next(job for job in load() if job.name.endswith("job_a"))
+    thread = JobThread(job_a, stop, lambda: None, TimeoutTracker(stop))
+    thread._last_run_at = time.time()
+    thread._not_before = time.monotonic() + 500
+    thread._next_run = thread._not_before
+
+    job_module(1)
+    thread.update_job(next(job for job in load(True) if job.name.endswith("job_a")))
+
+    assert thread.interval == timedelta(seconds=1)
+    assert thread._next_run == thread._not_before
+
+
+def test_reload_rebuilds_failure_handling():
+    stop = StopEvent()
+    pool = WorkerPool(1)
+    old = register_job(60)(job_body)
+    new = register_job(60, circuit_threshold=2, rerun_budget=3)(job_body)
+    thread = JobThread(old, stop, lambda: None, TimeoutTracker(stop), pool=pool)
+
+    thread.update_job(new)
+
+    assert thread._circuit and thread._circuit.threshold == 2
+    assert thread._rerun_budget and thread._rerun_budget.budget == 3
+    assert thread._pool and thread._pool._job is new
+    pool.shutdown()
+
+
+def test_signal_stop_leaves_listeners_to_main_loop():
+    stop = StopEvent()
+    halted: List[bool] = []
+    stop.add_listener(lambda: halted.append(True))
+
+    # As if the signal arrived while a reload was adding a listener
+    with stop._listeners_lock:
+        stop.set(notify=False)
+
+    assert stop.is_set()
+    assert halted == []
+
+    stop.notify_listeners()
+    assert halted == [True]
+
+
+def test_reload_reads_saved_schedules(job_module, tmp_path):
+    stop = StopEvent()
+    start, threads = start_threads(stop)
+    store = FileScheduleStore(str(tmp_path / "schedule.json"))
+    store.save(f"{MODULE}.job_c", SavedSchedule(None, 1.0))
+    saved_schedules: Dict[str, SavedSchedule] = {}
+
+    job_module(60, "job_c")
+    reload_jobs(get_logger(), threads, load, start, set(), store, saved_schedules)
+
+    assert list(saved_schedules) == [f"{MODULE}.job_c"]
+    stop.set()
+
+
+def test_broken_reload_keeps_jobs(job_module, tmp_path):
+    stop = StopEvent()
+    start, threads = start_threads(stop)
+
+    (tmp_path / f"{MODULE}.py").write_text("def broken(:\n")
+    reload_jobs(get_logger(), threads, load, start, set())
+
+    assert names(threads) == ["job_a", "job_b"]
+    assert all(thread.is_alive() for thread in threads)
+    stop.set()
+
+
+@pytest.mark.timeout(5)
+def test_sighup_keeps_running(job_module):
+    def send_signals():
+        main_thread = threading.main_thread().ident
+        time.sleep(0.5)
+        signal.pthread_kill(main_thread, signal.SIGHUP)
+        time.sleep(0.5)
+        signal.pthread_kill(main_thread, signal.SIGTERM)
+
+    threading.Thread(target=send_signals, name="Signal sender").start()
+
+    call_command(
+        "run_jobs",
+        "--include-job",
+        f"{MODULE}.job_a",
+    )
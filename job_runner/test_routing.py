@@ -0,0 +1,124 @@
+"""Tests for routing job reads to a replica"""
+
+from threading import Event
+from typing import List, Optional, Tuple
+
+import django.db
+from django.core.management import call_command
+from django.test import override_settings
+from structlog import get_logger
+
+from .environment import RunEnv, get_environments
+from .pool import WorkerPool
+from .registration import register_job
+from . import routing
+from .routing import JobReadRouter, choose_read_alias, measure_lag, reading_from
+
+replica_lag = 0.0
+routed_reads: List[Tuple[Optional[str], Optional[str]]] = []
+
+
+def fake_lag(alias: str) -> float:
+    if replica_lag < 0:
+        raise ConnectionError("Replica is down")
+    return replica_lag
+
+
+lag_settings = override_settings(
+    JOB_RUNNER_REPLICA_LAG_CHECK="job_runner.test_routing.fake_lag",
+    JOB_RUNNER_REPLICA_LAG_CACHE=0,
+)
+
+
+def test_router_follows_thread():
+    router = JobReadRouter()
+    assert router.db_for_read(None) is None
+
+    with reading_from("replica"):
+        assert router.db_for_read(None) == "replica"
+
+    assert router.db_for_read(None) is None
+
+
+@lag_settings
+def test_lag_guard():
+    global replica_lag
+    log = get_logger()
+
+    replica_lag = 1
+    assert choose_read_alias("replica", 5, log) == "replica"
+
+    replica_lag = 10
+    assert choose_read_alias("replica", 5, log) is None
+
+    replica_lag = -1
+    assert choose_read_alias("replica", 5, log) is None
+
+
+def test_pool_calls_keep_routing():
+    pool = WorkerPool(2)
+    stop = Event()
+    env, _ = get_environments(stop, pool=pool.for_job(replica_job, stop))
+
+    with reading_from("replica"):
+        aliases = env.map(lambda _: JobReadRouter().db_for_read(None), range(4))
+
+    assert aliases == ["replica"] * 4
+    assert env.submit(JobReadRouter().db_for_read, None).result() is None
+    pool.shutdown()
+
+
+def test_unmeasurable_lag():
+    # SQLite has no replicas to measure
+    assert measure_lag("default") is None
+
+
+class OldMySQLCursor:
+    """Answers like a replica running MySQL before 8.0.22"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.description = [("Slave_IO_State",), ("Seconds_Behind_Master",)]
+
+    def execute(self, sql: str):
+        self.statements.append(sql)
+        if sql == "SHOW REPLICA STATUS":
+            raise django.db.ProgrammingError("You have an error in your SQL syntax")
+
+    def fetchone(self):
+        return ("Waiting for master to send event", 12)
+
+
+def test_mysql_lag_falls_back_to_slave_status(monkeypatch):
+    monkeypatch.setattr(routing, "_legacy_replica_status", False)
+
+    cursor = OldMySQLCursor()
+    assert routing._mysql_lag(cursor) == 12.0
+    assert routing._mysql_lag(cursor) == 12.0
+    assert cursor.statements == [
+        "SHOW REPLICA STATUS",
+        "SHOW SLAVE STATUS",
+        "SHOW SLAVE STATUS",
+    ]
+
+
+@register_job(1, read_using="default")
+def replica_job(env: RunEnv):
+    routed_reads.append((env.read_using, JobReadRouter().db_for_read(None)))
+
+
+@lag_settings
+def test_job_reads_routed():
+    global replica_lag
+    replica_lag = 0
+    routed_reads.clear()
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--include-job",
+        "job_runner.test_routing.replica_job",
+    )
+
+    assert routed_reads and set(routed_reads) == {("default", "default")}
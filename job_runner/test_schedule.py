@@ -0,0 +1,90 @@
+"""Tests for saving job schedules across restarts"""
+
+from django.core.management import call_command
+
+from .environment import RunEnv
+from .registration import register_job
+from .schedule import (
+    CATCH_UP_ALL,
+    CATCH_UP_ONCE,
+    CATCH_UP_SKIP,
+    DatabaseScheduleStore,
+    FileScheduleStore,
+    SavedSchedule,
+    plan_resume,
+)
+
+hourly_count = 0
+
+
+def test_plan_resume_not_due():
+    saved = SavedSchedule(0, 130)
+
+    for policy in (CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL):
+        assert plan_resume(saved, 60, policy, 100) == (30, 0)
+
+
+def test_plan_resume_missed_runs():
+    # Due at 100, and it is now 250: the runs at 100, 160 and 220 were missed
+    saved = SavedSchedule(40, 100)
+
+    assert plan_resume(saved, 60, CATCH_UP_SKIP, 250) == (30, 0)
+    assert plan_resume(saved, 60, CATCH_UP_ONCE, 250) == (0, 0)
+    assert plan_resume(saved, 60, CATCH_UP_ALL, 250) == (0, 2)
+    assert plan_resume(saved, 60, CATCH_UP_ALL, 250, max_catch_up_runs=2) == (0, 1)
+
+
+def test_file_store(tmp_path):
+    path = str(tmp_path / "schedule.json")
+    store = FileScheduleStore(path)
+
+    assert store.load() == {}
+
+    store.save("a", SavedSchedule(1.0, 2.0, {"orders": 42}))
+    store.save("b", SavedSchedule(None, 3.0))
+
+    loaded = FileScheduleStore(path).load()
+    assert loaded["a"].last_run_at == 1.0
+    assert loaded["a"].next_run_at == 2.0
+    assert loaded["a"].cursors == {"orders": 42}
+    assert loaded["b"].last_run_at is None
+    assert loaded["b"].cursors == {}
+
+
+def test_database_store(db):
+    store = DatabaseScheduleStore()
+    store.save("a", SavedSchedule(1000.5, 2000.5))
+    store.save("a", SavedSchedule(2000.5, 3000.5, {"orders": 42}))
+
+    loaded = store.load()
+    assert list(loaded) == ["a"]
+    assert loaded["a"].last_run_at == 2000.5
+    assert loaded["a"].next_run_at == 3000.5
+    assert loaded["a"].cursors == {"orders": 42}
+
+
+@register_job(3600)
+def hourly_job(env: RunEnv):
+    global hourly_count
+
+    hourly_count += 1
+
+
+def test_restart_does_not_rerun(tmp_path):
+    global hourly_count
+    hourly_count = 0
+    path = str(tmp_path / "schedule.json")
+
+    for _ in range(2):
+        call_command(
+            "run_jobs",
+            "--stop-after",
+            "1",
+            "--schedule-file",
+            path,
+            "--include-job",
+            "job_runner.test_schedule.hourly_job",
+        )
+
+    assert hourly_count == 1
+    assert FileScheduleStore(path).load()["job_runner.test_schedule.hourly_job"]
@@ -0,0 +1,113 @@
+"""Tests for the status endpoint"""
+
+import json
+import os
+import socket
+from threading import Event, Thread
+import time
+import urllib.request
+from datetime import timedelta
+from urllib.error import HTTPError
+
+import pytest
+
+from django.core.management import call_command
+
+from .status import StatusServer
+from .timeouts import TimeoutTracker
+
+
+def test_status_over_http():
+    server = StatusServer(lambda: {"jobs": []}, port=0)
+    server.start()
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/status") as resp:
+            assert json.loads(resp.read()) == {"jobs": []}
+
+        with pytest.raises(HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/nope")
+    finally:
+        server.stop()
+
+
+def test_status_over_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "status.sock")
+    server = StatusServer(lambda: {"ok": True}, socket_path=socket_path)
+    server.start()
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            response = b""
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    break
+                response += data
+
+        _, body = response.split(b"\r\n\r\n", 1)
+        assert json.loads(body) == {"ok": True}
+    finally:
+        server.stop()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_timeout_snapshot():
+    stop = Event()
+    tracker = TimeoutTracker(stop)
+    tracker.daemon = True
+    tracker.start()
+
+    cancel = tracker.add_timeout(timedelta(seconds=30), lambda: None, name="sample")
+    snapshot = tracker.snapshot()
+    assert [timeout["name"] for timeout in snapshot] == ["sample"]
+    assert 0 < snapshot[0]["remaining"] <= 30
+
+    cancel()
+    assert tracker.snapshot() == []
+
+    stop.set()
+    tracker.join()
+
+
+def test_management_command_status(tmp_path):
+    socket_path = str(tmp_path / "runner.sock")
+    statuses = []
+
+    def fetch():
+        time.sleep(0.5)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(b"GET /status HTTP/1.0\r\n\r\n")
+            response = b""
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    break
+                response += data
+
+        statuses.append(json.loads(response.split(b"\r\n\r\n", 1)[1]))
+
+    fetcher = Thread(target=fetch)
+    fetcher.start()
+
+    call_command(
+        "run_jobs",
+        "--stop-after",
+        "1",
+        "--status-socket",
+        socket_path,
+        "--include-job",
+        "job_runner.test_management_command.slow_job",
+    )
+    fetcher.join()
+
+    status = statuses[0]
+    assert (
+        status["jobs"][0]["job_name"] == "job_runner.test_management_command.slow_job"
+    )
+    assert status["jobs"][0]["last_outcome"] == "success"
+    assert [timeout["name"] for timeout in status["timeouts"]] == ["stop after"]
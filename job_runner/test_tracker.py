@@ -2,8 +2,16 @@
 
 from datetime import timedelta
 
+import pytest
+
+import django.db
+
 from .sample_jobs import sample_job_1, sample_job_disabled
-from .registration import import_jobs_from_module
+from .registration import (
+    expand_per_database,
+    import_jobs_from_module,
+    register_job,
+)
 
 
 def test_explicit_jobs():
@@ -15,3 +23,56 @@ def test_explicit_jobs():
 def test_disabled_jobs():
     jobs = import_jobs_from_module("job_runner.sample_jobs")
     assert sample_job_disabled not in jobs
+
+
+def test_invalid_isolation():
+    with pytest.raises(ValueError):
+        register_job(5, isolation="container")
+
+
+@register_job(5, per_database=lambda: ["tenant_a", "tenant_b"])
+def per_tenant_job(env):
+    pass
+
+
+def test_expand_per_database():
+    jobs = expand_per_database([sample_job_1, per_tenant_job])
+    names = sorted(job.name for job in jobs)
+
+    assert names == [
+        sample_job_1.name,
+        f"{per_tenant_job.name}[tenant_a]",
+        f"{per_tenant_job.name}[tenant_b]",
+    ]
+    assert {job.database_alias for job in jobs} == {None, "tenant_a", "tenant_b"}
+    assert {job.base_name for job in jobs} == {sample_job_1.name, per_tenant_job.name}
+
+
+def test_per_database_defaults_to_all_aliases():
+    job = register_job(5, per_database=True)(lambda env: None)
+
+    assert [instance.database_alias for instance in expand_per_database([job])] == [
+        "default"
+    ]
+
+
+def test_per_database_skips_replicas(monkeypatch):
+    monkeypatch.setattr(
+        django.db.connections,
+        "settings",
+        {
+            "default": {"TEST": {"MIRROR": None}},
+            "tenant": {"TEST": {"MIRROR": None}},
+            "replica": {"TEST": {"MIRROR": None}},
+            "mirror": {"TEST": {"MIRROR": "default"}},
+        },
+    )
+    job = register_job(5, per_database=True)(lambda env: None)
+    reader = register_job(5, read_using="replica")(lambda env: None)
+
+    instances = expand_per_database([job, reader])
+
+    assert sorted(filter(None, (job.database_alias for job in instances))) == [
+        "default",
+        "tenant",
+    ]
@@ -1,6 +1,6 @@
 from datetime import timedelta
 from threading import Thread, Event, Lock
-from typing import Callable, Dict, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import time
 
 from structlog import get_logger
@@ -16,12 +16,17 @@ class TimeoutTracker(Thread):
         self._stop_evt = stop
         self._lock = Lock()
         self._running: Dict[int, Tuple[float, Callback]] = {}
+        self._names: Dict[int, Optional[str]] = {}
+        # A copy of the pending timeouts that can be read without the lock
+        self._published: Tuple[Tuple[float, Optional[str]], ...] = ()
         self._log = logger.bind(process="timeout tracker")
         self._key = 0
 
         super().__init__(name="Timeout tracker")
 
-    def add_timeout(self, duration: timedelta, callback: Callback) -> Callback:
+    def add_timeout(
+        self, duration: timedelta, callback: Callback, name: Optional[str] = None
+    ) -> Callback:
         """Add a timeout to the callbacks"""
 
         with self._lock:
@@ -31,6 +36,8 @@ class TimeoutTracker(Thread):
             cancel = self._get_cancel(key)
             timeout_time = time.monotonic() + duration.total_seconds()
             self._running[key] = (timeout_time, callback)
+            self._names[key] = name
+            self._publish()
 
             # Set the event so the loop fires,
             # which will update the sleep time in case this is to be the next firing event
@@ -84,6 +91,8 @@ class TimeoutTracker(Thread):
                     return
 
                 del self._running[key]
+                del self._names[key]
+                self._publish()
 
         return cancel
 
@@ -100,6 +109,33 @@ class TimeoutTracker(Thread):
 
         for key in to_remove:
             del self._running[key]
+            del self._names[key]
+
+        if to_remove:
+            self._publish()
+
+    def _publish(self):
+        """Publish the pending timeouts. Must be called with the lock held"""
+
+        self._published = tuple(
+            sorted(
+                (
+                    (timeout, self._names[key])
+                    for key, (timeout, _) in self._running.items()
+                ),
+                key=lambda item: item[0],
+            )
+        )
+
+    def snapshot(self) -> List[dict]:
+        """The pending timeouts, read without taking the lock"""
+
+        now = time.monotonic()
+
+        return [
+            {"name": name, "remaining": timeout - now}
+            for timeout, name in self._published
+        ]
 
     @property
     def _timeout_delay(self) -> Optional[float]:
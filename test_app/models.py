@@ -0,0 +1,6 @@
+from django.db import models
+
+
+class Widget(models.Model):
+    name = models.CharField(max_length=100)
+    processed = models.BooleanField(default=False)
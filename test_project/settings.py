@@ -20,6 +20,13 @@ ROOT_URLCONF = "test_project.urls"
 WSGI_APPLICATION = "test_project.wsgi.application"
 
 
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    }
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGGING = {